@@ -0,0 +1,9 @@
+""" benchmarks for giganttic
+
+synthetic.py generates schedules of any size in every supported input format,
+run.py times each stage of the pipeline and stores the results for comparison
+across versions:
+
+    python -m benchmarks.run --sizes 1000 10000 100000
+    python -m benchmarks.run --compare
+"""
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark runner for giganttic
+
+times import, extract_milestones, flatten_milestones, get_colours,
+both gantt_chart backends and save_figures on synthetic schedules,
+and appends the results to a json lines file for comparison across versions.
+
+usage:
+    python -m benchmarks.run --sizes 1000 10000 100000
+    python -m benchmarks.run --compare
+
+@author: dhancock
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime as dt
+
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import giganttic as gt  # noqa: E402
+from benchmarks.synthetic import generate_schedule, WRITERS  # noqa: E402
+
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.jsonl')
+SIZES = [1000, 10000, 100000]
+
+# some stages are much slower than linear, so are skipped above these sizes
+# unless --max-rows is given
+MAX_ROWS = {'extract_milestones': 2000,
+            'flatten_milestones': 10000,
+            'plotly_gantt': 1000,
+            'save_figures': 10000}
+
+
+def get_version():
+    """ returns the giganttic version and the git commit, if available """
+    try:
+        from importlib.metadata import version
+        package_version = version('giganttic')
+    except Exception:  # not installed
+        package_version = 'unknown'
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))
+                                ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'unknown'
+    return package_version, commit
+
+
+def benchmark_stages(df, files, outputdir):
+    """
+    yields (name, function) for each benchmark, where function takes no arguments.
+    Each function works on its own copy of the data.
+    """
+    yield 'import_csv', lambda: gt.import_csv(files['csv'])
+    yield 'import_excel', lambda: gt.import_excel(files['xlsx'])
+    yield 'import_mpp_xml', lambda: gt.import_mpp_xml(files['xml'])
+    yield 'extract_milestones', lambda: gt.extract_milestones(df.copy())
+    yield 'flatten_milestones', lambda: gt.flatten_milestones(df.copy())
+    yield 'get_colours', lambda: gt.get_colours(df.copy(), fillcolumn='WBS')
+    yield 'mpl_gantt', lambda: plt.close(gt.mpl_gantt(df.copy())[1])
+    yield 'plotly_gantt', lambda: gt.plotly_gantt(df.copy())
+
+    def save_figures():
+        data = df.copy()
+        ax, fig = gt.mpl_gantt(data)
+        with gt.stage('save_figures only', rows=len(df)):
+            gt.save_figures(data, ax, fig, 'benchmark', outputdir, maxlines=max(60, len(df)//10))
+        plt.close(fig)
+    yield 'save_figures', save_figures
+
+
+def run(sizes=None, repeat=1, max_rows=None, results_file=RESULTS_FILE,
+        memory=False, only=None, **schedule_options):
+    """
+    runs the benchmarks and appends the results to results_file
+
+    Parameters
+    ----------
+    sizes : list, optional
+        numbers of rows. The default is SIZES.
+    repeat : int, optional
+        number of times to run each benchmark. The default is 1.
+    max_rows : int, optional
+        overrides MAX_ROWS for every benchmark.
+    results_file : str, optional
+        json lines file for the results. The default is RESULTS_FILE.
+    memory : bool, optional
+        record peak memory, which slows everything down. The default is False.
+    only : list, optional
+        names of benchmarks to run. The default is all of them.
+    **schedule_options :
+        passed to generate_schedule
+
+    Returns
+    -------
+    results : pandas.DataFrame
+    """
+    sizes = SIZES if sizes is None else sizes
+    package_version, commit = get_version()
+    run_details = {'version': package_version,
+                   'commit': commit,
+                   'timestamp': dt.now().isoformat(timespec='seconds'),
+                   'python': platform.python_version(),
+                   'pandas': pd.__version__,
+                   'matplotlib': matplotlib.__version__}
+
+    results = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        for rows in sizes:
+            df = generate_schedule(rows, **schedule_options)
+            files = {extension: writer(df, os.path.join(tempdir, f'schedule.{extension}'))
+                     for extension, writer in WRITERS.items()}
+            for name, function in benchmark_stages(df, files, os.path.join(tempdir, 'pages')):
+                if only is not None and name not in only:
+                    continue
+                if rows > (max_rows or MAX_ROWS.get(name, rows)):
+                    print(f'skipping {name} at {rows} rows')
+                    continue
+                for iteration in range(repeat):
+                    collector = gt.ListCollector()
+                    with gt.profiling(collector, memory=memory):
+                        with gt.stage('benchmark', rows=rows):
+                            function()
+                    total = collector[-1]
+                    result = dict(run_details,
+                                  benchmark=name,
+                                  rows=rows,
+                                  iteration=iteration,
+                                  wall_time=total['wall_time'],
+                                  peak_memory_mb=total['peak_memory_mb'],
+                                  stages={r['stage']: r['wall_time'] for r in collector[:-1]})
+                    print(f"{name:<20} {rows:>8} rows {total['wall_time']:>10.3f} s")
+                    results.append(result)
+
+    if results_file is not None:
+        with open(results_file, 'a', encoding='utf8') as file_object:
+            for result in results:
+                file_object.write(json.dumps(result) + '\n')
+
+    return pd.DataFrame(results)
+
+
+def compare(results_file=RESULTS_FILE, base=None, new=None):
+    """
+    compares the fastest time of each benchmark between two commits
+
+    Parameters
+    ----------
+    results_file : str, optional
+        The default is RESULTS_FILE.
+    base : str, optional
+        commit to compare against. The default is the second most recent.
+    new : str, optional
+        commit to compare. The default is the most recent.
+
+    Returns
+    -------
+    comparison : pandas.DataFrame
+    """
+    results = pd.read_json(results_file, lines=True)
+    commits = results.drop_duplicates('commit', keep='last').sort_values('timestamp').commit
+    new = commits.iloc[-1] if new is None else new
+    base = commits.iloc[-2] if base is None and len(commits) > 1 else base or new
+
+    fastest = results.groupby(['commit', 'benchmark', 'rows']).wall_time.min()
+    comparison = pd.DataFrame({base: fastest.get(base), new: fastest.get(new)})
+    comparison['ratio'] = comparison[new] / comparison[base]
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--max-rows', type=int, default=None)
+    parser.add_argument('--only', nargs='+', default=None)
+    parser.add_argument('--memory', action='store_true')
+    parser.add_argument('--wbs-depth', type=int, default=3)
+    parser.add_argument('--milestone-density', type=float, default=0.2)
+    parser.add_argument('--fan-in', type=int, default=2)
+    parser.add_argument('--date-spread', type=int, default=3650)
+    parser.add_argument('--results-file', default=RESULTS_FILE)
+    parser.add_argument('--compare', nargs='*', default=None,
+                        help='compare two commits (default: the last two run)')
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        print(compare(args.results_file, *args.compare).to_string())
+        return
+
+    run(args.sizes, args.repeat, args.max_rows, args.results_file,
+        memory=args.memory,
+        only=args.only,
+        wbs_depth=args.wbs_depth,
+        milestone_density=args.milestone_density,
+        fan_in=args.fan_in,
+        date_spread=args.date_spread)
+
+
+if __name__ == '__main__':
+    main()
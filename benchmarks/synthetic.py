@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+synthetic schedule generator for giganttic benchmarks
+
+generates schedules of any size with a configurable WBS depth,
+milestone density, predecessor fan-in and date spread,
+and writes them in every input format giganttic can import.
+
+@author: dhancock
+"""
+
+import math
+import numpy as np
+import pandas as pd
+from giganttic.data_export import export_mpp_xml
+
+MILESTONE_COLUMNS = ['T0', 'T1', 'T2', 'T3', 'T4', 'T5',
+                     'R0', 'R1', 'R2', 'R3', 'R4']
+
+
+def generate_schedule(rows=1000,
+                      wbs_depth=3,
+                      milestone_density=0.2,
+                      fan_in=2,
+                      date_spread=3650,
+                      start_date='2024-01-01',
+                      seed=0):
+    """
+    generates a random schedule
+
+    Parameters
+    ----------
+    rows : int, optional
+        number of activities and milestones. The default is 1000.
+    wbs_depth : int, optional
+        number of levels in the WBS codes. The default is 3.
+    milestone_density : float, optional
+        fraction of rows which are milestones (zero length), and the chance of
+        each activity having a date in each of the MILESTONE_COLUMNS.
+        The default is 0.2.
+    fan_in : int, optional
+        maximum number of predecessors of each row. The default is 2.
+    date_spread : int, optional
+        number of days over which the start dates are spread. The default is 3650.
+    start_date : str, optional
+        The default is '2024-01-01'.
+    seed : int, optional
+        random seed. The default is 0.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        with id, WBS, activity_name, start, end, predecessors, milestone,
+        and the MILESTONE_COLUMNS (for extract_milestones)
+    """
+    rng = np.random.default_rng(seed)
+    row_numbers = np.arange(rows)
+
+    # WBS codes, with rows in WBS order
+    branching = max(2, math.ceil(rows ** (1 / (wbs_depth + 1))))
+    wbs = pd.Series(np.ones(rows, dtype=int)).astype(str)
+    stride = rows
+    for level_number in range(wbs_depth):
+        stride = max(1, stride // branching)
+        level = pd.Series((row_numbers // stride) % branching + 1).astype(str)
+        wbs = level if level_number == 0 else wbs.str.cat(level, sep='.')
+
+    # dates
+    starts = pd.Timestamp(start_date) + pd.to_timedelta(
+        rng.integers(0, date_spread, rows), unit='D')
+    durations = pd.to_timedelta(rng.integers(1, 365, rows), unit='D')
+    is_milestone = rng.random(rows) < milestone_density
+    durations = durations.where(~is_milestone, pd.Timedelta(0))
+
+    # predecessors from the previous 50 rows
+    predecessors = pd.Series('', index=row_numbers)
+    for _ in range(fan_in):
+        predecessor = row_numbers - rng.integers(1, 50, rows)
+        use = (predecessor >= 0) & (rng.random(rows) < 0.8)
+        predecessor = pd.Series(np.where(use, (predecessor + 1).astype(str), ''))
+        joiner = np.where((predecessors != '') & (predecessor != ''), ',', '')
+        predecessors = predecessors + joiner + predecessor
+
+    milestones = np.array(MILESTONE_COLUMNS[:5])[rng.integers(0, 5, rows)]
+
+    df = pd.DataFrame({
+        'id': (row_numbers + 1).astype(str),
+        'WBS': wbs,
+        'activity_name': 'activity ' + pd.Series(row_numbers + 1).astype(str),
+        'start': starts,
+        'end': starts + durations,
+        'predecessors': predecessors,
+        'milestone': np.where(is_milestone, milestones, ''),
+        })
+    df.loc[is_milestone, 'activity_name'] = (
+        df.activity_name[is_milestone] + ' (' + df.milestone[is_milestone] + ')')
+
+    for column in MILESTONE_COLUMNS:
+        has_milestone = (~is_milestone) & (rng.random(rows) < milestone_density)
+        offsets = pd.to_timedelta(rng.integers(0, 365, rows), unit='D')
+        df[column] = (starts + offsets).where(has_milestone)
+
+    return df
+
+
+def write_csv(df, filename):
+    """ writes a schedule as a csv file that import_csv can read """
+    output = df.drop(columns=MILESTONE_COLUMNS, errors='ignore').copy()
+    output.start = output.start.dt.strftime('%d/%m/%Y')
+    output.end = output.end.dt.strftime('%d/%m/%Y')
+    output.to_csv(filename, index=False)
+    return filename
+
+
+def write_excel(df, filename):
+    """ writes a schedule as an excel file that import_excel can read """
+    df.drop(columns=MILESTONE_COLUMNS, errors='ignore').to_excel(filename, index=False)
+    return filename
+
+
+def write_mpp_xml(df, filename):
+    """ writes a schedule as a minimal ms project xml file that import_mpp_xml can read """
+    output = df[['id', 'WBS', 'activity_name', 'start', 'end', 'predecessors']].copy()
+    output.start = df.start + pd.Timedelta(hours=8)
+    output.end = (df.end + pd.Timedelta(hours=17)).where(df.start != df.end, output.start)
+    return export_mpp_xml(output, filename)
+
+
+WRITERS = {'csv': write_csv,
+           'xlsx': write_excel,
+           'xml': write_mpp_xml}
@@ -1,11 +1,22 @@
 """ __init__ file for giganttic
 """
-# from .classes import *
 from .data_import import *
 from .data_modify import *
 from .data_export import *
-from .mpl_gantt import gantt_chart as mpl_gantt
+from .data_validate import *
+from .data_filter import FilterIndex, Selection
+from .data_sql import SQLSource, import_sql
+from .hierarchy import rollup, collapse
+from .mpl_gantt import gantt_chart as mpl_gantt, loading_chart, new_figure, get_figure_style
 from .plotly_gantt import gantt_chart as plotly_gantt
 from .plotting_extras import plot_by_column, get_fontsize
-from .colours import get_colours
+from .colours import get_colours, ColourRegistry
+from .incremental import IncrementalGantt, diff_schedules
+from .classes import Giganttic
+from .parallel import SharedFrame, FrameView, map_shared
+from .partitioned import (PartitionedSchedule, partition_frames, partition_csv,
+                          prepare_partitions, render_partitions)
+from .profiling import (profiling, stage, get_collector,
+                        LoggingCollector, JSONLinesCollector, ListCollector)
+from .server import RenderServer, render_payload
 from .giganttic import *
@@ -2,65 +2,251 @@
 """
 Created on Tue Sep 19 16:18:29 2023
 
+a giganttic session, which keeps the result of each stage of the
+import → clean → milestones → layout → colours → render pipeline,
+and only re-runs the stages whose inputs have changed.
+
+    session = Giganttic('plan.xlsx', fillcolumn='WBS', connections=True)
+    session.render()
+    session.set_options(cmap_fill=['#002F56', '#D06F1A'])
+    session.render()  # only get_colours and the render are re-run
+    session.save_images('plan.png')
+
 @author: dhancock
 """
 
-# from pandas import DataFrame
-from plotly import graph_objects as go
-from .import_functions import import_csv, import_excel, import_mpp_xml, import_list
+import glob
+import inspect
+import os
+import time
+from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
+from .data_import import import_file, import_files, import_list
+from . import data_modify
+from .colours import get_colours
+from .hierarchy import collapse
+from .mpl_gantt import gantt_chart as mpl_gantt_chart, add_axis_dates
+from .plotly_gantt import gantt_chart as plotly_gantt_chart
+from .profiling import stage
+
+# each stage: (the stage it depends on, the options it uses)
+# render uses every option, except those for stages gantt_chart would repeat
+STAGES = {'import': (None, ['sheet', 'headers', 'columns']),
+          'clean': ('import', ['baseline_data', 'filter_string']),
+          'milestones': ('clean', ['milestone_columns', 'flatten_milestones']),
+          'layout': ('milestones', ['collapse_depth', 'pack_rows', 'numerical_dates']),
+          # every named argument of get_colours, so that new ones can't be missed,
+          # and save_colours, which it reads from its kwargs
+          'colours': ('layout', [name for name, parameter
+                                 in inspect.signature(get_colours).parameters.items()
+                                 if name != 'df' and parameter.kind is not parameter.VAR_KEYWORD]
+                      + ['save_colours']),
+          'render': ('colours', None)}
+
+
+def _freeze(value):
+    """ a comparable version of an option value """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, str) and os.path.isfile(value):
+        # files are re-read if they change
+        return (value, os.path.getmtime(value))
+    try:
+        hash(value)
+    except TypeError:
+        return ('id', id(value))
+    return value
 
 
 class Giganttic():
-    figure = {}
-    colours = {}
-    files = {}
-
-    def __init__(self, **kwargs):
-        self.files = kwargs.get('files', None)
-        self.figure = self.Figure()
-        self.colours = self.Colours()
-        self.data_source = kwargs.get('data_source', None)
-        if self.data_source is not None:
-            self.rawdata = self.import_data(self.data_source)
-
-    def import_data(self, data_source):
+    """
+    a gantt chart session, which caches the result of each stage
+
+    Parameters
+    ----------
+    data_source : str | list | pandas.DataFrame, optional
+        file, glob pattern, list of files, list of rows, or dataframe
+    plot_type : str, optional
+        'matplotlib' or 'plotly'. The default is 'matplotlib'.
+    **kwargs :
+        options for the stages (see STAGES), and for gantt_chart
+
+    Attributes
+    ----------
+    stats : dict
+        hits, misses and seconds (time spent running) for each stage
+    """
+
+    def __init__(self, data_source=None, plot_type='matplotlib', **kwargs):
+        assert plot_type in ['matplotlib', 'plotly'], 'plot_type must be "matplotlib" or "plotly"'
+        self.data_source = data_source
+        self.plot_type = plot_type
+        self.options = dict(kwargs, data_source=data_source, plot_type=plot_type)
+        self.import_report = None
+        self._cache = {}
+        self._versions = {name: 0 for name in STAGES}
+        self.stats = {name: {'hits': 0, 'misses': 0, 'seconds': 0.0} for name in STAGES}
+
+    def set_options(self, **kwargs):
+        """
+        changes options. The stages that use them are re-run the next
+        time their results are needed
+        """
+        if 'data_source' in kwargs:
+            self.data_source = kwargs['data_source']
+        if 'plot_type' in kwargs:
+            assert kwargs['plot_type'] in ['matplotlib', 'plotly'], \
+                'plot_type must be "matplotlib" or "plotly"'
+            self.plot_type = kwargs['plot_type']
+        self.options.update(kwargs)
+
+    def invalidate(self, name=None):
+        """
+        drops the cached result of a stage and every stage after it,
+        or of every stage if name is None
+        """
+        assert name is None or name in STAGES, f'stage must be one of {list(STAGES)}'
+        names = list(STAGES)
+        for stage_name in names[names.index(name) if name is not None else 0:]:
+            self._cache.pop(stage_name, None)
+
+    def _stage_options(self, name):
+        options = STAGES[name][1]
+        if name == 'import':
+            options = ['data_source'] + options
+        elif name == 'render':
+            options = sorted(k for k in self.options
+                             if k not in ['data_source', 'plot_type', 'collapse_depth'])
+        return {k: self.options[k] for k in options if k in self.options}
+
+    def _run(self, name):
+        """ the result of a stage, from the cache if nothing it depends on has changed """
+        dependency = STAGES[name][0]
+        if dependency is not None:
+            self._run(dependency)
+        options = self._stage_options(name)
+        key = (None if dependency is None else self._versions[dependency],
+               _freeze(options))
+
+        if name in self._cache and self._cache[name][0] == key:
+            self.stats[name]['hits'] += 1
+            return self._cache[name][1]
+
+        previous = None if dependency is None else self._cache[dependency][1]
+        started = time.perf_counter()
+        with stage(f'session {name}'):
+            result = getattr(self, STAGE_METHODS[name])(previous, **options)
+        self.stats[name]['seconds'] += time.perf_counter() - started
+        self.stats[name]['misses'] += 1
+        self._versions[name] += 1
+        self._cache[name] = (key, result)
+        return result
+
+    def cache_stats(self):
+        """ the hits, misses, seconds and whether it's cached, for each stage """
+        return {name: dict(stats, cached=name in self._cache)
+                for name, stats in self.stats.items()}
+
+    # the stages
+
+    def import_data(self, previous=None, data_source=None, **kwargs):
+        """ imports the data source """
+        data_source = self.data_source if data_source is None else data_source
+        if hasattr(data_source, 'columns'):
+            return data_source.copy()
         assert isinstance(data_source, (str, list)), f'{data_source}'
-        if isinstance(data_source, str):
-            import_functions = {
-                'csv': import_csv,
-                'xlsx': import_excel,
-                'xml': import_mpp_xml}
-            for file_extension in import_functions:
-                if data_source.endswith(file_extension):
-                    data = import_functions[file_extension](data_source)
+        options = {k: kwargs[k] for k in ['headers', 'columns'] if k in kwargs}
+        if isinstance(data_source, str) and not glob.has_magic(data_source):
+            data = import_file(data_source, sheet=kwargs.get('sheet', 0), **options)
+        elif isinstance(data_source, str) or all(isinstance(x, str) for x in data_source):
+            data, self.import_report = import_files(data_source, sheet=kwargs.get('sheet', 0),
+                                                    **options)
         else:
             data = import_list(data_source)
         return data
 
-    def cleanup_data(self, **kwargs):
-        pass
+    def cleanup_data(self, df, baseline_data=None, filter_string=None):
+        """ compares with the baseline and filters the data """
+        if baseline_data is not None:
+            baseline = self.import_data(data_source=baseline_data)
+            df = data_modify.compare_schedules(baseline, df)
+        if filter_string is not None:
+            df = data_modify.filter_data(df.copy(), filter_string[0], filter_string[1])
+        return df
+
+    def get_milestones(self, df, milestone_columns=None, flatten_milestones=False):
+        """ extracts milestone columns into rows and flattens milestones """
+        if milestone_columns is not None:
+            df = data_modify.extract_milestones(df.copy(), milestone_columns)
+        if flatten_milestones is True:
+            df = data_modify.flatten_milestones(df.copy())
+        return df
+
+    def setup_layout(self, df, collapse_depth=None, pack_rows=False, numerical_dates=False):
+        """ collapses the WBS, packs rows, and converts dates to axis coordinates """
+        if collapse_depth is not None:
+            df = collapse(df, collapse_depth)
+        if pack_rows is not False:
+            group_column = pack_rows if isinstance(pack_rows, str) else 'WBS'
+            df = data_modify.pack_rows(df, group_column=group_column)
+        return add_axis_dates(df.copy(), numerical_dates=numerical_dates)
+
+    def get_colours(self, df, **kwargs):
+        """ adds the colour columns. Returns (df, cmaps) """
+        return get_colours(df.copy(), **kwargs)
+
+    def draw(self, coloured, **kwargs):
+        """ draws the chart. Returns (ax, fig) """
+        df, cmaps = coloured
+        self.close()
+        if self.plot_type == 'plotly':
+            return plotly_gantt_chart(df.copy(), cmaps=cmaps, **kwargs)
+        return mpl_gantt_chart(df.copy(), cmaps=cmaps, **kwargs)
+
+    # results
+
+    @property
+    def data(self):
+        """ the data as it is drawn, with layout and colour columns """
+        return self._run('colours')[0]
 
-    def setup_figure(self, **kwargs):
-        pass
+    def render(self):
+        """
+        runs whichever stages are out of date
 
-    def save_images(self, **kwargs):
-        pass
+        Returns
+        -------
+        ax : matplotlib.axes._axes.Axes
 
-    class Figure(go.Figure):
-        options = {}
+        figure : matplotlib.figure.Figure | plotly.graph_objects.Figure
+        """
+        return self._run('render')
 
-        def __init__(self, **kwargs):
-            super().__init__()
-            self.options = kwargs.get('figure', None)
-            pass
+    def save_images(self, output_file):
+        """ renders, if needed, and saves the figure """
+        _, fig = self.render()
+        with stage('savefig', file=output_file):
+            if isinstance(fig, Figure):
+                fig.savefig(output_file)
+            elif output_file.endswith('.html'):
+                fig.write_html(output_file)
+            else:
+                fig.write_image(output_file)
+        return output_file
 
-        def plot(self):
-            pass
+    def close(self):
+        """ closes the matplotlib figure, if there is one """
+        if 'render' in self._cache:
+            fig = self._cache['render'][1][1]
+            if isinstance(fig, Figure):
+                plt.close(fig)
 
-    class Colours(dict):
-        options = {}
 
-        def __init__(self, **kwargs):
-            super().__init__()
-            self.options = kwargs.get('colours', None)
-            pass
+STAGE_METHODS = {'import': 'import_data',
+                 'clean': 'cleanup_data',
+                 'milestones': 'get_milestones',
+                 'layout': 'setup_layout',
+                 'colours': 'get_colours',
+                 'render': 'draw'}
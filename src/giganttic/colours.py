@@ -5,9 +5,170 @@ Created on Mon Oct  2 16:55:00 2023
 @author: dhancock
 """
 
+import hashlib
+import json
+import logging
+import os
+import numpy as np
 import pandas as pd
 from itertools import cycle
 from matplotlib import colors, colormaps
+import matplotlib.dates as mdates
+
+logger = logging.getLogger('giganttic')
+
+
+def _stable_hash(value):
+    """ a hash of str(value) which is the same in every python session """
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf8'), digest_size=8).digest(),
+                          'little')
+
+
+class ColourRegistry():
+    """
+    remembers the colour given to each value of each column, so that a value
+    has the same colour in every chart, e.g. every figure of plot_by_column,
+    and in every run if it has a file.
+
+    New values are hashed into the colourmap, moving on to the next free
+    colour if that one has already been used. A value keeps its colour once it
+    has one, but the colour a new value gets can depend on which values were
+    registered before it, if they took its colour first.
+    New colours are written to the file by save(), which get_colours
+    calls once each time it is run.
+
+    Parameters
+    ----------
+    filename : str, optional
+        json file to load the colours from and save new ones to
+    slots : int, optional
+        number of colours to use from colourmaps with more than 30 colours
+        (e.g. viridis), spaced evenly along it. The default is 64.
+    """
+
+    def __init__(self, filename=None, slots=64):
+        self.filename = filename
+        self.slots = slots
+        self.colours = {}
+        self.unsaved = False
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'r', encoding='utf8') as file_object:
+                self.colours = json.load(file_object)
+
+    def _palette(self, colourmap):
+        """ (key, list of hex colours) for a colourmap """
+        try:
+            palette = list(colourmap.colors)
+        except AttributeError:
+            palette = []
+        if len(palette) == 0 or len(palette) > 30:
+            palette = [colourmap(x) for x in np.linspace(0, 1, self.slots)]
+        palette = [colors.to_hex(c) for c in palette]
+        key = colourmap.name
+        if isinstance(colourmap, colors.ListedColormap):
+            key += ':' + hashlib.blake2b(''.join(palette).encode(), digest_size=4).hexdigest()
+        return key, palette
+
+    def assign(self, column, values, colourmap):
+        """
+        gives a colour to any of the values which don't have one yet
+
+        Returns
+        -------
+        colours : dict
+            {str(value): hex colour} for every value of column so far
+        """
+        key, palette = self._palette(colourmap)
+        assigned = self.colours.setdefault(f'{column}|{key}', {})
+        new_values = [v for v in pd.unique(pd.Series(values).dropna().astype(str))
+                      if v not in assigned]
+        if len(new_values) == 0:
+            return assigned
+
+        used = set(assigned.values())
+        for value in sorted(new_values):
+            slot = _stable_hash(value) % len(palette)
+            if len(used) < len(palette):
+                while palette[slot] in used:
+                    slot = (slot + 1) % len(palette)
+            assigned[value] = palette[slot]
+            used.add(palette[slot])
+        self.unsaved = True
+        return assigned
+
+    def lookup(self, column, values, colourmap):
+        """
+        the colour of each value, assigning new ones as needed
+
+        Parameters
+        ----------
+        column : str
+
+        values : pandas.Series
+
+        colourmap : matplotlib.colors.Colormap
+
+        Returns
+        -------
+        colours : numpy.ndarray
+            hex colours, or None for missing values
+        """
+        codes, uniques = pd.factorize(values.astype(object).where(values.notna(), None))
+        assigned = self.assign(column, uniques, colourmap)
+        palette = np.array([assigned[str(v)] for v in uniques] + [None], dtype=object)
+        return palette[codes]
+
+    def save(self):
+        """ writes the colours to the file, if there is one and there are new colours """
+        if self.filename is not None and self.unsaved:
+            with open(self.filename, 'w', encoding='utf8') as file_object:
+                json.dump(self.colours, file_object, indent=1)
+        self.unsaved = False
+
+
+def continuous_colours(values, colourmap, vmin=None, vmax=None):
+    """
+    maps a numeric, timedelta or datetime column through a colourmap
+    in one go, instead of giving each value its own colour
+
+    Parameters
+    ----------
+    values : pandas.Series
+
+    colourmap : matplotlib.colors.Colormap
+
+    vmin, vmax : float, optional
+        the values at each end of the colourmap. The defaults are the
+        smallest and largest values (in days for timedeltas and
+        matplotlib date numbers for datetimes)
+
+    Returns
+    -------
+    colours : numpy.ndarray
+        hex colours, or None for missing values
+    norm : matplotlib.colors.Normalize
+
+    units : str
+        'days' for timedeltas, 'date' for datetimes, otherwise ''
+    """
+    if pd.api.types.is_timedelta64_dtype(values):
+        numbers, units = (values / pd.Timedelta(days=1)).to_numpy(dtype=float), 'days'
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        numbers, units = mdates.date2num(values), 'date'
+    else:
+        numbers, units = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float), ''
+    missing = np.isnan(numbers)
+    if missing.all():
+        return np.full(len(numbers), None, dtype=object), colors.Normalize(0, 1), units
+
+    norm = colors.Normalize(np.nanmin(numbers) if vmin is None else vmin,
+                            np.nanmax(numbers) if vmax is None else vmax)
+    rgb = (colourmap(norm(np.where(missing, norm.vmin, numbers)))[:, :3] * 255 + 0.5).astype(int)
+    packed = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    codes, uniques = pd.factorize(packed)
+    colours = np.array([f'#{c:06x}' for c in uniques], dtype=object)[codes]
+    colours[missing] = None
+    return colours, norm, units
 
 
 def get_colours(df,
@@ -21,10 +182,13 @@ def get_colours(df,
                 default_fill="#002F56",
                 default_border=None,
                 recolour=False,
+                colour_registry=None,
+                continuous_fill=False,
+                fill_range=None,
                 **kwargs
                 ):
     if manual_colours is True:
-        print('manual colours')
+        logger.info('manual colours')
         return df, "Manual colours selected"
     """
     gets colours for the dataframe
@@ -44,6 +208,17 @@ def get_colours(df,
         event fill if cannot be found
     default_border : TYPE, optional
         event border colour
+    colour_registry : ColourRegistry, optional
+        takes the fill and border colours from a registry, so that values
+        have the same colours in every chart. New colours are saved at the
+        end, unless save_colours=False is passed
+    continuous_fill : bool | str, optional
+        map a numeric, timedelta or datetime fillcolumn through cmap_fill
+        continuously, instead of giving each value its own colour (see
+        continuous_colours). 'auto' does this when the column is numeric and
+        has more values than cmap_fill has colours. The default is False.
+    fill_range : tuple, optional
+        (vmin, vmax) for continuous_fill. The default is the range of the values.
     **kwargs : TYPE
         DESCRIPTION.
 
@@ -52,7 +227,8 @@ def get_colours(df,
     df
 
     cmaps: dict
-        keys are 'fillcolour', 'bordercolour', 'custommcolour'
+        keys are 'fillcolour', 'bordercolour', 'custommcolour',
+        and 'fill_norm' and 'fill_units' with continuous_fill
 
     """
 
@@ -70,9 +246,9 @@ def get_colours(df,
             colours = [colourmap(x/nvalues) for x in range(nvalues)]
         elif nvalues > ncolours:
             # case - not enough colours
-            print(f'WARNING: more values in {df_column.name} than colours in {colourmap.name}')
-            print(f'trying to map {len(values)} values to {len(colourmap.colors)} colours')
-            print('this will result in duplicate colours')
+            logger.warning('more values in %s than colours in %s: mapping %s values to %s '
+                           'colours will result in duplicate colours',
+                           df_column.name, colourmap.name, len(values), len(colourmap.colors))
 
             iterator = cycle(colourmap.colors)
             colours = [next(iterator) for x in range(nvalues)]
@@ -98,7 +274,24 @@ def get_colours(df,
             df[colourcolumn] = None
 
     # set the fill colour
-    if fillcolumn is not None:
+    fill_norm, fill_units = None, None
+    if fillcolumn is not None and continuous_fill == 'auto':
+        continuous_fill = (
+            (pd.api.types.is_numeric_dtype(df[fillcolumn])
+             or pd.api.types.is_timedelta64_dtype(df[fillcolumn]))
+            and df[fillcolumn].nunique() > len(getattr(cmap_fill, 'colors', [None] * cmap_fill.N)))
+
+    if fillcolumn is not None and continuous_fill is True:
+        fills, fill_norm, fill_units = continuous_colours(
+            df[fillcolumn], cmap_fill, *(fill_range if fill_range is not None else (None, None)))
+        missing = df.fillcolour.isna().to_numpy()
+        df.loc[missing, 'fillcolour'] = fills[missing]
+        df.loc[df.fillcolour.isna(), 'fillcolour'] = default_fill
+    elif fillcolumn is not None and colour_registry is not None:
+        missing = df.fillcolour.isna().to_numpy()
+        df.loc[missing, 'fillcolour'] = colour_registry.lookup(
+            fillcolumn, df[fillcolumn], cmap_fill)[missing]
+    elif fillcolumn is not None:
         fill_dict = get_colour_dict(df[fillcolumn], cmap_fill)
         # print(f'DEBUG: {fill_dict}')
         df.loc[df.fillcolour.isna(), 'fillcolour'] = df[fillcolumn].map(fill_dict.get)
@@ -106,11 +299,17 @@ def get_colours(df,
         df.fillcolour = default_fill
 
     # set the border colour
-    if bordercolumn is not None:
+    if bordercolumn is not None and colour_registry is not None:
+        missing = df.bordercolour.isna().to_numpy()
+        df.loc[missing, 'bordercolour'] = colour_registry.lookup(
+            bordercolumn, df[bordercolumn], cmap_border)[missing]
+    elif bordercolumn is not None:
         border_dict = get_colour_dict(df[bordercolumn], cmap_border)
         df.loc[df.bordercolour.isna(), 'bordercolour'] = df[bordercolumn].map(border_dict.get)
     else:
         df.bordercolour = default_border
+    if colour_registry is not None and kwargs.get('save_colours', True) is True:
+        colour_registry.save()
 
     # populate any custom colours
     if customcolours is not None:
@@ -119,10 +318,13 @@ def get_colours(df,
                    ['fillcolour', 'customcolour']] = customcolours.get(term)
 
     cmaps = {'fill': cmap_fill, 'border': cmap_border, 'custom': customcolours}
+    if fill_norm is not None:
+        cmaps.update(fill_norm=fill_norm, fill_units=fill_units)
 
-    # convert all notna colours to hex
+    # convert all notna colours to hex, converting each colour once
     for colourcolumn in ('fillcolour', 'bordercolour', 'customcolour'):
-        df.loc[df[colourcolumn].notna(), colourcolumn] = df.loc[
-            df[colourcolumn].notna(), colourcolumn].map(colors.to_hex)
+        notna = df[colourcolumn].notna()
+        hex_colours = {c: colors.to_hex(c) for c in df.loc[notna, colourcolumn].unique()}
+        df.loc[notna, colourcolumn] = df.loc[notna, colourcolumn].map(hex_colours)
 
     return df, cmaps
@@ -6,14 +6,78 @@ Created on Mon Sep 25 14:40:53 2023
 @author: dhancock
 """
 
+import base64
+import gzip
+import html as html_module
+import json
+import logging
 import os
+from xml.sax.saxutils import XMLGenerator
+import numpy as np
+import pandas as pd
 from matplotlib import pyplot as plt
+from .colours import get_colours
+from .data_import import _id_strings
+from .mpl_gantt import gantt_chart, fit_layout
+from .parallel import map_shared
+from .profiling import stage
 
+logger = logging.getLogger('giganttic')
 
-def save_figures(df, ax, fig, title, outputdir, maxlines=60):
+# trace and shape keys which differ from item to item; everything else is style
+VALUE_KEYS = {'data': ['x', 'y', 'text', 'name', 'customdata', 'hovertext', 'ids'],
+              'shapes': ['x0', 'x1', 'y0', 'y1', 'path', 'name'],
+              'annotations': ['x', 'y', 'ax', 'ay', 'text', 'name']}
+
+COMPACT_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotlyjs}"></script>
+</head>
+<body style="margin:0">
+<div id="giganttic" style="width:100%;height:100vh"></div>
+<script>
+const spec = {spec};
+function expand(table) {{
+    return table.items.map(([style, values]) => Object.assign(
+        JSON.parse(JSON.stringify(table.styles[style])), values));
+}}
+for (const key of ['shapes', 'annotations']) {{
+    if (spec.layout[key]) {{ spec.layout[key] = expand(spec.layout[key]); }}
+}}
+Plotly.newPlot('giganttic', expand(spec.data), spec.layout, spec.config);
+</script>
+</body>
+</html>
+"""
+
+
+def _save_page(view, task):
+    """ draws and saves one page of save_figures in a worker process """
+    positions, ylim, xlim, page_title, figure_filename, kwargs = task
+    ax, fig = gantt_chart(view.select(positions), page_title, tight_layout=False, **kwargs)
+    ax.tick_params(labelsize=10)
+    fig.set_dpi(60)
+    width = 15  # inches
+    fig.set_size_inches(width, width*2**0.5)
+    fit_layout(fig, ax, ax.yaxis.get_major_formatter().format_ticks(ax.get_yticks()), 10, pad=1.1)
+    ax.set_xlim(xlim)
+    ax.set_ylim(ylim)
+    fig.savefig(figure_filename, dpi=300)
+    plt.close(fig)
+    return figure_filename
+
+
+def save_figures(df, ax, fig, title, outputdir, maxlines=60, processes=None, **kwargs):
     """ Splits up an existing gantt chart into separate images,
     with a maximum number of rows given by maxlines and saves them.
 
+    With processes, each page is drawn again from df and saved by a pool of
+    worker processes, which share df through memory-mapped files
+    (see giganttic.parallel), instead of saving the whole figure once per page.
+
     Parameters
     ----------
     df : TYPE
@@ -28,6 +92,11 @@ def save_figures(df, ax, fig, title, outputdir, maxlines=60):
         DESCRIPTION.
     maxlines : TYPE, optional
         DESCRIPTION. The default is 60.
+    processes : int, optional
+        number of worker processes. The default is None, which saves
+        every page from fig in this process.
+    **kwargs :
+        passed to gantt_chart for each page, when processes is given
 
     Returns
     -------
@@ -39,43 +108,291 @@ def save_figures(df, ax, fig, title, outputdir, maxlines=60):
     number_of_rows = len(ylocs)
     number_of_figures = round(len(ylocs)/maxlines)
 
-    print(f'total number of rows: {number_of_rows}')
-    print(f'number of figures: {number_of_figures}')
-
     if outputdir.endswith('/'):
         outputdir = outputdir[:-1]
-        print('stripped trailing / from outputdir')
+        logger.info('stripped trailing / from outputdir')
     if os.path.exists(outputdir) is False:
         os.mkdir(outputdir)
-        print(f'created new directory: {outputdir}')
+        logger.info('created new directory: %s', outputdir)
 
     # resize and set layout
-    plt.rcParams.update({'font.size': 10})
+    ax.tick_params(labelsize=10)
     fig.set_dpi(60)
     width = 15  # inches
     fig.set_size_inches(width, width*2**0.5)
-    plt.tight_layout(pad=1.1)
+    fit_layout(fig, ax, ax.yaxis.get_major_formatter().format_ticks(ax.get_yticks()), 10, pad=1.1)
 
     # set the y axis limits to chunks of the whole and save individual files
     start, stop = 0, 0
 
     figure_files = []
-    while stop < len(ylocs):
-        stop = start + maxlines
-        if stop > len(ylocs):
-            stop = len(ylocs)
-            if stop - start < 5:
-                start = stop - 10
-        ymin = ylocs[start]
-        ymax = ylocs[stop-1]
-
-        # ax.set_ylim((stop+1, start-1))
-        ax.set_ylim((ymax+1, ymin-1))
-        ax.set_title(f'{title} (rows {start}-{stop})')
-        figure_filename = f'{outputdir}/{title} - {start}-{stop}.png'
-        fig.savefig(figure_filename, dpi=300)
-        figure_files.append(figure_filename)
-        print(f'Plotted lines {start} to {stop}')
-        start += maxlines
+    pages = []
+    with stage('save_figures', rows=number_of_rows, figures=number_of_figures):
+        while stop < len(ylocs):
+            stop = start + maxlines
+            if stop > len(ylocs):
+                stop = len(ylocs)
+                if stop - start < 5:
+                    start = stop - 10
+            ymin = ylocs[start]
+            ymax = ylocs[stop-1]
+
+            figure_filename = f'{outputdir}/{title} - {start}-{stop}.png'
+            if processes is not None:
+                pages.append((ymin, ymax, f'{title} (rows {start}-{stop})', figure_filename))
+            else:
+                # ax.set_ylim((stop+1, start-1))
+                ax.set_ylim((ymax+1, ymin-1))
+                ax.set_title(f'{title} (rows {start}-{stop})')
+                with stage('savefig', rows=stop-start, file=figure_filename):
+                    fig.savefig(figure_filename, dpi=300)
+            figure_files.append(figure_filename)
+            start += maxlines
+
+        if processes is not None:
+            # colour the whole schedule once, so every page matches
+            cmaps = kwargs.pop('cmaps', None)
+            if cmaps is None:
+                df, cmaps = get_colours(df.copy(), **kwargs)
+            yvalues = df.yvalue.to_numpy()
+            xlim = ax.get_xlim()
+            tasks = [(np.flatnonzero((yvalues >= ymin) & (yvalues <= ymax)),
+                      (ymax+1, ymin-1), xlim, page_title, figure_filename,
+                      dict(kwargs, cmaps=cmaps))
+                     for ymin, ymax, page_title, figure_filename in pages]
+            with stage('save_figures pool', figures=len(tasks), processes=processes):
+                map_shared(_save_page, df.reset_index(drop=True), tasks, processes)
 
     return figure_files
+
+
+def _typed_array(values, min_length=8):
+    """
+    encodes a list of numbers, or of ISO date strings (as milliseconds,
+    which plotly reads as dates on a date axis), as a plotly typed array
+    {'dtype': 'f8', 'bdata': base64}. Returns None if it can't be encoded.
+    """
+    if not isinstance(values, list) or len(values) < min_length:
+        return None
+    present = [v for v in values if v is not None]
+    if len(present) == 0:
+        return None
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        array = np.array([np.nan if v is None else v for v in values], dtype='f8')
+    elif all(isinstance(v, str) and len(v) >= 10 and v[4] == '-' and v[7] == '-'
+             for v in present):
+        try:
+            dates = np.array([v.replace(' ', 'T') if v is not None else 'NaT' for v in values],
+                             dtype='datetime64[ms]')
+        except ValueError:
+            return None
+        array = dates.astype('int64').astype('f8')
+        array[np.isnat(dates)] = np.nan
+    else:
+        return None
+    return {'dtype': 'f8', 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def _style_table(items, value_keys, min_length=8):
+    """
+    splits a list of traces or shapes into a table of distinct styles and,
+    for each item, the index of its style and its own values
+    """
+    styles = {}
+    table = []
+    for item in items:
+        style = {k: v for k, v in item.items() if k not in value_keys}
+        values = {k: item[k] for k in value_keys if k in item}
+        for key, value in values.items():
+            encoded = _typed_array(value, min_length)
+            if encoded is not None:
+                values[key] = encoded
+        style_key = json.dumps(style, sort_keys=True)
+        table.append([styles.setdefault(style_key, len(styles)), values])
+    return {'styles': [json.loads(k) for k in styles], 'items': table}
+
+
+def compact_figure_json(fig, config=None, min_length=8):
+    """
+    converts a plotly figure to a compact dictionary for write_compact_html:
+    long numeric and date arrays are base64 typed arrays, and the repeated
+    styles of traces, shapes and annotations are stored once
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure
+
+    config : dict, optional
+        plotly config. The default is {'responsive': True}.
+    min_length : int, optional
+        shortest array to encode. The default is 8.
+
+    Returns
+    -------
+    spec : dict
+        with data, layout and config
+    """
+    figure = json.loads(fig.to_json())
+    layout = figure.get('layout', {})
+    layout.pop('template', None)
+    for key in ['shapes', 'annotations']:
+        if key in layout:
+            layout[key] = _style_table(layout[key], VALUE_KEYS[key], min_length)
+    return {'data': _style_table(figure.get('data', []), VALUE_KEYS['data'], min_length),
+            'layout': layout,
+            'config': config or {'responsive': True}}
+
+
+def write_compact_html(fig, filename, plotlyjs='plotly.min.js', compress=False,
+                       title=None, config=None):
+    """
+    writes a plotly figure as a small html file which loads plotly.js from
+    a shared file instead of including it, so a batch of charts (e.g. from
+    plot_by_column) only has one copy of plotly.js.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure
+
+    filename : str
+
+    plotlyjs : str, optional
+        'cdn', a url, or a path relative to the html file, where plotly.js is
+        written if it's not already there. The default is 'plotly.min.js'.
+    compress : bool, optional
+        gzip the html and add .gz to the filename. The default is False.
+    title : str, optional
+        page title. The default is the figure title.
+    config : dict, optional
+        plotly config
+
+    Returns
+    -------
+    filename : str
+        the file written
+    """
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    if plotlyjs == 'cdn':
+        plotlyjs = f'https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'
+    elif '://' not in plotlyjs:
+        plotlyjs_file = os.path.join(os.path.dirname(os.path.abspath(filename)), plotlyjs)
+        if os.path.exists(plotlyjs_file) is False:
+            with open(plotlyjs_file, 'w', encoding='utf8') as file_object:
+                file_object.write(get_plotlyjs())
+
+    with stage('compact_figure_json', rows=len(fig.data)):
+        spec = compact_figure_json(fig, config)
+    if title is None:
+        title = fig.layout.title.text or 'giganttic'
+    html = COMPACT_HTML.format(
+        title=html_module.escape(title),
+        plotlyjs=plotlyjs,
+        spec=json.dumps(spec, separators=(',', ':')).replace('</', '<\\/'))
+
+    if compress is True:
+        filename = filename if filename.endswith('.gz') else f'{filename}.gz'
+        with gzip.open(filename, 'wt', encoding='utf8') as file_object:
+            file_object.write(html)
+    else:
+        with open(filename, 'w', encoding='utf8') as file_object:
+            file_object.write(html)
+    return filename
+
+
+def export_mpp_xml(df, filename, title=None, chunksize=10000):
+    """
+    writes a schedule as a ms project xml (MSPDI) file, which import_mpp_xml
+    and ms project can read. Tasks are written a chunk at a time with an
+    incremental xml writer, so memory doesn't grow with the number of tasks.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have start and end. id, WBS, OutlineLevel, activity_name and
+        predecessors (comma separated ids) are used if present. The WBS prefix
+        added to activity_name by import_mpp_xml is removed again
+    filename : str
+
+    title : str, optional
+        project title
+    chunksize : int, optional
+        rows formatted at a time. The default is 10000.
+
+    Returns
+    -------
+    filename : str
+
+    """
+
+    def column(chunk, name, default=''):
+        if name in chunk.columns:
+            return chunk[name].astype(object).where(chunk[name].notna(), default).astype(str)
+        return pd.Series(default, index=chunk.index, dtype=object)
+
+    def ids(values):
+        return _id_strings(values).astype(object).where(values.notna(), '')
+
+    def dates(values):
+        return values.dt.strftime('%Y-%m-%dT%H:%M:%S').astype(object).where(values.notna(), '')
+
+    def element(name, text):
+        if text != '':
+            writer.startElement(name, {})
+            writer.characters(text)
+            writer.endElement(name)
+
+    with stage('export_mpp_xml', rows=len(df), file=filename), \
+            open(filename, 'w', encoding='utf8', newline='\n') as file_object:
+        writer = XMLGenerator(file_object, encoding='utf-8', short_empty_elements=True)
+        writer.startDocument()
+        writer.startElement('Project', {'xmlns': 'http://schemas.microsoft.com/project'})
+        if title is not None:
+            element('Title', str(title))
+        writer.startElement('Tasks', {})
+
+        for first in range(0, len(df), chunksize):
+            chunk = df.iloc[first:first + chunksize]
+            row_numbers = [str(n) for n in range(first + 1, first + len(chunk) + 1)]
+            uids = ids(chunk.id) if 'id' in chunk.columns else pd.Series(
+                row_numbers, index=chunk.index)
+            wbs = column(chunk, 'WBS')
+            if 'OutlineLevel' in chunk.columns:
+                levels = pd.to_numeric(chunk.OutlineLevel, errors='coerce').fillna(1)
+            else:
+                levels = (wbs.str.count(r'\.') + 1).where(wbs != '', 1)
+            names = [name[len(code) + 1:] if code != '' and name.startswith(code + ' ') else name
+                     for name, code in zip(column(chunk, 'activity_name'), wbs)]
+            milestones = (chunk.start == chunk.end).map({True: '1', False: '0'})
+            summaries = column(chunk, 'summary', False).map({'True': '1'}).fillna('')
+
+            for values in zip(uids, row_numbers, names, wbs, levels.astype(int).astype(str),
+                              dates(chunk.start), dates(chunk.end), milestones, summaries,
+                              column(chunk, 'predecessors')):
+                uid, row_number, name, code, level, start, end, milestone, summary, links = values
+                writer.startElement('Task', {})
+                element('UID', uid)
+                element('ID', row_number)
+                element('Name', name)
+                element('WBS', code)
+                element('OutlineLevel', level)
+                element('Start', start)
+                element('Finish', end)
+                element('Milestone', milestone)
+                element('Summary', summary)
+                for link in links.split(','):
+                    # ids from a numeric column are written without their .0, like the UIDs
+                    link = link.strip().removesuffix('.0')
+                    if link != '':
+                        writer.startElement('PredecessorLink', {})
+                        element('PredecessorUID', link)
+                        element('Type', '1')
+                        writer.endElement('PredecessorLink')
+                writer.endElement('Task')
+                writer.ignorableWhitespace('\n')
+
+        writer.endElement('Tasks')
+        writer.endElement('Project')
+        writer.endDocument()
+
+    return filename
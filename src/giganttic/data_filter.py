@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+precompiled filters for giganttic
+
+FilterIndex builds inverted indexes (value -> rows) for the columns of a
+schedule once, so that repeated filters, e.g. one per group in plot_by_column
+or one per button in the plotly filter menu, don't rescan the whole column.
+
+    index = FilterIndex(df)
+    selection = (index.eq('WBS', '1.2') | index.contains('activity_name', 'design')) \
+        & ~index.milestones() & index.window('2024-01-01', '2024-06-30')
+    filtered = index.select(selection)
+
+@author: dhancock
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class Selection():
+    """
+    a set of rows of a FilterIndex, as a boolean mask.
+    Combine with & (and), | (or), ^ (xor) and ~ (not).
+    """
+
+    def __init__(self, mask):
+        self.mask = mask
+
+    def __and__(self, other):
+        return Selection(self.mask & other.mask)
+
+    def __or__(self, other):
+        return Selection(self.mask | other.mask)
+
+    def __xor__(self, other):
+        return Selection(self.mask ^ other.mask)
+
+    def __invert__(self):
+        return Selection(~self.mask)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mask))
+
+    @property
+    def positions(self):
+        """ row numbers in the selection, in order """
+        return np.flatnonzero(self.mask)
+
+
+class FilterIndex():
+    """
+    inverted indexes over the columns of a dataframe.
+    Each column's index is built the first time it's queried, then reused.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+
+    start_column, end_column : str, optional
+        date columns used by window() and milestones().
+        The defaults are 'start' and 'end'.
+    """
+
+    def __init__(self, df, start_column='start', end_column='end'):
+        self.df = df
+        self.start_column = start_column
+        self.end_column = end_column
+        self._values = {}
+        self._words = {}
+        self._dates = None
+        self._milestones = None
+
+    def __len__(self):
+        return len(self.df)
+
+    def _mask(self, positions):
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[positions] = True
+        return Selection(mask)
+
+    def _postings(self, codes, n_values):
+        """ rows for each code, as slices of one array sorted by code """
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(n_values + 1))
+        return order, bounds
+
+    def _value_index(self, column):
+        """ (uniques, {value: code}, codes, rows sorted by code, code boundaries) """
+        if column not in self._values:
+            codes, uniques = pd.factorize(self.df[column], use_na_sentinel=True)
+            lookup = {value: code for code, value in enumerate(uniques.tolist())}
+            self._values[column] = (uniques, lookup, codes,
+                                    *self._postings(codes, len(uniques)))
+        return self._values[column]
+
+    def _word_index(self, column):
+        """ ({word: code}, rows sorted by code, code boundaries) for lower case words """
+        if column not in self._words:
+            words = self.df[column].astype(str).str.lower().str.findall(r'\w+')
+            rows = np.repeat(np.arange(len(words)), words.str.len().to_numpy())
+            words = words.explode().dropna()
+            codes, uniques = pd.factorize(words)
+            lookup = {word: code for code, word in enumerate(uniques.tolist())}
+            order, bounds = self._postings(codes, len(uniques))
+            self._words[column] = (lookup, rows[order], bounds)
+        return self._words[column]
+
+    def _codes_to_selection(self, order, bounds, codes):
+        if len(codes) == 0:
+            return self._mask([])
+        return self._mask(np.concatenate([order[bounds[c]:bounds[c+1]] for c in codes]))
+
+    def all(self):
+        """ every row """
+        return Selection(np.ones(len(self.df), dtype=bool))
+
+    def eq(self, column, value):
+        """ rows where column equals value """
+        return self.isin(column, [value])
+
+    def isin(self, column, values):
+        """ rows where column is any of the values """
+        _, lookup, _, order, bounds = self._value_index(column)
+        codes = [lookup[v] for v in values if v in lookup]
+        return self._codes_to_selection(order, bounds, codes)
+
+    def notna(self, column):
+        """ rows where column has a value """
+        _, _, codes, _, _ = self._value_index(column)
+        return Selection(codes >= 0)
+
+    def contains(self, column, pattern, regex=True, case=True):
+        """
+        rows where column contains pattern, as str.contains, but only
+        testing each distinct value once
+        """
+        uniques, _, codes, _, _ = self._value_index(column)
+        matches = pd.Series(uniques).astype(str).str.contains(
+            pattern, regex=regex, case=case, na=False).to_numpy()
+        # the extra False is for missing values (code -1)
+        return Selection(np.append(matches, False)[codes])
+
+    def words(self, column, *words):
+        """ rows where column contains all of the whole words (not case sensitive) """
+        lookup, order, bounds = self._word_index(column)
+        selection = self.all()
+        for word in words:
+            code = lookup.get(word.lower(), None)
+            if code is None:
+                return self._mask([])
+            selection = selection & self._codes_to_selection(order, bounds, [code])
+        return selection
+
+    def groups(self, column):
+        """ a selection for each value of column, in the order they first appear """
+        uniques, _, _, order, bounds = self._value_index(column)
+        return {value: self._codes_to_selection(order, bounds, [code])
+                for code, value in enumerate(uniques.tolist())}
+
+    def _date_index(self):
+        if self._dates is None:
+            dates = []
+            for column in (self.start_column, self.end_column):
+                values = self.df[column].to_numpy()
+                rows = np.flatnonzero(pd.notna(values))
+                order = rows[np.argsort(values[rows], kind='stable')]
+                dates.append((values[order], order))
+            self._dates = dates
+        return self._dates
+
+    def window(self, start=None, end=None):
+        """ rows which overlap the dates from start to end (inclusive) """
+        (starts, start_order), (ends, end_order) = self._date_index()
+        started = start_order if end is None else \
+            start_order[:np.searchsorted(starts, np.datetime64(pd.Timestamp(end)), 'right')]
+        not_ended = end_order if start is None else \
+            end_order[np.searchsorted(ends, np.datetime64(pd.Timestamp(start)), 'left'):]
+        return self._mask(started) & self._mask(not_ended)
+
+    def milestones(self):
+        """ zero length rows """
+        if self._milestones is None:
+            self._milestones = Selection(
+                (self.df[self.start_column] == self.df[self.end_column]).to_numpy())
+        return self._milestones
+
+    def select(self, selection, reset_index=True):
+        """ the rows of the dataframe in a selection """
+        df = self.df.iloc[selection.positions]
+        return df.reset_index(drop=True) if reset_index is True else df
@@ -7,16 +7,116 @@ Created on Fri May  5 08:27:58 2023
 @author: dhancock
 """
 import csv
+import glob
+import logging
+import operator
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 from tkinter import Tk
 from tkinter.filedialog import askopenfilename
+import numpy as np
 import pandas as pd
 import xmltodict
 
+logger = logging.getLogger('giganttic')
+
+# formats tried by parse_dates, in order, before falling back to pandas' own inference
+DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M',
+                '%d/%m/%Y', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%d/%m/%y',
+                '%d-%m-%Y', '%d.%m.%Y', '%d-%b-%Y', '%d-%b-%y', '%d %b %Y', '%d %B %Y']
+MONTHFIRST_FORMATS = ['%m/%d/%Y', '%m/%d/%Y %H:%M', '%m/%d/%Y %H:%M:%S', '%m/%d/%y', '%m-%d-%Y']
+
+# excel serial dates count days from here (allowing for excel's 1900 leap year bug)
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+EXCEL_MAX_SERIAL = 2958465
+
+
+def _sniff_format(strings, formats):
+    """ returns the first format which parses all of the strings, or None """
+    for date_format in formats:
+        parsed = pd.to_datetime(strings, format=date_format, errors='coerce')
+        if parsed.notna().all():
+            return date_format
+    return None
+
+
+def parse_dates(values, dayfirst=True, sample=200, excel_serials=True):
+    """
+    converts a column of dates in any mix of strings, datetimes
+    and excel serial numbers to datetime64.
+    Schedules have far fewer distinct dates than rows, so only the
+    distinct values are parsed, and the format of the strings is found
+    from a sample, so pandas doesn't have to infer it for every value.
+    Strings which don't match the sniffed format are tried against the
+    other formats, then parsed by pandas; any that still fail become NaT.
+
+    Parameters
+    ----------
+    values : pandas.Series | list
+
+    dayfirst : bool, optional
+        prefer day first formats for ambiguous dates like 01/02/2024.
+        The default is True.
+    sample : int, optional
+        number of distinct strings used to sniff the format. The default is 200.
+    excel_serials : bool, optional
+        treat numbers as excel serial dates. The default is True.
+
+    Returns
+    -------
+    dates : pandas.Series
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+
+    # numbers, and strings of numbers, are excel serial dates
+    is_string = uniques.map(lambda x: isinstance(x, str)).to_numpy(dtype=bool)
+    strings = uniques[is_string].str.strip()
+    numbers = pd.to_numeric(uniques.where(~is_string, strings), errors='coerce')
+    is_serial = (numbers.notna() & numbers.between(1, EXCEL_MAX_SERIAL)).to_numpy() & excel_serials
+    if is_serial.any():
+        parsed[is_serial] = EXCEL_EPOCH + pd.to_timedelta(numbers[is_serial], unit='D')
+
+    # datetimes, timestamps and dates
+    others = ~is_string & ~is_serial & numbers.isna().to_numpy()
+    if others.any():
+        parsed[others] = pd.to_datetime(uniques[others], errors='coerce').astype('datetime64[ns]')
+
+    # strings: sniff a format, then try the others on anything left over
+    strings = strings[~is_serial[is_string]]
+    strings = strings[strings != '']
+    formats = DATE_FORMATS + MONTHFIRST_FORMATS if dayfirst else MONTHFIRST_FORMATS + DATE_FORMATS
+    while len(strings) > 0:
+        date_format = _sniff_format(strings.iloc[:sample], formats)
+        if date_format is None:
+            date_format = _sniff_format(strings.iloc[:1], formats)
+        if date_format is None:
+            parsed[strings.index] = pd.to_datetime(
+                strings, dayfirst=dayfirst, format='mixed', errors='coerce'
+                ).astype('datetime64[ns]')
+            break
+        dates = pd.to_datetime(strings, format=date_format, errors='coerce')
+        parsed[strings.index] = dates.astype('datetime64[ns]')
+        strings = strings[dates.isna()]
+        formats = [f for f in formats if f != date_format]
+
+    # map the parsed distinct values back to the rows
+    dates = np.append(parsed.to_numpy(), np.datetime64('NaT', 'ns'))[codes]
+    return pd.Series(dates, index=values.index, name=values.name)
+
 
 def import_csv(file, headers=True, columns=None, **kwargs):
     """
     headers: if the first line of the csv file has headers
     columns: if headers is false, use this list as dataframe columns
+    dayfirst: for ambiguous dates (see parse_dates). Default is True
     """
 
     with open(file, 'r', encoding="utf8") as file_object:
@@ -37,7 +137,7 @@ def import_csv(file, headers=True, columns=None, **kwargs):
             try:
                 dataframe.columns = columns
             except AssertionError:
-                print(f'Assumed columns were {columns}')
+                logger.error('assumed columns were %s', columns)
                 raise
 
     if all([
@@ -50,13 +150,11 @@ def import_csv(file, headers=True, columns=None, **kwargs):
             dataframe.start = dataframe.start.fillna(dataframe.end)
             dataframe.end = dataframe.end.fillna(dataframe.start)
         else:
-            # dataframe.start = pd.to_datetime(dataframe.start, dayfirst=True, format='mixed')
-            # dataframe.end = pd.to_datetime(dataframe.end, dayfirst=True, format='mixed')
-            dataframe.start = pd.to_datetime(dataframe.start, dayfirst=True, format='%d/%m/%Y')
-            dataframe.end = pd.to_datetime(dataframe.end, dayfirst=True, format='%d/%m/%Y')
+            dataframe.start = parse_dates(dataframe.start, dayfirst=kwargs.get('dayfirst', True))
+            dataframe.end = parse_dates(dataframe.end, dayfirst=kwargs.get('dayfirst', True))
 
     else:
-        print(f"{__name__}: WARNING - no start and end values defined")
+        logger.warning('no start and end values defined')
 
     if 'yvalue' in dataframe.columns:
         dataframe.yvalue = pd.to_numeric(dataframe.yvalue, errors='coerce')
@@ -75,7 +173,9 @@ def import_excel(file,
     ----------
     file : str
 
-    sheet : str, optional
+    sheet : str | int | list | None, optional
+        a sheet name or number, a list of them, or None for every sheet.
+        Multiple sheets are concatenated, with their names in a sheet column.
         The default is 0.
     **kwargs :
 
@@ -86,14 +186,16 @@ def import_excel(file,
     """
 
     dataframe = pd.read_excel(file, sheet)
+    if isinstance(dataframe, dict):
+        dataframe = pd.concat([normalise_columns(df).assign(sheet=name)
+                               for name, df in dataframe.items()],
+                              ignore_index=True)
 
     if all(["start" in dataframe.columns, "end" in dataframe.columns]):
-        # dataframe.start = pd.to_datetime(dataframe.start, dayfirst=True, format='mixed')
-        # dataframe.end = pd.to_datetime(dataframe.end, dayfirst=True, format='mixed')
-        dataframe.start = pd.to_datetime(dataframe.start, dayfirst=True)
-        dataframe.end = pd.to_datetime(dataframe.end, dayfirst=True)
+        dataframe.start = parse_dates(dataframe.start)
+        dataframe.end = parse_dates(dataframe.end)
     else:
-        print(f"{__name__}: WARNING - no start and end values defined")
+        logger.warning('no start and end values defined')
 
     return dataframe
 
@@ -117,8 +219,8 @@ def import_list(data,
     """
     dataframe = pd.DataFrame(data[1:], columns=data[0])
     dataframe.columns = dataframe.columns.str.lower()
-    dataframe.start = pd.to_datetime(dataframe.start, dayfirst=True)
-    dataframe.end = pd.to_datetime(dataframe.end, dayfirst=True)
+    dataframe.start = parse_dates(dataframe.start)
+    dataframe.end = parse_dates(dataframe.end)
 
     return dataframe
 
@@ -143,7 +245,11 @@ def import_mpp_xml(filename,
     with open(filename, 'r', encoding="utf8") as file_object:
         xml = xmltodict.parse(file_object.read())
 
-    df_all = pd.DataFrame(xml['Project']['Tasks']['Task'])
+    tasks = xml['Project']['Tasks']['Task']
+    df_all = pd.DataFrame([tasks] if isinstance(tasks, dict) else tasks)
+    if 'PredecessorLink' not in df_all.columns:
+        # no task has a predecessor
+        df_all['PredecessorLink'] = None
 
     df_all['predecessors'] = df_all.loc[df_all.PredecessorLink.map(
         lambda x: isinstance(x, dict)), 'PredecessorLink'].map(
@@ -155,14 +261,13 @@ def import_mpp_xml(filename,
                 lambda x: isinstance(x, list)), 'PredecessorLink'].map(
                     lambda x: ','.join([i['PredecessorUID'] for i in x]))
 
-    dataframe = df_all[['UID', 'WBS', 'Name', 'Start', 'Finish', 'predecessors']].copy()
+    columns = ['UID', 'WBS', 'OutlineLevel', 'Name', 'Start', 'Finish', 'predecessors']
+    dataframe = df_all[[c for c in columns if c in df_all.columns]].copy()
+    if 'OutlineLevel' in dataframe.columns:
+        dataframe.OutlineLevel = pd.to_numeric(dataframe.OutlineLevel, errors='coerce')
 
-    # datefmt = '%Y-%m-%dT%H:%M:%S'
-
-    # dataframe.Start = pd.to_datetime(dataframe.Start, format='mixed')
-    # dataframe.Finish = pd.to_datetime(dataframe.Finish, format='mixed')
-    dataframe.Start = pd.to_datetime(dataframe.Start)
-    dataframe.Finish = pd.to_datetime(dataframe.Finish)
+    dataframe.Start = parse_dates(dataframe.Start)
+    dataframe.Finish = parse_dates(dataframe.Finish)
 
     dataframe = dataframe.rename(columns={'UID': 'id',
                                           'Name': 'activity_name',
@@ -173,6 +278,338 @@ def import_mpp_xml(filename,
     return dataframe
 
 
+# columns kept from each primavera xer table, everything else is skipped while reading
+XER_COLUMNS = {'TASK': ['task_id', 'proj_id', 'wbs_id', 'task_code', 'task_name', 'task_type',
+                        'act_start_date', 'act_end_date', 'early_start_date', 'early_end_date',
+                        'target_start_date', 'target_end_date'],
+               'TASKPRED': ['task_id', 'pred_task_id', 'pred_type'],
+               'PROJWBS': ['wbs_id', 'parent_wbs_id', 'wbs_short_name']}
+
+
+def read_xer_tables(filename, tables=None, chunksize=100000, encoding='cp1252'):
+    """
+    reads a primavera p6 xer file one line at a time, yielding chunks of
+    the rows of the tables wanted, so memory depends on the chunk size,
+    not the size of the file.
+
+    Parameters
+    ----------
+    filename : str
+
+    tables : dict, optional
+        {table name: [columns to keep]}. The default is XER_COLUMNS.
+    chunksize : int, optional
+        rows per chunk. The default is 100000.
+    encoding : str, optional
+        The default is 'cp1252', which p6 uses.
+
+    Yields
+    ------
+    table : str
+
+    chunk : pandas.DataFrame
+        of strings
+    """
+    tables = XER_COLUMNS if tables is None else tables
+    table, columns, positions, rows = None, None, None, []
+    with open(filename, 'r', encoding=encoding, errors='replace', newline='') as file_object:
+        for line in file_object:
+            if line.startswith('%R'):
+                if positions is not None:
+                    values = line.rstrip('\r\n').split('\t')
+                    if len(values) < width:
+                        values += [''] * (width - len(values))
+                    rows.append(get_columns(values))
+                    if len(rows) >= chunksize:
+                        yield table, pd.DataFrame(rows, columns=columns)
+                        rows = []
+            elif line.startswith('%T') or line.startswith('%E'):
+                if len(rows) > 0:
+                    yield table, pd.DataFrame(rows, columns=columns)
+                    rows = []
+                table = line.rstrip('\r\n').split('\t')[-1].strip()
+                positions = None
+            elif line.startswith('%F') and table in tables:
+                fields = line.rstrip('\r\n').split('\t')
+                columns = [c for c in tables[table] if c in fields]
+                positions = [fields.index(c) for c in columns]
+                width = len(fields)
+                if len(positions) == 0:
+                    positions = None
+                elif len(positions) == 1:
+                    get_columns = (lambda values, i=positions[0]: (values[i],))
+                else:
+                    get_columns = operator.itemgetter(*positions)
+    if len(rows) > 0:
+        yield table, pd.DataFrame(rows, columns=columns)
+
+
+def _xer_dates(chunk, columns):
+    """ the first of several date columns which has a value """
+    dates = pd.Series(pd.NaT, index=chunk.index, dtype='datetime64[ns]')
+    for column in columns:
+        if column in chunk.columns:
+            dates = dates.fillna(parse_dates(chunk[column].replace('', None)))
+    return dates
+
+
+def import_xer(filename, chunksize=100000, encoding='cp1252'):
+    """
+    import a primavera p6 xer file.
+    Only the TASK, TASKPRED and PROJWBS tables are read, in chunks,
+    and each chunk is converted to typed columns as it's read.
+
+    Parameters
+    ----------
+    filename : str
+
+    chunksize : int, optional
+        rows per chunk. The default is 100000.
+    encoding : str, optional
+        The default is 'cp1252'.
+
+    Returns
+    -------
+    dataframe: pandas.DataFrame
+        with id (task_id), task_code, WBS, activity_name, start, end,
+        predecessors (task_ids), task_type and proj_id.
+        Start and end are the actual dates if there are any,
+        then the early dates, then the planned (target) dates.
+    """
+    tasks, links, wbs = [], [], []
+    for table, chunk in read_xer_tables(filename, chunksize=chunksize, encoding=encoding):
+        if table == 'TASK':
+            milestones = chunk.task_type.isin(['TT_Mile', 'TT_FinMile'])
+            starts = _xer_dates(chunk, ['act_start_date', 'early_start_date', 'target_start_date'])
+            ends = _xer_dates(chunk, ['act_end_date', 'early_end_date', 'target_end_date'])
+            starts, ends = starts.fillna(ends), ends.fillna(starts)
+            # milestones only have a start (TT_Mile) or a finish (TT_FinMile)
+            finish_milestones = (chunk.task_type == 'TT_FinMile').to_numpy()
+            starts[finish_milestones] = ends[finish_milestones]
+            ends[milestones.to_numpy()] = starts[milestones.to_numpy()]
+            tasks.append(pd.DataFrame({'id': chunk.task_id,
+                                       'task_code': chunk.get('task_code'),
+                                       'wbs_id': chunk.get('wbs_id'),
+                                       'activity_name': chunk.get('task_name'),
+                                       'start': starts,
+                                       'end': ends,
+                                       'task_type': chunk.task_type,
+                                       'proj_id': chunk.get('proj_id')}))
+        elif table == 'TASKPRED':
+            links.append(chunk[['task_id', 'pred_task_id']])
+        elif table == 'PROJWBS':
+            wbs.append(chunk)
+
+    assert len(tasks) > 0, f'no TASK table in {filename}'
+    dataframe = pd.concat(tasks, ignore_index=True)
+    # after concatenating, as chunks with different categories concatenate as strings
+    dataframe['task_type'] = dataframe.task_type.astype('category')
+
+    # predecessors as comma separated task_ids
+    if len(links) > 0:
+        links = pd.concat(links, ignore_index=True)
+        predecessors = {}
+        for task_id, pred_task_id in zip(links.task_id.tolist(), links.pred_task_id.tolist()):
+            predecessors[task_id] = (f'{predecessors[task_id]},{pred_task_id}'
+                                     if task_id in predecessors else pred_task_id)
+        dataframe['predecessors'] = dataframe.id.map(predecessors).fillna('')
+    else:
+        dataframe['predecessors'] = ''
+
+    # WBS codes from the short names of each WBS element and its parents
+    if len(wbs) > 0:
+        wbs = pd.concat(wbs, ignore_index=True)
+        parents = dict(zip(wbs.wbs_id, wbs.parent_wbs_id))
+        names = dict(zip(wbs.wbs_id, wbs.wbs_short_name))
+        paths = {}
+
+        def get_path(wbs_id):
+            chain = []
+            while wbs_id in names and wbs_id not in paths and wbs_id not in chain:
+                chain.append(wbs_id)
+                wbs_id = parents.get(wbs_id)
+            path = paths.get(wbs_id, None)
+            for element in reversed(chain):
+                path = names[element] if path is None else f'{path}.{names[element]}'
+                paths[element] = path
+            return paths.get(chain[0], None) if chain else path
+
+        dataframe['WBS'] = dataframe.wbs_id.map({w: get_path(w) for w in dataframe.wbs_id.unique()})
+    else:
+        dataframe['WBS'] = dataframe.wbs_id
+
+    columns = ['id', 'task_code', 'WBS', 'activity_name', 'start', 'end',
+               'predecessors', 'task_type', 'proj_id']
+    return dataframe[columns]
+
+
+IMPORTERS = {'.csv': import_csv,
+             '.xlsx': import_excel,
+             '.xls': import_excel,
+             '.xml': import_mpp_xml,
+             '.xer': import_xer}
+
+# column names used by the rest of giganttic, matched without case, spaces or underscores
+STANDARD_COLUMNS = ['id', 'WBS', 'activity_name', 'start', 'end', 'predecessors', 'milestone']
+
+
+def import_file(file, sheet=0, **kwargs):
+    """
+    imports a .csv, .xlsx, ms project .xml or primavera .xer file with the matching importer
+
+    Parameters
+    ----------
+    file : str
+
+    sheet : str | int | list | None, optional
+        for excel files (see import_excel). The default is 0.
+    **kwargs :
+        passed to import_csv
+
+    Returns
+    -------
+    dataframe : pandas.DataFrame
+    """
+    extension = os.path.splitext(file)[1].lower()
+    if extension not in IMPORTERS:
+        raise ValueError(f"inputfile must be {', '.join(IMPORTERS)} file not {file}")
+    if extension == '.csv':
+        return import_csv(file, **kwargs)
+    if IMPORTERS[extension] is import_excel:
+        return import_excel(file, sheet=sheet)
+    return IMPORTERS[extension](file)
+
+
+def _import_one(file, sheet, kwargs):
+    """ imports one file for import_files, returning the data or the error """
+    start_time = time.perf_counter()
+    try:
+        dataframe, error = import_file(file, sheet=sheet, **kwargs), None
+    except Exception as exception:  # reported, not raised, so one bad file doesn't stop the rest
+        dataframe, error = None, f'{type(exception).__name__}: {exception}'
+    return file, dataframe, time.perf_counter() - start_time, error
+
+
+def normalise_columns(dataframe):
+    """ renames columns like 'Activity Name' or 'START' to the standard column names """
+    standard = {re.sub(r'[\s_]', '', c).lower(): c for c in STANDARD_COLUMNS}
+    renames = {}
+    for column in dataframe.columns:
+        name = standard.get(re.sub(r'[\s_]', '', str(column)).lower(), column)
+        if name != column and name not in dataframe.columns and name not in renames.values():
+            renames[column] = name
+    return dataframe.rename(columns=renames)
+
+
+def _id_strings(values):
+    """ ids as strings, without the .0 excel adds to whole numbers in a numeric column """
+    if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+        values = values.astype('Int64')
+    return values.astype('string')
+
+
+def namespace_ids(dataframe, source):
+    """
+    prefixes the ids and predecessors of a schedule with their source, e.g. 'project_a:12'
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+
+    source : str | pandas.Series
+        one source for every row, or a source for each row
+
+    Returns
+    -------
+    dataframe : pandas.DataFrame
+    """
+    dataframe = dataframe.reset_index(drop=True)
+    if isinstance(source, str):
+        source = pd.Series(source, index=dataframe.index)
+    source = pd.Series(source.to_numpy(), index=dataframe.index).astype(str)
+    if 'id' in dataframe.columns:
+        dataframe['id'] = source + ':' + _id_strings(dataframe['id']).astype(str)
+    if 'predecessors' in dataframe.columns:
+        predecessors = _id_strings(dataframe.predecessors).fillna('').str.split(',').explode()
+        predecessors = predecessors.str.strip()
+        predecessors = predecessors[predecessors != '']
+        named = source.loc[predecessors.index] + ':' + predecessors.astype(str)
+        dataframe['predecessors'] = named.groupby(level=0).agg(','.join).reindex(
+            dataframe.index, fill_value='')
+    return dataframe
+
+
+def import_files(files, sheet=0, processes=None, namespace=True, **kwargs):
+    """
+    imports and concatenates many schedules, e.g. a folder of project workbooks
+    and ms project xml files, parsing them in parallel processes.
+    Files which fail are reported, instead of stopping the import.
+
+    Parameters
+    ----------
+    files : str | list
+        file paths and/or glob patterns, e.g. 'projects/*.xlsx'
+    sheet : str | int | list | None, optional
+        excel sheet(s) to import from each workbook (see import_excel). The default is 0.
+    processes : int, optional
+        number of processes. The default is one per cpu, and 1 imports in this process.
+    namespace : bool, optional
+        prefix ids and predecessors with the file (and sheet) they came from,
+        so that they are unique across projects. The default is True.
+    **kwargs :
+        passed to import_csv
+
+    Returns
+    -------
+    dataframe : pandas.DataFrame
+        every schedule, with a source column
+    report : pandas.DataFrame
+        file, rows, seconds and error for each file
+    """
+    patterns = [files] if isinstance(files, str) else list(files)
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        files.extend(f for f in matches if f not in files)
+    assert len(files) > 0, f'no files found matching {patterns}'
+
+    if processes == 1 or len(files) == 1:
+        results = [_import_one(file, sheet, kwargs) for file in files]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_import_one, files,
+                                        [sheet]*len(files), [kwargs]*len(files)))
+
+    frames = []
+    report = []
+    for file, dataframe, seconds, error in results:
+        report.append({'file': file,
+                       'rows': None if dataframe is None else len(dataframe),
+                       'seconds': seconds,
+                       'error': error})
+        if dataframe is None:
+            logger.warning('could not import %s: %s', file, error)
+            continue
+        dataframe = normalise_columns(dataframe)
+        for column in ['start', 'end']:
+            if column in dataframe.columns and kwargs.get('numerical_dates', False) is False:
+                dataframe[column] = parse_dates(dataframe[column])
+        source = os.path.splitext(os.path.basename(file))[0]
+        if 'sheet' in dataframe.columns:
+            sources = source + '[' + dataframe.sheet.astype(str) + ']'
+        else:
+            sources = pd.Series(source, index=dataframe.index)
+        if namespace is True:
+            dataframe = namespace_ids(dataframe, sources)
+        dataframe['source'] = sources.to_numpy()
+        frames.append(dataframe)
+
+    report = pd.DataFrame(report, columns=['file', 'rows', 'seconds', 'error'])
+    if len(frames) == 0:
+        return pd.DataFrame(columns=STANDARD_COLUMNS[:5]), report
+    return pd.concat(frames, ignore_index=True), report
+
+
 def choosefile(path='./'):
     """
     uses tkinter.filedialogue.askopenfilename to pick a file
@@ -6,8 +6,14 @@ Created on Fri May  5 08:30:31 2023
 
 @author: dhancock
 """
+import heapq
+import logging
 from datetime import datetime as dt
+import numpy as np
 import pandas as pd
+from .data_filter import FilterIndex
+
+logger = logging.getLogger('giganttic')
 
 
 def get_datestring():
@@ -35,9 +41,8 @@ def filter_data(df, column, regex):
     df : TYPE
         DESCRIPTION.
     """
-    df = df[df[column].str.contains(regex,
-                                    regex=True,
-                                    na=False)].reset_index(drop=True)
+    index = FilterIndex(df)
+    df = index.select(index.contains(column, regex))
     return df
 
 
@@ -167,7 +172,7 @@ def flatten_milestones(df):
 
     # try to autopopulate milestone labels if they're missing
     if 'milestone' not in df.columns:
-        print('WARNING: no milestone column in dataframe. Trying to autopopulate')
+        logger.warning('no milestone column in dataframe, trying to autopopulate')
         df = autopopulate_milestones(df)
 
     df.loc[df['row_type'] == 'Milestone', 'ylabel'] = ''
@@ -224,3 +229,192 @@ def get_durations(df, milestone_cols):
     df['end'] = df[milestone_cols].apply(lambda x: startend(x, max), axis=1)
     df['duration'] = df.end-df.start
     return df
+
+
+def compare_schedules(base_df, new_df, on=None, tolerance=None):
+    """
+    compares a schedule against a baseline, joining rows on an id
+    (or WBS and activity_name) and calculating the slip of every activity
+    and milestone.
+
+    Parameters
+    ----------
+    base_df : pandas.DataFrame
+        the baseline schedule
+    new_df : pandas.DataFrame
+        the current schedule
+    on : str | list, optional
+        column(s) to join on. The default is 'id' if both schedules have
+        unique ids, otherwise ['WBS', 'activity_name'].
+    tolerance : pandas.Timedelta | float, optional
+        slips up to this size are treated as on time.
+        The default is no tolerance.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        new_df with extra columns:
+            baseline_start, baseline_end,
+            start_slip, end_slip: current minus baseline
+            comparison: 'new', 'on time', 'late' or 'early' based on end_slip
+    """
+    if on is None:
+        if all(['id' in base_df.columns,
+                'id' in new_df.columns]) and base_df.id.is_unique and new_df.id.is_unique:
+            on = 'id'
+        else:
+            on = ['WBS', 'activity_name']
+    on = [on] if isinstance(on, str) else list(on)
+    assert all(c in base_df.columns and c in new_df.columns for c in on), \
+        f'both schedules must have {on} columns'
+
+    baseline = base_df[on + ['start', 'end']].rename(
+        columns={'start': 'baseline_start', 'end': 'baseline_end'})
+    if baseline.duplicated(on).any():
+        logger.warning('duplicate %s values in baseline, using the first of each', on)
+        baseline = baseline.drop_duplicates(on)
+
+    df = new_df.drop(columns=['baseline_start', 'baseline_end', 'start_slip',
+                              'end_slip', 'comparison'],
+                     errors='ignore')
+    df = df.merge(baseline, on=on, how='left', validate='many_to_one')
+    df['start_slip'] = df.start - df.baseline_start
+    df['end_slip'] = df.end - df.baseline_end
+
+    slip = df.end_slip
+    if tolerance is None:
+        tolerance = pd.Timedelta(0) if pd.api.types.is_timedelta64_dtype(slip) else 0
+    df['comparison'] = 'on time'
+    df.loc[slip > tolerance, 'comparison'] = 'late'
+    df.loc[slip < -tolerance, 'comparison'] = 'early'
+    df.loc[df.baseline_end.isna(), 'comparison'] = 'new'
+    return df
+
+
+def pack_rows(df, group_column='WBS', gap=0.0, group_spacing=1):
+    """
+    packs activities which don't overlap onto shared lanes, so that
+    a large schedule needs far fewer rows. Each group (e.g. WBS) keeps
+    its own block of lanes, in the order the groups first appear.
+    Uses interval partitioning: within each group, rows are taken in
+    start order and put on the lane which finished earliest, if it's free,
+    otherwise on a new lane (a heap of lane end dates).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have start and end
+    group_column : str | None, optional
+        rows are only packed with rows in the same group.
+        The default is 'WBS'. None packs all rows together.
+    gap : float | pandas.Timedelta, optional
+        minimum gap between activities on the same lane, as a Timedelta or
+        a fraction of the whole date range (so milestone markers don't touch).
+        The default is 0.0.
+    group_spacing : float, optional
+        empty space between groups, in lanes. The default is 1.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        with yvalue (the lane) and ylabel (the group name on the first lane
+        of each group, blank on the others) and lane (within the group)
+    """
+    df = df.reset_index(drop=True)
+    if group_column is not None and group_column not in df.columns:
+        logger.warning('no %s column in dataframe, packing all rows together', group_column)
+        group_column = None
+
+    starts = df.start.to_numpy()
+    ends = df.end.to_numpy()
+    if not isinstance(gap, pd.Timedelta):
+        gap = (df.end.max() - df.start.min()) * gap
+    padded_ends = ends + (gap.to_timedelta64() if isinstance(gap, pd.Timedelta) else gap)
+    missing = (df.start.isna() | df.end.isna()).to_numpy()
+
+    if group_column is None:
+        groups = np.zeros(len(df), dtype=int)
+        group_names = np.array([''], dtype=object)
+    else:
+        groups, group_names = pd.factorize(df[group_column], use_na_sentinel=False)
+
+    # rows in group order, then by start date
+    order = np.lexsort((starts, groups))
+    lanes = np.zeros(len(df), dtype=int)
+    lane_counts = np.zeros(len(group_names), dtype=int)
+    heap = []
+    current_group = None
+    for row in order.tolist():
+        group = groups[row]
+        if group != current_group:
+            heap = []
+            current_group = group
+        # rows without dates get a lane of their own
+        if missing[row]:
+            lanes[row] = lane_counts[group]
+            lane_counts[group] += 1
+        # strictly before, so that milestones don't sit on the end of a bar
+        elif heap and heap[0][0] < starts[row]:
+            lanes[row] = heapq.heapreplace(heap, (padded_ends[row], heap[0][1]))[1]
+        else:
+            lanes[row] = lane_counts[group]
+            lane_counts[group] += 1
+            heapq.heappush(heap, (padded_ends[row], lanes[row]))
+
+    offsets = np.concatenate([[0], np.cumsum(lane_counts + group_spacing)[:-1]])
+    df['lane'] = lanes
+    df['yvalue'] = offsets[groups] + lanes
+    df['ylabel'] = np.where(lanes == 0, pd.Series(group_names).astype(str).to_numpy()[groups], '')
+    return df
+
+
+def get_loading(df, freq='W', by=None, start=None, end=None):
+    """
+    counts the activities in progress in each period, by adding +1 at the
+    period each row starts and -1 after the period it ends, and taking the
+    cumulative sum. Milestones count in the period they fall in.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have start and end
+    freq : str, optional
+        pandas period frequency, e.g. 'D', 'W', 'M', 'Q'. The default is 'W'.
+    by : str, optional
+        column to count separately, e.g. the fillcolumn or 'milestone'.
+        The default is None.
+    start, end : datetime, optional
+        only count this window (e.g. the visible date range).
+        The default is the whole schedule.
+
+    Returns
+    -------
+    loading : pandas.DataFrame
+        indexed by the start of each period, with a column for each
+        value of by (or a single 'active' column)
+    """
+    dated = (df.start.notna() & df.end.notna()).to_numpy()
+    start_periods = df.start[dated].dt.to_period(freq)
+    end_periods = df.end[dated].dt.to_period(freq)
+    first = pd.Period(start, freq) if start is not None else start_periods.min()
+    last = pd.Period(end, freq) if end is not None else end_periods.max()
+    periods = pd.period_range(first, last, freq=freq)
+    n_periods = len(periods)
+
+    first_ordinal = first.ordinal
+    starts = np.clip(start_periods.array.asi8 - first_ordinal, 0, n_periods)
+    ends = np.clip(end_periods.array.asi8 - first_ordinal + 1, 0, n_periods)
+
+    if by is None:
+        codes = np.zeros(len(starts), dtype=np.int64)
+        names = ['active']
+    else:
+        codes, names = pd.factorize(df[by][dated], use_na_sentinel=False)
+
+    # +1 at the start, -1 after the end, then a cumulative sum along each group
+    width = n_periods + 1
+    changes = (np.bincount(codes * width + starts, minlength=len(names) * width)
+               - np.bincount(codes * width + ends, minlength=len(names) * width))
+    counts = np.cumsum(changes.reshape(len(names), width), axis=1)[:, :n_periods]
+
+    return pd.DataFrame(counts.T, index=periods.to_timestamp(), columns=list(names))
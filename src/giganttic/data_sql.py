@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+sql import functions for giganttic
+
+reads schedules from a database with any DB-API connection (e.g. sqlite3)
+or a SQLAlchemy engine, pushing filters and date windows down into the query,
+fetching in batches, and reusing pooled connections between reads.
+
+    source = SQLSource('schedules.db', table='tasks',
+                       columns={'task_name': 'activity_name'})
+    df = source.read(filter_string=['WBS', '^1\\.2'], start='2024-01-01', end='2024-12-31')
+    figures = plot_by_column(source, 'WBS')
+
+@author: dhancock
+"""
+
+import queue
+import re
+import sqlite3
+import sys
+from contextlib import contextmanager
+from functools import lru_cache
+import pandas as pd
+from .data_import import parse_dates, normalise_columns
+
+# sqlite GLOB patterns for iso date text, which sorts in date order
+ISO_DATE_PATTERNS = ['[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]',
+                     '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] *']
+
+
+class ConnectionPool():
+    """
+    keeps up to size open connections for reuse
+
+    Parameters
+    ----------
+    connect : callable
+        returns a new DB-API connection
+    size : int, optional
+        The default is 4.
+    """
+
+    def __init__(self, connect, size=4):
+        self.connect = connect
+        self.size = size
+        self.created = 0
+        self._idle = queue.LifoQueue()
+
+    @contextmanager
+    def connection(self):
+        """ a connection from the pool, which is returned to it afterwards """
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self.connect()
+            self.created += 1
+        try:
+            yield connection
+        finally:
+            if self._idle.qsize() < self.size:
+                self._idle.put(connection)
+            else:
+                connection.close()
+
+    def close(self):
+        """ closes the idle connections """
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def _regexp(pattern, value):
+    """ REGEXP function for sqlite """
+    return value is not None and re.search(pattern, str(value)) is not None
+
+
+@lru_cache(maxsize=4096)
+def _iso_date(value):
+    """ ISO_DATE function for sqlite: any date parse_dates can read, as iso text """
+    if value is None:
+        return None
+    date = parse_dates(pd.Series([value])).iloc[0]
+    return None if pd.isna(date) else date.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def regex_to_pattern(regex, glob=False):
+    """
+    converts a regex to a LIKE pattern, escaped with '!' (which works on any
+    database, unlike backslash on MySQL), or sqlite GLOB pattern, which is case
+    sensitive like the regex, if it is just text, optionally anchored with ^ and $.
+    Returns None otherwise.
+    """
+    match = re.fullmatch(r'(\^?)((?:[^\\.^$*+?()\[\]{}|]|\\[\\.^$*+?()\[\]{}|])*)(\$?)', regex)
+    if match is None:
+        return None
+    text = re.sub(r'\\(.)', r'\1', match.group(2))
+    if glob:
+        text, wildcard = re.sub(r'([*?\[])', r'[\1]', text), '*'
+    else:
+        text, wildcard = re.sub(r'([%_!])', r'!\1', text), '%'
+    return ('' if match.group(1) else wildcard) + text + ('' if match.group(3) else wildcard)
+
+
+class SQLSource():
+    """
+    a schedule table, or query, in a database
+
+    Parameters
+    ----------
+    connect : str | callable | sqlalchemy.engine.Engine
+        an sqlite database file, a function returning a DB-API connection,
+        or a SQLAlchemy engine
+    table : str, optional
+        table or view to read
+    query : str, optional
+        SELECT statement to read, instead of a table
+    columns : dict, optional
+        {database column: giganttic column} renames, e.g. {'task_name': 'activity_name'}.
+        Other columns are matched to the standard giganttic names ignoring case
+    batch_size : int, optional
+        rows fetched at a time. The default is 10000.
+    pool_size : int, optional
+        connections kept open between reads. The default is 4.
+    paramstyle : str, optional
+        DB-API parameter style. The default is found from the driver.
+    """
+
+    def __init__(self, connect, table=None, query=None, columns=None,
+                 batch_size=10000, pool_size=4, paramstyle=None):
+        assert (table is None) != (query is None), 'give a table or a query'
+        self.paramstyle = paramstyle
+        if isinstance(connect, str):
+            filename = connect
+            connect = (lambda: sqlite3.connect(filename, check_same_thread=False))
+            self.paramstyle = self.paramstyle or 'qmark'
+        elif hasattr(connect, 'raw_connection'):  # sqlalchemy engine
+            self.paramstyle = self.paramstyle or connect.dialect.paramstyle
+            connect = connect.raw_connection
+        self.pool = ConnectionPool(connect, pool_size)
+        self.source = self._quote(table) if table is not None else f'({query}) AS source'
+        self.columns = columns or {}
+        self.batch_size = batch_size
+        self._column_names = None
+
+    def __len__(self):
+        return self.count()
+
+    @staticmethod
+    def _quote(name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _column(self, connection, name):
+        """
+        the quoted database column for a giganttic column name, which may have
+        been renamed by columns or matched by normalise_columns, e.g. 'Start Date'
+        """
+        if self._column_names is None:
+            cursor = self._execute(connection, f'SELECT * FROM {self.source} WHERE 1 = 0', [])
+            names = [d[0] for d in cursor.description]
+            cursor.close()
+            renamed = normalise_columns(pd.DataFrame(columns=names).rename(columns=self.columns))
+            self._column_names = dict(zip(renamed.columns, names))
+        return self._quote(self._column_names.get(name, name))
+
+    def _placeholder(self, connection, number):
+        paramstyle = self.paramstyle or getattr(
+            sys.modules.get(type(connection).__module__.split('.')[0]), 'paramstyle', 'qmark')
+        return {'qmark': '?',
+                'format': '%s',
+                'pyformat': '%s',
+                'numeric': f':{number}',
+                'named': f':p{number}'}[paramstyle]
+
+    def _parameters(self, connection, values):
+        paramstyle = self.paramstyle or getattr(
+            sys.modules.get(type(connection).__module__.split('.')[0]), 'paramstyle', 'qmark')
+        if paramstyle == 'named':
+            return {f'p{i}': v for i, v in enumerate(values, 1)}
+        return list(values)
+
+    def _where(self, connection, filter_string=None, filters=None, start=None, end=None):
+        """
+        builds the WHERE clause and its parameters.
+        Returns the regex of filter_string too, if it couldn't be pushed down
+        """
+        is_sqlite = isinstance(connection, sqlite3.Connection)
+        clauses, values = [], []
+
+        def parameter(value):
+            if hasattr(value, 'isoformat'):
+                value = pd.Timestamp(value)
+                if not is_sqlite:
+                    value = value.to_pydatetime()
+                elif value == value.normalize():
+                    # sqlite compares dates as iso text, and 'yyyy-mm-dd' sorts
+                    # before the same day with a time, so it works as a lower bound
+                    value = value.strftime('%Y-%m-%d')
+                else:
+                    value = value.strftime('%Y-%m-%d %H:%M:%S')
+            values.append(value)
+            return self._placeholder(connection, len(values))
+
+        def date_column(name):
+            column = self._column(connection, name)
+            if not is_sqlite:
+                return column
+            # sqlite has no date type, so only iso text can be compared as it is.
+            # Other values, e.g. '31/01/2024' or excel serial numbers, are converted
+            connection.create_function('ISO_DATE', 1, _iso_date, deterministic=True)
+            iso = ' OR '.join(f"{column} GLOB '{pattern}'" for pattern in ISO_DATE_PATTERNS)
+            return f'(CASE WHEN {iso} THEN {column} ELSE ISO_DATE({column}) END)'
+
+        for column, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f'{self._column(connection, column)} IN ('
+                               + ', '.join(parameter(v) for v in value) + ')')
+            elif value is None:
+                clauses.append(f'{self._column(connection, column)} IS NULL')
+            else:
+                clauses.append(f'{self._column(connection, column)} = {parameter(value)}')
+
+        remaining = None
+        if filter_string is not None:
+            column, regex = filter_string
+            quoted = self._column(connection, column)
+            pattern = regex_to_pattern(regex, glob=is_sqlite)
+            if pattern is not None and is_sqlite:
+                clauses.append(f'{quoted} GLOB {parameter(pattern)}')
+            elif pattern is not None:
+                clauses.append(f"{quoted} LIKE {parameter(pattern)} ESCAPE '!'")
+            elif is_sqlite:
+                connection.create_function('REGEXP', 2, _regexp, deterministic=True)
+                clauses.append(f'{quoted} REGEXP {parameter(regex)}')
+            else:
+                remaining = filter_string
+
+        # rows which overlap the date window
+        if end is not None:
+            end = pd.Timestamp(end)
+            if is_sqlite:
+                end = end.strftime('%Y-%m-%d %H:%M:%S')
+            clauses.append(f'{date_column("start")} <= {parameter(end)}')
+        if start is not None:
+            clauses.append(f'{date_column("end")} >= {parameter(pd.Timestamp(start))}')
+
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        return where, values, remaining
+
+    def _execute(self, connection, sql, values):
+        cursor = connection.cursor()
+        cursor.execute(sql, self._parameters(connection, values))
+        return cursor
+
+    def read(self, filter_string=None, filters=None, start=None, end=None, columns=None):
+        """
+        reads the schedule, with the filtering done by the database
+
+        Parameters
+        ----------
+        filter_string : list, optional
+            [column, regex] as used by giganttic(). Plain text, optionally
+            anchored with ^ or $, becomes LIKE (GLOB on sqlite); other regexes
+            use REGEXP on sqlite, and are applied after reading on other databases.
+            LIKE is case sensitive, or not, as the database's collation is.
+        filters : dict, optional
+            {column: value or list of values} to match exactly
+        start, end : datetime, optional
+            only rows which overlap this date window. On sqlite, dates stored
+            as text in other formats or as numbers are converted for the
+            comparison; other databases compare them as they are stored,
+            so start and end should be date or timestamp columns there.
+        columns : list, optional
+            giganttic columns to read. The default is all of them.
+
+        Returns
+        -------
+        dataframe : pandas.DataFrame
+        """
+        with self.pool.connection() as connection:
+            where, values, remaining = self._where(connection, filter_string, filters, start, end)
+            selected = '*' if columns is None else ', '.join(
+                f'{self._column(connection, c)} AS {self._quote(c)}' for c in columns)
+            cursor = self._execute(connection, f'SELECT {selected} FROM {self.source}{where}',
+                                   values)
+            names = [d[0] for d in cursor.description]
+            batches = []
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if len(rows) == 0:
+                    break
+                batch = normalise_columns(pd.DataFrame.from_records(
+                    rows, columns=names).rename(columns=self.columns))
+                for column in ['start', 'end']:
+                    if column in batch.columns:
+                        batch[column] = parse_dates(batch[column])
+                batches.append(batch)
+            cursor.close()
+
+        if len(batches) == 0:
+            dataframe = normalise_columns(pd.DataFrame(columns=names).rename(columns=self.columns))
+        else:
+            dataframe = pd.concat(batches, ignore_index=True)
+        if remaining is not None:
+            column, regex = remaining
+            dataframe = dataframe[dataframe[column].astype(str).str.contains(
+                regex, regex=True, na=False)].reset_index(drop=True)
+        return dataframe
+
+    def distinct(self, column, **kwargs):
+        """ the distinct values of a column, with the same filters as read """
+        with self.pool.connection() as connection:
+            where, values, _ = self._where(connection, **kwargs)
+            cursor = self._execute(
+                connection,
+                f'SELECT DISTINCT {self._column(connection, column)} FROM {self.source}{where}',
+                values)
+            values = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        return values
+
+    def count(self, **kwargs):
+        """ the number of rows, with the same filters as read """
+        with self.pool.connection() as connection:
+            where, values, _ = self._where(connection, **kwargs)
+            cursor = self._execute(connection, f'SELECT COUNT(*) FROM {self.source}{where}',
+                                   values)
+            count = cursor.fetchone()[0]
+            cursor.close()
+        return count
+
+    def close(self):
+        """ closes the pooled connections """
+        self.pool.close()
+
+
+def import_sql(connect, table=None, query=None, columns=None, **kwargs):
+    """
+    imports a schedule from a database (see SQLSource)
+
+    Parameters
+    ----------
+    connect : str | callable | sqlalchemy.engine.Engine
+
+    table : str, optional
+
+    query : str, optional
+
+    columns : dict, optional
+        {database column: giganttic column} renames
+    **kwargs :
+        filter_string, filters, start and end, passed to SQLSource.read
+
+    Returns
+    -------
+    dataframe : pandas.DataFrame
+    """
+    source = SQLSource(connect, table=table, query=query, columns=columns)
+    try:
+        return source.read(**kwargs)
+    finally:
+        source.close()
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+dependency validation functions for giganttic
+
+checks the whole predecessor graph in one pass, rather than one arrow at a time
+
+@author: dhancock
+"""
+
+import numpy as np
+import pandas as pd
+
+VIOLATION_TYPES = ('cycle', 'missing predecessor', 'negative lag')
+
+
+def _as_key(series):
+    """ normalises ids so that 4, 4.0, '4' and ' 4' all match.
+    Only the unique values are converted """
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques).astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    keys = uniques.to_numpy(dtype=object)[codes]
+    keys[codes == -1] = 'nan'
+    return pd.Series(keys, index=series.index)
+
+
+def get_connections(df,
+                    id_column='id',
+                    predecessor_column='predecessors'):
+    """
+    explodes the predecessors column into one row per link
+    and joins each link to its predecessor row.
+
+    Predecessors can be comma separated strings (as imported from csv or
+    ms project xml), lists, or single numbers.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have id_column, predecessor_column, start and end
+    id_column : str, optional
+        The default is 'id'.
+    predecessor_column : str, optional
+        The default is 'predecessors'.
+
+    Returns
+    -------
+    links : pandas.DataFrame
+        one row per link, with columns:
+            successor_row, predecessor_row: positions in df
+                (predecessor_row is -1 if the predecessor can't be found)
+            id, predecessor: the ids of each end of the link
+            lag: successor start minus predecessor end
+    """
+    assert predecessor_column in df.columns, 'no predecessors defined in dataframe'
+
+    predecessors = pd.Series(df[predecessor_column].to_numpy(), index=np.arange(len(df)))
+    predecessors = predecessors[predecessors.notna()].explode()
+    # split before normalising, so that every id in '1.0, 2.0' loses its .0
+    predecessors = _as_key(predecessors.dropna().astype(str).str.split(',').explode())
+    predecessors = predecessors[~predecessors.isin(['', 'nan', 'None'])]
+
+    ids = _as_key(df[id_column]).to_numpy()
+    first_ids = pd.Index(ids[~pd.Series(ids).duplicated().to_numpy()])
+    successor_rows = predecessors.index.to_numpy()
+    predecessor_rows = first_ids.get_indexer(predecessors.to_numpy())
+    found = predecessor_rows >= 0
+
+    starts = df['start'].to_numpy()
+    ends = df['end'].to_numpy()
+    lag = pd.Series(starts[successor_rows]) - pd.Series(ends[np.where(found, predecessor_rows, 0)])
+    lag[~found] = None
+
+    links = pd.DataFrame({'successor_row': successor_rows,
+                          'predecessor_row': predecessor_rows,
+                          'id': ids[successor_rows],
+                          'predecessor': predecessors.to_numpy(),
+                          'lag': lag.to_numpy()})
+    return links
+
+
+def _strongly_connected(n_nodes, sources, targets):
+    """
+    iterative tarjan's algorithm. Returns a component number for each node,
+    in linear time over nodes and links.
+    """
+    order = np.argsort(sources, kind='stable')
+    targets = targets[order].tolist()
+    offsets = np.searchsorted(sources[order], np.arange(n_nodes+1)).tolist()
+
+    index = [-1]*n_nodes
+    low = [0]*n_nodes
+    on_stack = [False]*n_nodes
+    component = [-1]*n_nodes
+    stack = []
+    counter = 0
+    n_components = 0
+
+    for root in np.unique(sources).tolist():
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, offsets[root]]]
+        while work:
+            node, pointer = work[-1]
+            if pointer < offsets[node+1]:
+                work[-1][1] += 1
+                target = targets[pointer]
+                if index[target] == -1:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append([target, offsets[target]])
+                elif on_stack[target]:
+                    low[node] = min(low[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component[member] = n_components
+                        if member == node:
+                            break
+                    n_components += 1
+
+    return np.array(component)
+
+
+def check_connections(df,
+                      id_column='id',
+                      predecessor_column='predecessors',
+                      links=None):
+    """
+    validates the date logic of the whole predecessor graph.
+
+    Finds:
+        'negative lag' - a successor starts before its predecessor ends
+        'missing predecessor' - a predecessor id isn't in the dataframe
+        'cycle' - the link is part of a circular chain of dependencies
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+
+    id_column : str, optional
+        The default is 'id'.
+    predecessor_column : str, optional
+        The default is 'predecessors'.
+    links : pandas.DataFrame, optional
+        output of get_connections, if already calculated
+
+    Returns
+    -------
+    violations : pandas.DataFrame
+        one row per offending link, with the same columns as get_connections
+        plus 'violation'
+    """
+    if links is None:
+        links = get_connections(df, id_column, predecessor_column)
+
+    found = (links.predecessor_row >= 0).to_numpy()
+    sources = links.predecessor_row.to_numpy()[found]
+    targets = links.successor_row.to_numpy()[found]
+    components = _strongly_connected(len(df), sources, targets)
+
+    in_cycle = np.zeros(len(links), dtype=bool)
+    in_cycle[found] = components[sources] == components[targets]
+    missing = ~found
+    if pd.api.types.is_timedelta64_dtype(links.lag):
+        negative = (links.lag < pd.Timedelta(0)).to_numpy()
+    else:
+        negative = (links.lag < 0).to_numpy()
+
+    violation = np.select([in_cycle, missing, negative],
+                          list(VIOLATION_TYPES),
+                          default='')
+    violations = links.assign(violation=violation)
+    violations = violations[violation != ''].reset_index(drop=True)
+    return violations
+
+
+def flag_violations(df,
+                    violations=None,
+                    column='date_logic',
+                    ok_label='OK',
+                    **kwargs):
+    """
+    adds a column to the dataframe with the worst violation for each successor,
+    so that it can be used as fillcolumn or bordercolumn in get_colours.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+
+    violations : pandas.DataFrame, optional
+        output of check_connections. Calculated if not given.
+    column : str, optional
+        The default is 'date_logic'.
+    ok_label : str, optional
+        label for rows without any violations. The default is 'OK'.
+    **kwargs :
+        passed to check_connections
+
+    Returns
+    -------
+    df : pandas.DataFrame
+    """
+    if violations is None:
+        violations = check_connections(df, **kwargs)
+
+    severity = violations.violation.map({v: i for i, v in enumerate(VIOLATION_TYPES)})
+    worst = severity.groupby(violations.successor_row.to_numpy()).min()
+
+    labels = np.full(len(df), ok_label, dtype=object)
+    labels[worst.index.to_numpy()] = np.array(VIOLATION_TYPES, dtype=object)[worst.to_numpy()]
+    df[column] = labels
+    return df
@@ -6,9 +6,11 @@ a matplotlib gantt chart tool using patches,
 specifically designed for large projects
 """
 
+import glob
 import os
-import matplotlib.pyplot as plt
+import pandas as pd
 import giganttic as gt
+from .profiling import profiling, stage
 
 
 def giganttic(input_data='Auto',
@@ -24,7 +26,13 @@ def giganttic(input_data='Auto',
     Parameters
     ----------
     inputfile: str
-        file location or list. Filetypes are .csv, .xlsx, or ms project .xml
+        file location or list. Filetypes are .csv, .xlsx, ms project .xml,
+        or primavera .xer.
+        A list of file locations or a glob pattern (e.g. 'projects/*.xlsx')
+        imports them all in parallel (see import_files).
+        A giganttic.SQLSource reads from a database, with filter_string
+        pushed down into the query.
+        A pandas.DataFrame is used as it is
     output_file: str, optional
         where to save the output image. Default is current directory
         and the input filename with .png extension
@@ -34,6 +42,23 @@ def giganttic(input_data='Auto',
     filter: list or None, optional
         list containing column name string and regex string to use as a filter.
         Default is None
+    baseline_data: str, optional
+        a baseline schedule (any input type) to compare against.
+        Ghosts of the baseline dates are drawn under each row
+    profile: bool | str | callable, optional
+        report the time, rows and peak memory of each stage.
+        True or 'log' for logging, a .jsonl file path, or a callable.
+        Default is the GIGANTTIC_PROFILE environment variable, if set
+    pack_rows: bool | str, optional
+        pack activities which don't overlap onto shared lanes within each WBS,
+        or within each group of the named column (see pack_rows)
+    compact_html: bool, optional
+        save plotly .html output with write_compact_html, which loads a shared
+        plotly.min.js from the output directory. compress=True gzips it
+    incremental: giganttic.IncrementalGantt, optional
+        re-render an existing chart, only redrawing the rows that have changed
+        since its last render. plot_type and plotting keyword arguments are
+        taken from the IncrementalGantt
     **kwargs:
         keyword arguments to be passed to giganttic.gantt_chart
 
@@ -51,6 +76,32 @@ def giganttic(input_data='Auto',
     def import_data(input_data, **kwargs):
         # import the data
 
+        # read from a database, filtering in the query
+        if isinstance(input_data, gt.SQLSource):
+            with stage('import_sql') as record:
+                dataframe = input_data.read(filter_string=filter_string)
+                record['rows'] = len(dataframe)
+            return dataframe
+
+        # a dataframe which has already been imported, e.g. by the render server
+        if isinstance(input_data, pd.DataFrame):
+            return input_data.copy()
+
+        # import several files, from a list of paths or a glob pattern
+        if (isinstance(input_data, str) and glob.has_magic(input_data)) or (
+                isinstance(input_data, list) and len(input_data) > 0
+                and all(isinstance(x, str) for x in input_data)):
+            with stage('import_files') as record:
+                dataframe, report = gt.import_files(input_data,
+                                                    sheet=kwargs.get('sheet', 0),
+                                                    processes=kwargs.get('processes', None),
+                                                    headers=kwargs.get('headers', True),
+                                                    columns=kwargs.get('columns', None))
+                record['rows'] = len(dataframe)
+                record['files'] = len(report)
+                record['errors'] = int(report.error.notna().sum())
+            return dataframe
+
         # import a list
         if isinstance(input_data, list):
             dataframe = gt.import_list(input_data)
@@ -58,26 +109,21 @@ def giganttic(input_data='Auto',
         elif isinstance(input_data, str):
             inputfile = input_data
         else:
-            raise ValueError("input must be list or string with path to file")
+            raise ValueError("input must be list, dataframe or string with path to file")
 
         if input_data == 'Auto':
             inputfile = gt.choosefile()
             input_data = inputfile
-            print(f'DEBUG: {inputfile}')
 
         # import a file
-        if inputfile == 'na':
-            pass
-        elif inputfile.endswith('.csv'):
-            dataframe = gt.import_csv(inputfile,
-                                      headers=kwargs.get('headers', True),
-                                      columns=kwargs.get('columns', None))
-        elif inputfile.endswith('.xlsx'):
-            dataframe = gt.import_excel(inputfile, sheet=kwargs.get('sheet', 0))
-        elif inputfile.endswith('.xml'):
-            dataframe = gt.import_mpp_xml(inputfile)
-        else:
-            raise ValueError(f"inputfile must be .csv, .xlsx, or mpp .xml file not {inputfile}")
+        if inputfile != 'na':
+            importer = gt.IMPORTERS.get(os.path.splitext(inputfile)[1].lower(), gt.import_file)
+            with stage(importer.__name__, file=inputfile) as record:
+                dataframe = gt.import_file(inputfile,
+                                           sheet=kwargs.get('sheet', 0),
+                                           headers=kwargs.get('headers', True),
+                                           columns=kwargs.get('columns', None))
+                record['rows'] = len(dataframe)
 
         return dataframe
 
@@ -96,12 +142,28 @@ def giganttic(input_data='Auto',
 
     def manage_data(dataframe, **kwargs):
         # filter and manipulate the data
-        if filter_string is not None:
-            dataframe = gt.filter_data(dataframe, filter_string[0], filter_string[1])
+        if kwargs.get('baseline_data', None) is not None:
+            baseline = import_data(kwargs['baseline_data'], **kwargs)
+            with stage('compare_schedules', rows=len(dataframe)):
+                dataframe = gt.compare_schedules(baseline, dataframe)
+
+        # a SQLSource has already filtered in the query
+        if filter_string is not None and not isinstance(input_data, gt.SQLSource):
+            with stage('filter_data', rows=len(dataframe)) as record:
+                dataframe = gt.filter_data(dataframe, filter_string[0], filter_string[1])
+                record['rows_out'] = len(dataframe)
 
         # flatten milestones if requested
         if kwargs.get('flatten_milestones', False) is True:
-            dataframe = gt.flatten_milestones(dataframe)
+            with stage('flatten_milestones', rows=len(dataframe)):
+                dataframe = gt.flatten_milestones(dataframe)
+
+        # pack activities onto shared lanes if requested
+        if kwargs.get('pack_rows', False) is not False:
+            group_column = kwargs['pack_rows'] if isinstance(kwargs['pack_rows'], str) else 'WBS'
+            with stage('pack_rows', rows=len(dataframe)) as record:
+                dataframe = gt.pack_rows(dataframe, group_column=group_column)
+                record['lanes'] = dataframe.yvalue.nunique()
         return dataframe
 
     def save_files(fig, output_file=None):
@@ -109,22 +171,39 @@ def giganttic(input_data='Auto',
         if output_file is not None:
             if output_file == 'Auto':
                 output_file = f'{defaultstring}.png'
-            plt.savefig(output_file)
+            with stage('savefig', file=output_file):
+                if incremental is not None:
+                    incremental.save(output_file)
+                elif hasattr(fig, 'savefig'):
+                    fig.savefig(output_file)
+                elif output_file.endswith('.html') and kwargs.get('compact_html', False):
+                    output_file = gt.write_compact_html(
+                        fig, output_file, compress=kwargs.get('compress', False))
+                elif output_file.endswith('.html'):
+                    fig.write_html(output_file)
+                else:
+                    fig.write_image(output_file)
         return output_file
 
-    dataframe = import_data(input_data, **kwargs)
-    defaultstring = make_default_string(input_data, title)
-    dataframe = manage_data(dataframe, **kwargs)
-
     if plot_type == 'matplotlib':
-        plotting_function = gt.gantt_chart
+        plotting_function = gt.mpl_gantt
     elif plot_type == 'plotly':
         plotting_function = gt.plotly_gantt
     else:
         raise ValueError('plot_type must be "matplotlib" or "plotly"')
 
-    axis, figure = plotting_function(dataframe, title=title, **kwargs)
-    output_file = save_files(figure, output_file)
+    with profiling(kwargs.get('profile', None)), stage('giganttic', plot_type=plot_type):
+        dataframe = import_data(input_data, **kwargs)
+        defaultstring = make_default_string(input_data, title)
+        dataframe = manage_data(dataframe, **kwargs)
+
+        incremental = kwargs.get('incremental', None)
+        if incremental is not None:
+            with stage('incremental render', rows=len(dataframe)):
+                axis, figure = incremental.render(dataframe)
+        else:
+            axis, figure = plotting_function(dataframe, title=title, **kwargs)
+        output_file = save_files(figure, output_file)
 
     output = dict(data=dataframe, axis=axis, figure=figure, output_file=output_file)
 
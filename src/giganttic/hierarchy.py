@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+WBS hierarchy functions for giganttic
+
+builds the tree from WBS codes (1, 1.2, 1.2.3 ...) or ms project outline levels,
+rolls up dates and counts to every WBS element, and collapses a schedule
+to any depth, so that big programmes can be drawn from a few summary rows.
+
+@author: dhancock
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def wbs_from_outline(levels):
+    """
+    makes dotted WBS codes (1, 1.1, 1.2, 2 ...) from outline levels
+    in schedule order, e.g. ms project OutlineLevel
+
+    Parameters
+    ----------
+    levels : pandas.Series
+        outline levels, starting at 1
+
+    Returns
+    -------
+    wbs : pandas.Series
+    """
+    counters = []
+    codes = []
+    for level in pd.to_numeric(levels, errors='coerce').fillna(1).astype(int).tolist():
+        level = max(level, 1)
+        counters = counters[:level] + [0] * (level - len(counters))
+        counters[level - 1] += 1
+        codes.append('.'.join(map(str, counters)))
+    return pd.Series(codes, index=levels.index, name='WBS')
+
+
+def get_paths(df, wbs_column='WBS', outline_column='OutlineLevel'):
+    """
+    splits WBS codes into the path of WBS elements above each row
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have wbs_column or outline_column
+    wbs_column : str, optional
+        The default is 'WBS'.
+    outline_column : str, optional
+        used for the levels if present, and to make WBS codes if
+        there's no wbs_column. The default is 'OutlineLevel'.
+
+    Returns
+    -------
+    levels : numpy.ndarray
+        depth of each row, 0 if it has no WBS
+    prefixes : list
+        for each depth d, a pandas.Series of the WBS element
+        of each row at depth d (NaN for rows which aren't that deep)
+    """
+    if wbs_column in df.columns:
+        wbs = df[wbs_column]
+    else:
+        assert outline_column in df.columns, f'dataframe must have {wbs_column} or {outline_column}'
+        wbs = wbs_from_outline(df[outline_column])
+
+    parts = wbs.astype('string').str.strip().str.split('.', expand=True)
+    if outline_column in df.columns:
+        levels = pd.to_numeric(df[outline_column], errors='coerce').fillna(0).astype(int).to_numpy()
+    else:
+        levels = parts.notna().sum(axis=1).to_numpy()
+
+    prefixes = [pd.Series(np.nan, index=df.index, dtype=object)]
+    for depth in range(parts.shape[1]):
+        prefix = parts[depth] if depth == 0 else prefixes[-1] + '.' + parts[depth]
+        prefixes.append(prefix.astype(object).where(levels > depth))
+    return levels, prefixes
+
+
+def rollup(df, wbs_column='WBS', outline_column='OutlineLevel'):
+    """
+    summarises every WBS element: the earliest start, latest end, and number of
+    activities and milestones below it (including itself).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have start, end and wbs_column or outline_column
+
+    Returns
+    -------
+    summary : pandas.DataFrame
+        indexed by WBS code, with level, parent, start, end, count and milestones
+    """
+    levels, prefixes = get_paths(df, wbs_column, outline_column)
+    is_milestone = (df.start == df.end).to_numpy()
+
+    summaries = []
+    for depth in range(1, len(prefixes)):
+        elements = prefixes[depth]
+        rows = elements.notna().to_numpy()
+        grouped = pd.DataFrame({'WBS': elements[rows],
+                                'start': df.start[rows],
+                                'end': df.end[rows],
+                                'milestones': is_milestone[rows]}).groupby('WBS', sort=False)
+        summary = grouped.agg(start=('start', 'min'),
+                              end=('end', 'max'),
+                              count=('start', 'size'),
+                              milestones=('milestones', 'sum'))
+        summary['level'] = depth
+        summary['parent'] = prefixes[depth - 1][rows].groupby(elements[rows], sort=False).first()
+        summaries.append(summary)
+
+    if len(summaries) == 0:
+        return pd.DataFrame(columns=['level', 'parent', 'start', 'end', 'count', 'milestones'])
+    return pd.concat(summaries)[['level', 'parent', 'start', 'end', 'count', 'milestones']]
+
+
+def collapse(df, depth, wbs_column='WBS', outline_column='OutlineLevel'):
+    """
+    collapses a schedule to a WBS depth: rows deeper than depth are replaced
+    by one summary row for their WBS element at that depth, spanning their dates.
+    If the schedule already has a row for that WBS element (e.g. an ms project
+    summary task), it is used as the summary row, otherwise a new one is made
+    where the first of its rows was.
+    yvalue and ylabel are removed, as they no longer match the rows.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have start, end, activity_name and wbs_column or outline_column
+    depth : int
+        deepest WBS level to show
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        with extra columns summary (True for summary rows)
+        and rollup_count (number of rows each summary row stands for)
+    """
+    assert depth >= 1, 'collapse depth must be 1 or more'
+    df = df.drop(columns=['yvalue', 'ylabel'], errors='ignore').reset_index(drop=True)
+    levels, prefixes = get_paths(df, wbs_column, outline_column)
+    df['summary'] = False
+    df['rollup_count'] = 1
+    if depth >= len(prefixes) - 1:
+        return df
+
+    hidden = levels > depth
+    elements = prefixes[depth]
+    codes, uniques = pd.factorize(elements[hidden])
+    grouped = pd.DataFrame({'start': df.start[hidden].to_numpy(),
+                            'end': df.end[hidden].to_numpy()}).groupby(codes)
+    starts = grouped.start.min().to_numpy()
+    ends = grouped.end.max().to_numpy()
+    counts = grouped.size().to_numpy()
+
+    # existing rows for the collapsed WBS elements become the summary rows
+    # (the first row for each element at this depth, wherever its children are)
+    existing = (levels == depth) & elements.isin(uniques).to_numpy()
+    existing[existing] = ~elements[existing].duplicated().to_numpy()
+    existing_codes = uniques.get_indexer(elements[existing])
+    df.loc[existing, 'start'] = np.minimum(df.start[existing].to_numpy(), starts[existing_codes])
+    df.loc[existing, 'end'] = np.maximum(df.end[existing].to_numpy(), ends[existing_codes])
+    df.loc[existing, 'rollup_count'] = counts[existing_codes] + 1
+    df.loc[existing, 'summary'] = True
+
+    # otherwise the first hidden row of each element becomes its summary row
+    new_codes = np.setdiff1d(np.arange(len(uniques)), existing_codes)
+    first_rows = pd.Series(np.flatnonzero(hidden)).groupby(codes).first().to_numpy()
+    new_rows = first_rows[new_codes]
+    if len(new_rows) > 0:
+        names = uniques[new_codes].astype(str).to_numpy()
+        text_columns = ['activity_name', wbs_column, 'id', 'predecessors', 'milestone',
+                        'label_text']
+        for column in text_columns:
+            if column in df.columns:
+                df[column] = df[column].astype(object)
+        df.loc[new_rows, 'start'] = starts[new_codes]
+        df.loc[new_rows, 'end'] = ends[new_codes]
+        df.loc[new_rows, 'activity_name'] = [f'{name} ({count})'
+                                             for name, count in zip(names, counts[new_codes])]
+        df.loc[new_rows, 'rollup_count'] = counts[new_codes]
+        df.loc[new_rows, 'summary'] = True
+        if wbs_column in df.columns:
+            df.loc[new_rows, wbs_column] = names
+        if outline_column in df.columns:
+            df.loc[new_rows, outline_column] = depth
+        if 'id' in df.columns:
+            df.loc[new_rows, 'id'] = [f'WBS {name}' for name in names]
+        for column in ['predecessors', 'milestone', 'label_text']:
+            if column in df.columns:
+                df.loc[new_rows, column] = ''
+
+    keep = ~hidden
+    keep[new_rows] = True
+    return df[keep].reset_index(drop=True)
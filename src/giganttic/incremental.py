@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+incremental re-rendering for giganttic
+
+keeps the prepared dataframe and the artists from the last render, keyed by id,
+so that a small change to a large schedule only redraws the rows that changed.
+
+@author: dhancock
+"""
+
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+from matplotlib.lines import Line2D
+from matplotlib.patches import Rectangle
+from matplotlib.text import Annotation
+from matplotlib.ticker import FixedLocator, FixedFormatter
+
+from .colours import ColourRegistry, get_colours
+from .data_validate import get_connections, _as_key
+from .mpl_gantt import gantt_chart
+from .plotly_gantt import gantt_chart as plotly_gantt_chart
+
+DIFF_COLUMNS = ['start', 'end', 'yvalue', 'ylabel', 'activity_name',
+                'fillcolour', 'bordercolour', 'milestone']
+
+
+def diff_schedules(old, new, key='id', columns=None):
+    """
+    row level diff of two schedules, joined on a key column.
+
+    Parameters
+    ----------
+    old : pandas.DataFrame
+
+    new : pandas.DataFrame
+
+    key : str, optional
+        unique id column to join on. The default is 'id'.
+    columns : list, optional
+        columns to compare. The default is DIFF_COLUMNS, where they exist.
+
+    Returns
+    -------
+    diff : pandas.DataFrame
+        one row per key with columns key, old_row, new_row (row numbers, -1 if absent)
+        and status, which is one of:
+            'added', 'removed', 'changed', 'moved' (only yvalue changed), 'unchanged'
+    """
+    if columns is None:
+        columns = [c for c in DIFF_COLUMNS if c in old.columns and c in new.columns]
+
+    old_keys = pd.DataFrame({key: old[key].to_numpy(), 'old_row': np.arange(len(old))})
+    new_keys = pd.DataFrame({key: new[key].to_numpy(), 'new_row': np.arange(len(new))})
+    diff = old_keys.merge(new_keys, on=key, how='outer', indicator=True)
+    diff[['old_row', 'new_row']] = diff[['old_row', 'new_row']].fillna(-1).astype(int)
+
+    both = (diff._merge == 'both').to_numpy()
+    old_rows = diff.old_row.to_numpy()[both]
+    new_rows = diff.new_row.to_numpy()[both]
+    changed = np.zeros(len(old_rows), dtype=bool)
+    moved = np.zeros(len(old_rows), dtype=bool)
+    for column in columns:
+        old_values = pd.Series(old[column].to_numpy()[old_rows])
+        new_values = pd.Series(new[column].to_numpy()[new_rows])
+        differs = ((old_values != new_values)
+                   & ~(old_values.isna() & new_values.isna())).to_numpy()
+        if column == 'yvalue':
+            moved |= differs
+        else:
+            changed |= differs
+
+    status = np.full(len(diff), 'unchanged', dtype=object)
+    status[(diff._merge == 'left_only').to_numpy()] = 'removed'
+    status[(diff._merge == 'right_only').to_numpy()] = 'added'
+    status[np.flatnonzero(both)[moved]] = 'moved'
+    status[np.flatnonzero(both)[changed]] = 'changed'
+    diff['status'] = status
+    return diff.drop(columns='_merge')
+
+
+def _shift_artist(artist, dy):
+    """ moves an artist drawn by gantt_chart up or down by dy """
+    if isinstance(artist, Rectangle):
+        artist.set_y(artist.get_y() + dy)
+    elif isinstance(artist, Annotation):
+        artist.xy = (artist.xy[0], artist.xy[1] + dy)
+        artist.xyann = (artist.xyann[0], artist.xyann[1] + dy)
+    elif isinstance(artist, Line2D):
+        artist.set_ydata(np.asarray(artist.get_ydata(), dtype=float) + dy)
+
+
+class IncrementalGantt():
+    """
+    a gantt chart that can be re-rendered from an updated schedule,
+    only redrawing the rows that have been added, removed or changed.
+
+    Parameters
+    ----------
+    plot_type : str, optional
+        'matplotlib' or 'plotly'. Plotly figures are rebuilt in full on each render.
+    key : str, optional
+        unique id column used to match rows between renders. The default is 'id'.
+    **kwargs :
+        keyword arguments passed to gantt_chart and get_colours on every render.
+        Colours come from colour_registry (a new ColourRegistry by default),
+        so that values keep their colours when new ones are added
+
+    Example
+    -------
+    chart = IncrementalGantt(fillcolumn='WBS', connections=True)
+    chart.render(monday_df)
+    chart.save('plan.png')
+    chart.render(tuesday_df)  # only redraws the rows that changed
+    chart.save('plan.png')
+    """
+
+    def __init__(self, plot_type='matplotlib', key='id', **kwargs):
+        assert plot_type in ['matplotlib', 'plotly'], 'plot_type must be "matplotlib" or "plotly"'
+        self.plot_type = plot_type
+        self.key = key
+        self.options = kwargs
+        if self.options.get('colour_registry', None) is None:
+            self.options['colour_registry'] = ColourRegistry()
+        self.data = None
+        self.ax = None
+        self.figure = None
+        self.artists = {}
+        self.cmaps = None
+        self.last_diff = None
+
+    def prepare(self, df):
+        """ adds yvalue, ylabel and colours in the same way as gantt_chart,
+        keeping the colour maps for gantt_chart in self.cmaps """
+        assert self.key in df.columns, f'dataframe must have a "{self.key}" column'
+        assert df[self.key].is_unique, f'"{self.key}" values must be unique'
+
+        df = df.reset_index(drop=True).copy()
+        if 'yvalue' not in df.columns:
+            df['yvalue'] = list(range(len(df)))
+        if 'ylabel' not in df.columns:
+            df['ylabel'] = df.activity_name
+        maxlength = self.options.get('max_label_length', 100)
+        df.ylabel = df.ylabel.map(
+            lambda x: str(x)[:maxlength-5]+'...' if len(str(x)) > maxlength else str(x))
+        df, self.cmaps = get_colours(df, **self.options)
+        return df
+
+    def render(self, df):
+        """
+        renders the schedule, redrawing only what changed since the last render
+
+        Returns
+        -------
+        ax : matplotlib.axes._axes.Axes
+
+        figure : matplotlib.figure.Figure | plotly.graph_objects.Figure
+        """
+        new = self.prepare(df)
+
+        if self.plot_type == 'plotly':
+            self.ax, self.figure = plotly_gantt_chart(new.copy(), cmaps=self.cmaps,
+                                                       **self.options)
+        elif self.data is None:
+            self.artists = {}
+            self.ax, self.figure = gantt_chart(new.copy(), artists=self.artists,
+                                                cmaps=self.cmaps, **self.options)
+        else:
+            self._update(new)
+
+        self.data = new
+        return self.ax, self.figure
+
+    def _update(self, new):
+        """ applies the difference between self.data and new to the existing artists """
+        diff = diff_schedules(self.data, new, self.key)
+        self.last_diff = diff
+
+        # remove deleted and changed rows
+        stale = diff.loc[diff.status.isin(['removed', 'changed']), self.key]
+        for key in stale:
+            for artist in self.artists.pop(key, []):
+                artist.remove()
+
+        # move rows that have only changed position
+        moved = diff[diff.status == 'moved']
+        shifts = (new.yvalue.to_numpy()[moved.new_row]
+                  - self.data.yvalue.to_numpy()[moved.old_row])
+        for key, dy in zip(moved[self.key], shifts):
+            for artist in self.artists.get(key, []):
+                _shift_artist(artist, dy)
+
+        # connections touching anything that has changed need redrawing
+        options = dict(self.options)
+        touched = diff.loc[diff.status != 'unchanged', self.key]
+        if options.get('connections', False) is True and len(touched) > 0:
+            touched = set(_as_key(touched))
+            for link in [k for k in self.artists if isinstance(k, tuple) and k[0] == 'link']:
+                if link[1] in touched or link[2] in touched:
+                    for artist in self.artists.pop(link):
+                        artist.remove()
+            links = get_connections(new)
+            options['links'] = links[links.id.isin(touched) | links.predecessor.isin(touched)]
+        else:
+            options['connections'] = False
+
+        # draw new and changed rows onto the existing axes
+        redraw = diff.loc[diff.status.isin(['added', 'changed']), 'new_row'].sort_values()
+        options.update(ax=self.ax, artists=self.artists, draw_rows=redraw.tolist(), nowline=False,
+                       cmaps=self.cmaps)
+        gantt_chart(new.copy(), **options)
+
+        # update the axes
+        self.ax.yaxis.set_major_locator(FixedLocator(new.yvalue.tolist()))
+        self.ax.yaxis.set_major_formatter(FixedFormatter(new.ylabel.tolist()))
+        self.ax.set_ylim((new.yvalue.max()+1, new.yvalue.min()-1))
+        if self.options.get('dates', None) is None:
+            self.ax.set_xlim(mdates.date2num(new.start.min()), mdates.date2num(new.end.max()))
+
+    def save(self, output_file, **kwargs):
+        """ saves the current figure """
+        if self.plot_type == 'plotly':
+            if output_file.endswith('.html'):
+                self.figure.write_html(output_file, **kwargs)
+            else:
+                self.figure.write_image(output_file, **kwargs)
+        else:
+            self.figure.savefig(output_file, **kwargs)
+        return output_file
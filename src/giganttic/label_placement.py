@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+milestone label placement for giganttic
+
+places, staggers or drops milestone labels before they are drawn,
+using estimated label sizes and a grid spatial index,
+so that dense milestones don't print over each other.
+
+@author: dhancock
+"""
+
+import numpy as np
+import pandas as pd
+
+# candidate positions, tried in order: (anchor, horizontal, vertical alignment)
+#   'default' is where plot_event has always put the label,
+#   'right' and 'left' are beside the marker, 'above' and 'below' are clear of the row
+CANDIDATES = [('default', 'center', 'bottom'),
+              ('right', 'left', 'center'),
+              ('left', 'right', 'center'),
+              ('above', 'center', 'bottom'),
+              ('below', 'center', 'top')]
+
+
+def milestone_label_text(df):
+    """ the label text plot_event uses for each row """
+    texts = df['label_text'] if 'label_text' in df.columns else df['activity_name']
+    return texts.astype(str).str.replace('\\n', '\n', regex=False)
+
+
+def estimate_label_extents(texts, fontsize, dpi=72, char_width=0.6, line_height=1.2):
+    """
+    estimates the size of text labels in pixels without drawing them
+
+    Parameters
+    ----------
+    texts : pandas.Series
+
+    fontsize : float
+        in points
+    dpi : float, optional
+        The default is 72 (i.e. sizes in points).
+    char_width : float, optional
+        average character width as a fraction of the font size. The default is 0.6.
+    line_height : float, optional
+        line height as a fraction of the font size. The default is 1.2.
+
+    Returns
+    -------
+    widths, heights : numpy.ndarray
+    """
+    lines = texts.str.split('\n')
+    characters = lines.map(lambda x: max(len(line) for line in x)).to_numpy(dtype=float)
+    n_lines = lines.str.len().to_numpy(dtype=float)
+    pixels = fontsize * dpi / 72
+    return characters * char_width * pixels, n_lines * line_height * pixels
+
+
+def _boxes(anchor_x, anchor_y, widths, heights, ha, va):
+    """ x0, y0, x1, y1 of labels drawn at an anchor with the given alignment """
+    x0 = anchor_x - {'center': widths/2, 'left': 0, 'right': widths}[ha]
+    y0 = anchor_y - {'center': heights/2, 'bottom': 0, 'top': heights}[va]
+    return x0, y0, x0 + widths, y0 + heights
+
+
+def place_labels(boxes, padding=1.0):
+    """
+    greedily places labels, trying each candidate box in turn and
+    skipping any that overlap a label already placed.
+    Labels are placed left to right, and overlaps are found with
+    a uniform grid spatial index, so the cost is O(n log n) for the sort
+    and roughly constant per label.
+
+    Parameters
+    ----------
+    boxes : numpy.ndarray
+        shape (candidates, labels, 4) of x0, y0, x1, y1
+    padding : float, optional
+        minimum gap between labels. The default is 1.0.
+
+    Returns
+    -------
+    choice : numpy.ndarray
+        the candidate used for each label, or -1 if it was dropped
+    """
+    n_candidates, n_labels, _ = boxes.shape
+    choice = np.full(n_labels, -1)
+    if n_labels == 0:
+        return choice
+
+    sizes = boxes[0, :, 2:] - boxes[0, :, :2]
+    cell_width, cell_height = np.maximum(np.median(sizes, axis=0), 1.0)
+    cells = np.floor(np.concatenate([boxes[..., :2] - padding, boxes[..., 2:] + padding], axis=2)
+                     / [cell_width, cell_height, cell_width, cell_height]).astype(int).tolist()
+    coordinates = boxes.tolist()
+
+    grid = {}
+    for label in np.argsort(boxes[0, :, 0], kind='stable').tolist():
+        for candidate in range(n_candidates):
+            x0, y0, x1, y1 = coordinates[candidate][label]
+            cx0, cy0, cx1, cy1 = cells[candidate][label]
+            keys = [(cx, cy) for cx in range(cx0, cx1+1) for cy in range(cy0, cy1+1)]
+            clash = False
+            for key in keys:
+                for px0, py0, px1, py1 in grid.get(key, ()):
+                    if (x0 < px1 + padding and px0 < x1 + padding
+                            and y0 < py1 + padding and py0 < y1 + padding):
+                        clash = True
+                        break
+                if clash:
+                    break
+            if not clash:
+                choice[label] = candidate
+                for key in keys:
+                    grid.setdefault(key, []).append((x0, y0, x1, y1))
+                break
+    return choice
+
+
+def place_milestone_labels(df, ax, fontsize, max_label_offset=1.0, **kwargs):
+    """
+    works out where to draw each milestone label on an axes which has its
+    limits set, adding label_x, label_y, label_ha, label_va and label_visible columns
+    which plot_event uses.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have x_start, x_end (see add_axis_dates) and yvalue
+    ax : matplotlib.axes._axes.Axes
+
+    fontsize : float
+        label font size in points
+    max_label_offset : float, optional
+        how far above/below the row the staggered labels go, in rows. The default is 1.0.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+
+    suppressed : int
+        number of labels dropped because there was no room for them
+    """
+    starts = df.x_start.to_numpy(dtype=float)
+    ends = df.x_end.to_numpy(dtype=float)
+    milestones = (starts == ends) & df.yvalue.notna().to_numpy()
+
+    df['label_visible'] = True
+    df['label_x'] = np.nan
+    df['label_y'] = np.nan
+    df['label_ha'] = 'center'
+    df['label_va'] = 'bottom'
+    if milestones.sum() == 0:
+        return df, 0
+
+    x = starts[milestones]
+    y = df.yvalue.to_numpy(dtype=float)[milestones]
+    heights_data = np.broadcast_to(np.asarray(df.get('bar_size', 0.9), dtype=float),
+                                   (len(df),))[milestones]
+    widths, heights = estimate_label_extents(milestone_label_text(df[milestones]),
+                                             fontsize, ax.get_figure().get_dpi())
+    marker = fontsize * ax.get_figure().get_dpi() / 72
+
+    # anchors in data coordinates, then converted to pixels all at once
+    anchors = {'default': (x, y + heights_data),
+               'right': (x, y),
+               'left': (x, y),
+               'above': (x, y - heights_data/2 - max_label_offset),
+               'below': (x, y + heights_data/2 + max_label_offset)}
+    shifts = {'right': marker, 'left': -marker}
+    pixel_anchors = {}
+    for name, (anchor_x, anchor_y) in anchors.items():
+        pixels = ax.transData.transform(np.column_stack([anchor_x, anchor_y]))
+        pixels[:, 0] += shifts.get(name, 0)
+        pixel_anchors[name] = pixels
+
+    boxes = np.stack([np.column_stack(_boxes(pixel_anchors[name][:, 0], pixel_anchors[name][:, 1],
+                                             widths, heights, ha, va))
+                      for name, ha, va in CANDIDATES])
+    choice = place_labels(boxes)
+
+    # convert the chosen anchors back to data coordinates
+    chosen = np.stack([pixel_anchors[name] for name, _, _ in CANDIDATES])[
+        np.maximum(choice, 0), np.arange(len(choice))]
+    label_xy = ax.transData.inverted().transform(chosen)
+
+    rows = df.index[milestones]
+    df.loc[rows, 'label_visible'] = choice >= 0
+    df.loc[rows, 'label_x'] = label_xy[:, 0]
+    df.loc[rows, 'label_y'] = label_xy[:, 1]
+    df.loc[rows, 'label_ha'] = np.array([c[1] for c in CANDIDATES])[np.maximum(choice, 0)]
+    df.loc[rows, 'label_va'] = np.array([c[2] for c in CANDIDATES])[np.maximum(choice, 0)]
+
+    suppressed = int((choice < 0).sum())
+    return df, suppressed
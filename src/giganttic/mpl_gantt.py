@@ -7,35 +7,239 @@ Created on Fri May  5 08:32:23 2023
 @author: dhancock
 """
 
+import heapq
+import logging
 import os
+import weakref
+from functools import lru_cache
 from datetime import datetime as dt
+import numpy as np
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.patches import Rectangle, Patch
+from matplotlib.font_manager import FontProperties
+from matplotlib.ticker import FixedLocator, FixedFormatter
+from matplotlib.collections import PolyCollection
+from matplotlib.cm import ScalarMappable
+from mpl_toolkits.axes_grid1 import make_axes_locatable
 
 from .colours import get_colours
+from .data_validate import get_connections
+from .data_modify import get_loading
+from .hierarchy import collapse
+from .label_placement import place_milestone_labels
+from .profiling import profiling, stage
 
-_verbose = False
+logger = logging.getLogger('giganttic')
 
+# font size and label colour of each figure set up by gantt_chart,
+# kept per figure instead of in the global rcParams so that charts
+# can be drawn in parallel threads
+_figure_styles = weakref.WeakKeyDictionary()
 
-def get_figure_dimensions(rows):
 
+@lru_cache(maxsize=1)
+def _figure_sizes():
     figure_size_filename = os.path.join(os.path.dirname(os.path.abspath(__file__)),
                                         'figure_sizes.csv')
-    figure_sizes = pd.read_csv(figure_size_filename, header=0)
+    return pd.read_csv(figure_size_filename, header=0, encoding='utf-8-sig')
+
+
+def get_figure_dimensions(rows):
+
+    figure_sizes = _figure_sizes()
     dimensions = figure_sizes.loc[
         figure_sizes.max_rows == min(figure_sizes.max_rows, key=lambda x: abs(x-rows))]
 
     return dimensions.iloc[0].to_dict()
 
 
+@lru_cache(maxsize=1)
+def _measuring_renderer():
+    """ a renderer at 72 dpi, so that text is measured in points """
+    return FigureCanvasAgg(Figure(dpi=72)).get_renderer()
+
+
+@lru_cache(maxsize=4096)
+def text_extent(text, fontsize):
+    """
+    the width and height of a line of text in points, in the default font.
+    Measured once for each text and size, without drawing anything.
+    """
+    width, height, _ = _measuring_renderer().get_text_width_height_descent(
+        text, FontProperties(size=fontsize), ismath=False)
+    return width, height
+
+
+def fit_layout(fig, ax, ylabels, fontsize, title_fontsize=None, pad=1.08, candidates=20):
+    """
+    sets the margins of a single axes figure from the size of its longest y labels,
+    the date tick labels and the title, measured with text_extent, instead of
+    tight_layout, which has to draw every tick label to measure it.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+
+    ax : matplotlib.axes.Axes
+
+    ylabels : list
+        y tick labels
+    fontsize : float
+        tick label size
+    title_fontsize : float, optional
+        The default is the size of the axes title.
+    pad : float, optional
+        padding around the edge, as a fraction of fontsize, as tight_layout.
+        The default is 1.08.
+    candidates : int, optional
+        number of the longest labels (in characters) to measure. The default is 20.
+    """
+    width, height = fig.get_size_inches() * 72
+    padding = pad * fontsize
+    title_fontsize = ax.title.get_fontsize() if title_fontsize is None else title_fontsize
+
+    longest = heapq.nlargest(candidates, set(map(str, ylabels)), key=len)
+    label_width = max([text_extent(label, fontsize)[0] for label in longest], default=0)
+    date_width, date_height = text_extent('0000-00-00', fontsize)
+    title_lines = ax.get_title().split('\n') if ax.get_title() != '' else []
+    title_height = sum(text_extent(line, title_fontsize)[1] * 1.2 for line in title_lines)
+
+    left = (padding + label_width + plt.rcParams['ytick.major.pad']) / width
+    right = 1 - (padding + date_width / 2) / width
+    bottom = (padding + date_height + plt.rcParams['xtick.major.size']
+              + plt.rcParams['xtick.major.pad']) / height
+    top = 1 - (padding + title_height + plt.rcParams['axes.titlepad']) / height
+    fig.subplots_adjust(left=min(left, 0.5), right=max(right, 0.6),
+                        bottom=min(bottom, 0.3), top=max(top, 0.7))
+
+
+def get_figure_style(fig):
+    """ returns the font_size and label_colour a gantt chart figure was set up with """
+    return _figure_styles.get(fig, {'font_size': matplotlib.rcParams['font.size'],
+                                    'label_colour': 'black'})
+
+
+def new_figure(show_figure=False, **kwargs):
+    """
+    creates a figure. Unless it needs to be shown, the figure isn't
+    registered with pyplot, so it can't leak or be changed by other threads,
+    and is garbage collected when it's no longer used.
+
+    Parameters
+    ----------
+    show_figure : bool, optional
+        create the figure with pyplot, so that it can be shown. The default is False.
+    **kwargs :
+        passed to matplotlib.figure.Figure
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure
+    """
+    if show_figure is True:
+        return plt.figure(**kwargs)
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def add_axis_dates(df, numerical_dates=False, **kwargs):
+    """
+    adds x_start and x_end columns of float x axis coordinates,
+    converting the start and end columns once, so the drawing stages
+    don't convert dates one row at a time
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have start and end
+    numerical_dates : bool, optional
+        start and end are numbers, which are used as they are. The default is False.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+    """
+    for column in ['start', 'end']:
+        if numerical_dates is True or pd.api.types.is_numeric_dtype(df[column]):
+            df[f'x_{column}'] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+        else:
+            df[f'x_{column}'] = mdates.date2num(pd.to_datetime(df[column]))
+    return df
+
+
+def loading_chart(df, ax=None, freq='W', by=None, colours=None, **kwargs):
+    """
+    plots the number of activities in progress in each period as a stacked area
+    (see get_loading), either on its own or on an axes under a gantt chart.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        must have start and end
+    ax : matplotlib.axes._axes.Axes, optional
+        The default is a new figure.
+    freq : str, optional
+        pandas period frequency. The default is 'W'.
+    by : str, optional
+        column to stack by, e.g. the fillcolumn. The default is None.
+    colours : dict, optional
+        colour for each value of by. The default is the fillcolour column
+        (see get_colours) if there is one.
+
+    Returns
+    -------
+    ax : matplotlib.axes._axes.Axes
+
+    fig : matplotlib.figure.Figure
+    """
+    if ax is None:
+        fig = new_figure(show_figure=kwargs.get('show_figure', False),
+                         figsize=kwargs.get('figsize', (10, 3)),
+                         dpi=kwargs.get('dpi', 150),
+                         facecolor=kwargs.get('background_colour', 'white'))
+        ax = fig.add_subplot(111)
+        ax.set_title(kwargs.get('title', 'Loading'))
+        locator = mdates.AutoDateLocator(minticks=3)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.AutoDateFormatter(locator))
+    else:
+        fig = ax.get_figure()
+    font_size = get_figure_style(fig)['font_size']
+
+    with stage('get_loading', rows=len(df)):
+        loading = get_loading(df, freq=freq, by=by,
+                              start=kwargs.get('start', None), end=kwargs.get('end', None))
+    if colours is None and by is not None and 'fillcolour' in df.columns:
+        colours = df.drop_duplicates(by).set_index(by).fillcolour.to_dict()
+    colour_list = None if colours is None else [colours.get(c, '#aaaaaa') for c in loading.columns]
+
+    # steps, so the last period needs an end
+    x = mdates.date2num(loading.index)
+    x = np.append(x, x[-1] + (x[-1] - x[-2] if len(x) > 1 else 1))
+    counts = loading.to_numpy().T
+    counts = np.hstack([counts, counts[:, -1:]])
+    ax.stackplot(x, counts, labels=[str(c) for c in loading.columns],
+                 colors=colour_list, step='post', linewidth=0)
+    ax.set_ylim(bottom=0)
+    ax.set_ylabel(kwargs.get('loading_label', 'active'), fontsize=font_size)
+    ax.tick_params(labelsize=font_size)
+    return ax, fig
+
+
 def gantt_chart(df,
                 title="Gantt Chart",
                 legend=False,
                 nowline=True,
                 connections=False,
                 bar_labels=False,
+                ax=None,
+                artists=None,
                 **kwargs
                 ):
     """ the main gantt chart function.
@@ -44,6 +248,36 @@ def gantt_chart(df,
     ----------
     df : DataFrame
 
+    ax : matplotlib.axes._axes.Axes, optional
+        draw onto an existing gantt chart instead of setting up a new figure
+    artists : dict, optional
+        if given, is populated with a list of the artists drawn for each row,
+        keyed by the artist_key column (default 'id', or the row number),
+        each connection arrow, keyed by ('link', id, predecessor),
+        and the baseline ghosts of every row, keyed by ('baseline',)
+    draw_rows : list, optional
+        row numbers to draw, for partial redraws onto an existing ax.
+        The default is all rows.
+    baseline : bool, optional
+        draw ghosts of the baseline_start and baseline_end dates under each row
+        (see compare_schedules). The default is True if df has baseline_start.
+    profile : bool | str | callable, optional
+        report the time, rows and peak memory of each stage (see giganttic.profiling)
+    collapse_depth : int, optional
+        only draw the WBS down to this depth, with a summary row for each
+        collapsed WBS element (see giganttic.hierarchy.collapse)
+    loading : bool, optional
+        add a strip under the chart showing the number of activities in progress
+        in each loading_freq period (default 'W'), stacked by the fillcolumn
+        (see loading_chart). The default is False.
+    label_placement : bool, optional
+        move milestone labels which would overlap each other beside, above or
+        below their milestone, and drop any which still don't fit
+        (see giganttic.label_placement). The default is True.
+    cmaps : dict, optional
+        the colour maps returned by get_colours, if df already has its colour
+        columns, so that get_colours isn't run again
+
     Returns
     -------
     ax : ax
@@ -55,7 +289,7 @@ def gantt_chart(df,
                      dates=None,
                      yvalues=None,
                      max_label_length=100,
-                     tight_layout=True,
+                     tight_layout='auto',
                      show_figure=False,
                      **kwargs
                      ):
@@ -79,6 +313,10 @@ def gantt_chart(df,
             DESCRIPTION. The default is None.
         figratio : str, optional
             DESCRIPTION. The default is 'print'.
+        tight_layout : bool | str, optional
+            True for matplotlib's tight_layout, 'metrics' to set the margins
+            from measured text sizes without drawing (see fit_layout), or
+            'auto' for 'metrics' with more than 100 rows. The default is 'auto'.
         **kwargs : TYPE
             DESCRIPTION.
 
@@ -95,14 +333,13 @@ def gantt_chart(df,
             DESCRIPTION.
 
         """
-        if show_figure is False:
-            plt.ioff()
-
         # set the date range
         if dates is None:
-            dates = (min(df.start[df.start.notna()]), max(df.end[df.end.notna()]))
-        if dates[0] == dates[1]:
-            dates = [dt(2022, 1, 1), dt(2050, 1, 1)]
+            xlimits = [np.nanmin(df.x_start), np.nanmax(df.x_end)]
+        else:
+            xlimits = [d if isinstance(d, (int, float)) else mdates.date2num(d) for d in dates]
+        if xlimits[0] == xlimits[1]:
+            xlimits = mdates.date2num([dt(2022, 1, 1), dt(2050, 1, 1)])
 
         # get the yvalues and labels
         if yvalues is None:
@@ -111,66 +348,70 @@ def gantt_chart(df,
             maxlength = max_label_length
             df.ylabel = df.ylabel.map(
                 lambda x: str(x)[:maxlength-5]+'...' if len(str(x)) > maxlength else str(x))
-            yvalues = [df.yvalue.tolist(), df.ylabel.tolist()]
+            # one tick per row, preferring a non-blank label where rows share a yvalue
+            ticks = df[['yvalue', 'ylabel']][df.yvalue.notna()]
+            ticks = ticks.iloc[np.argsort(ticks.ylabel.eq('').to_numpy(), kind='stable')]
+            ticks = ticks.drop_duplicates('yvalue')
+            yvalues = [ticks.yvalue.tolist(), ticks.ylabel.tolist()]
 
         # get figure and font size and dpi
-        n_rows = len(yvalues)
+        n_rows = len(yvalues[0])
         dimensions = get_figure_dimensions(n_rows)
 
-        if _verbose is True:
-            print(_verbose)
-            print(f'DEBUG: {dimensions}')
-
-        plt.rcParams['font.size'] = dimensions['font_size']
-        plt.rcParams['text.color'] = kwargs.get('label_colour', 'black')
-        plt.rcParams['figure.dpi'] = dimensions['dpi']
-        plt.rcParams['figure.figsize'] = [dimensions['figure_width'], dimensions['figure_height']]
+        font_size = dimensions['font_size']
+        label_colour = kwargs.get('label_colour', 'black')
 
         # print('DEBUG: ',kwargs.get('background_colour'))                            #DEBUG
-        fig = plt.figure(
+        fig = new_figure(
+            show_figure=show_figure,
             figsize=[dimensions['figure_width'], dimensions['figure_height']],
             dpi=dimensions['dpi'],
-            num=title,
             facecolor=kwargs.get('background_colour', 'white'),
             edgecolor=kwargs.get('background_colour', 'white')
             )
+        fig.set_label(title)
+        _figure_styles[fig] = {'font_size': font_size, 'label_colour': label_colour}
 
         ax = fig.add_subplot(111)
-        ax.set_title(title)
+        ax.set_title(title, fontsize=font_size*1.2, color=label_colour)
+        ax.tick_params(labelsize=font_size)
         ax.set_facecolor(kwargs.get('background_colour', 'white'))
         for spine in ax.spines.values():
             spine.set_edgecolor(kwargs.get('background_colour', 'white'))
 
         # assign date locator / formatter to the x-axis to get proper labels
-        locator = mdates.AutoDateLocator(minticks=3)
-        formatter = mdates.AutoDateFormatter(locator)
-        ax.xaxis.set_major_locator(locator)
-        ax.xaxis.set_major_formatter(formatter)
-
-        # set yaxis labels
-        ax.set_yticks(yvalues[0], yvalues[1])
+        if kwargs.get('numerical_dates', False) is False:
+            locator = mdates.AutoDateLocator(minticks=3)
+            formatter = mdates.AutoDateFormatter(locator)
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(formatter)
+
+        # set yaxis labels, without making a tick object for each row until it's drawn
+        ax.yaxis.set_major_locator(FixedLocator(yvalues[0]))
+        ax.yaxis.set_major_formatter(FixedFormatter(yvalues[1]))
         ax.tick_params('y', length=0)
 
         # set x and y limits
-        if dates is None:
-            dates = [dt.now(), dt(2050, 1, 1)]
-        xlimits = (mdates.date2num(d) for d in dates)
-        plt.xlim(xlimits)
+        ax.set_xlim(xlimits)
 
         if yvalues is None:
             ylimits = (dimensions['rows'], -1)
         else:
             ylimits = (max(yvalues[0])+1, min(yvalues[0])-1)
-        plt.ylim(ylimits)
+        ax.set_ylim(ylimits)
 
-        plt.grid(linestyle="--", color="#eeeeee", zorder=0)
+        ax.grid(linestyle="--", color="#eeeeee", zorder=0)
         # set tight layout, if requested
+        if tight_layout == 'auto':
+            tight_layout = 'metrics' if n_rows > 100 else True
         if tight_layout is True:
-            plt.tight_layout()
+            fig.tight_layout()
+        elif tight_layout == 'metrics':
+            fit_layout(fig, ax, yvalues[1], font_size, font_size*1.2)
 
         return ax, fig
 
-    def add_bar_labels(df, label_column='milestone', **kwargs):
+    def add_bar_labels(df, ax, label_column='milestone', keys=None, **kwargs):
         """
         add extra labels to the middle of any bars from a given column.
         Feature included because of the need to understand some poorly planned data,
@@ -186,21 +427,23 @@ def gantt_chart(df,
 
         """
         zorder = len(df)+10
-        for row, event in df.iterrows():
-            if event.end != event.start:
-                label_text = event.get(label_column, event.activity_name)
-                xval = mdates.date2num(event.start + (event.end-event.start)/2)
-                yval = event.yvalue
-                # print('DEBUG: ', label_text, xval, yval)
-                ax = plt.gca()
-                ax.annotate(
-                    text=label_text,
-                    xy=(xval, yval),
-                    zorder=zorder,
-                    c=kwargs.get('label_colour', 'white'),
-                    va='center',
-                    ha='center',
-                    fontsize=plt.rcParams['font.size']*0.6)
+        bars = (df.x_end != df.x_start).to_numpy()
+        label_texts = df[label_column] if label_column in df.columns else df.activity_name
+        xvals = ((df.x_start + df.x_end)/2).to_numpy()
+        yvals = df.yvalue.to_numpy()
+        for row, label_text, xval, yval in zip(df.index[bars], label_texts[bars],
+                                               xvals[bars], yvals[bars]):
+            # print('DEBUG: ', label_text, xval, yval)
+            label = ax.annotate(
+                text=label_text,
+                xy=(xval, yval),
+                zorder=zorder,
+                c=kwargs.get('label_colour', 'white'),
+                va='center',
+                ha='center',
+                fontsize=style['font_size']*0.6)
+            if artists is not None:
+                artists.setdefault(keys[row], []).append(label)
 
         return df
 
@@ -221,9 +464,13 @@ def gantt_chart(df,
 
         ax: matplotlib.axes._axes.Axes
 
+        Returns
+        -------
+        drawn: list
+            the artists added to the axes
         """
-        start = mdates.date2num(event.start)
-        end = mdates.date2num(event.end)
+        start = event.x_start
+        end = event.x_end
         width = end - start
         x = start
         y = event.yvalue
@@ -233,9 +480,9 @@ def gantt_chart(df,
         border_colour = event.get('bordercolour', kwargs.get('border_colour', None))
 
         # plot as a zero length milestone
-        milestone_size = plt.rcParams['font.size']*0.5
+        milestone_size = style['font_size']*0.5
         if width == 0:
-            ax.plot(x, y,
+            drawn = ax.plot(x, y,
                     marker="D",
                     color=fill_colour,
                     markersize=milestone_size
@@ -251,15 +498,26 @@ def gantt_chart(df,
             label_text = event.get(
                 'label_text', event.get('activity_name', None)).replace('\\n', '\n')
             # print('DEBUG: \n', label_text)
-            ax.annotate(
-                text=label_text,
-                # text='test\ntext',
-                xy=(x, y+height/2),
-                xytext=(x, y+height),
-                c=kwargs.get('label_colour', 'red'),
-                va='bottom',
-                ha='center',
-                fontsize=plt.rcParams['font.size']*0.5)
+            if 'label_x' not in event or pd.isna(event.label_x):
+                drawn.append(ax.annotate(
+                    text=label_text,
+                    # text='test\ntext',
+                    xy=(x, y+height/2),
+                    xytext=(x, y+height),
+                    c=kwargs.get('label_colour', 'red'),
+                    va='bottom',
+                    ha='center',
+                    fontsize=style['font_size']*0.5))
+            # use the position from place_milestone_labels
+            elif event.label_visible:
+                drawn.append(ax.annotate(
+                    text=label_text,
+                    xy=(x, y),
+                    xytext=(event.label_x, event.label_y),
+                    c=kwargs.get('label_colour', 'red'),
+                    va=event.label_va,
+                    ha=event.label_ha,
+                    fontsize=style['font_size']*0.5))
 
         # plot as a bar
         else:
@@ -273,10 +531,14 @@ def gantt_chart(df,
                 shape.set_edgecolor(border_colour)
             shape.set_zorder(10)
             ax.add_patch(shape)
+            drawn = [shape]
+
+        return drawn
 
     def plot_connections(df,
                          ax,
                          line_colour="grey",
+                         links=None,
                          **kwargs):
         """
         Add connection arrows.
@@ -289,6 +551,8 @@ def gantt_chart(df,
 
         line_colour : str, optional
             The default is "grey".
+        links : DataFrame, optional
+            output of get_connections, to only draw some of the connections
         **kwargs :
 
 
@@ -308,43 +572,44 @@ def gantt_chart(df,
         line_style_error = ':'
         line_radius = kwargs.get('line_radius', 8)
 
-        assert 'predecessors' in df.columns, 'no predecessors defined in dataframe'
-        df.predecessors = df.predecessors.str.split(',')
-        df.loc[df.predecessors.map(
-            lambda x: x == ['']), 'predecessors'] = float('nan')
-
-        for row, event in df.loc[df.predecessors.notna()].iterrows():
-            x_end = float(mdates.date2num(event.start))
-            y_end = float(event.yvalue)
-
-            for predecessor in event.predecessors:
-
-                predecessor_row = df[df.id == predecessor]
-                x_start = float(mdates.date2num(predecessor_row.end))
-                y_start = float(predecessor_row.yvalue)
-                # print(f'DEBUG:\n\t x = {x_start}, {x_end}\n\t y = {y_start}, {y_end}')
-                if y_start != y_end:
-                    if x_end < x_start:
-                        connection_line_colour = line_colour_error
-                        connection_line_style = line_style_error
-                    else:
-                        connection_line_colour = line_colour
-                        connection_line_style = line_style
-                    if x_end == x_start:
-                        connection_style = "arc3,rad=0"
-                    else:
-                        connection_style = f"angle,angleA=-90,angleB=180,rad={line_radius}"
-                    ax.annotate("",
-                                xy=[x_end, y_end], xycoords='data',
-                                xytext=[x_start, y_start], textcoords='data',
-                                arrowprops={'arrowstyle': arrow_style,
-                                            'linestyle': connection_line_style,
-                                            'color': connection_line_colour,
-                                            'shrinkA': 8,
-                                            'shrinkB': 8,
-                                            'connectionstyle': connection_style},
-                                zorder=100
-                                )
+        if links is None:
+            links = get_connections(df)
+        links = links[links.predecessor_row >= 0]
+        successors = df.iloc[links.successor_row]
+        predecessors = df.iloc[links.predecessor_row]
+        x_ends = successors.x_start.to_numpy()
+        y_ends = successors.yvalue.to_numpy(dtype=float)
+        x_starts = predecessors.x_end.to_numpy()
+        y_starts = predecessors.yvalue.to_numpy(dtype=float)
+
+        link_keys = zip(links.id, links.predecessor)
+        for x_start, y_start, x_end, y_end, link_key in zip(
+                x_starts, y_starts, x_ends, y_ends, link_keys):
+            # print(f'DEBUG:\n\t x = {x_start}, {x_end}\n\t y = {y_start}, {y_end}')
+            if y_start != y_end:
+                if x_end < x_start:
+                    connection_line_colour = line_colour_error
+                    connection_line_style = line_style_error
+                else:
+                    connection_line_colour = line_colour
+                    connection_line_style = line_style
+                if x_end == x_start:
+                    connection_style = "arc3,rad=0"
+                else:
+                    connection_style = f"angle,angleA=-90,angleB=180,rad={line_radius}"
+                arrow = ax.annotate("",
+                            xy=[x_end, y_end], xycoords='data',
+                            xytext=[x_start, y_start], textcoords='data',
+                            arrowprops={'arrowstyle': arrow_style,
+                                        'linestyle': connection_line_style,
+                                        'color': connection_line_colour,
+                                        'shrinkA': 8,
+                                        'shrinkB': 8,
+                                        'connectionstyle': connection_style},
+                            zorder=100
+                            )
+                if artists is not None:
+                    artists[('link', *link_key)] = [arrow]
 
         return df, ax
 
@@ -366,6 +631,7 @@ def gantt_chart(df,
 
         legend_sections: list, optional
             Default is ['fill', 'border', 'customcolours']
+            With continuous_fill, the fill section is a colour bar
 
         Returns
         -------
@@ -384,8 +650,23 @@ def gantt_chart(df,
                                      ['fill', 'border', 'customcolours'])
 
         patches = []
+        # continuous fill colours get a colour bar instead
+        if fillcolumn is not None and 'fill' in legend_sections \
+                and isinstance(cmaps, dict) and 'fill_norm' in cmaps:
+            units = cmaps.get('fill_units', '')
+            colourbar = fig.colorbar(ScalarMappable(norm=cmaps['fill_norm'], cmap=cmaps['fill']),
+                                     ax=ax, pad=0.01, fraction=0.03)
+            colourbar.set_label(f'{fillcolumn} ({units})' if units in ['days'] else fillcolumn,
+                                fontsize=style['font_size']*0.833,
+                                color=style['label_colour'])
+            colourbar.ax.tick_params(labelsize=style['font_size']*0.833)
+            if units == 'date':
+                locator = mdates.AutoDateLocator()
+                colourbar.ax.yaxis.set_major_locator(locator)
+                colourbar.ax.yaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
         # draw the fill column section of the legend
-        if fillcolumn is not None and 'fill' in legend_sections:
+        elif fillcolumn is not None and 'fill' in legend_sections:
             fill_df = df.loc[df.customcolour.isna(), [fillcolumn, 'fillcolour']].drop_duplicates()
             fill_dict = pd.Series(fill_df.fillcolour.values, index=fill_df[fillcolumn]).to_dict()
             # print(fill_dict)                                                               #DEBUG
@@ -432,53 +713,176 @@ def gantt_chart(df,
                 patches.append(patch)
 
         if len(patches) != 0:
-            plt.rcParams['legend.framealpha'] = 0.5
-            ax.legend(handles=patches, framealpha=0.5, fontsize='small')
-        else:
-            print("no legend items generated")
+            ax.legend(handles=patches, framealpha=0.5, fontsize=style['font_size']*0.833)
+        elif not (isinstance(cmaps, dict) and 'fill_norm' in cmaps):
+            logger.info('no legend items generated')
+
+    def add_baseline(df,
+                     ax,
+                     baseline_colour='#999999',
+                     baseline_alpha=0.5,
+                     baseline_offset=0.25,
+                     **kwargs):
+        """
+        draws a ghost of the baseline dates under each bar and milestone,
+        as one collection for all the bars and one scatter for all the milestones.
+        Needs baseline_start and baseline_end columns, from compare_schedules.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+
+        ax : matplotlib.axes._axes.Axes
+
+        baseline_colour : str, optional
+            The default is '#999999'.
+        baseline_alpha : float, optional
+            The default is 0.5.
+        baseline_offset : float, optional
+            how far below the current bar to draw the ghost. The default is 0.25.
+
+        Returns
+        -------
+        ghosts: list
+            the bar collection and milestone markers
+        """
+        has_baseline = (df.baseline_start.notna() & df.baseline_end.notna()).to_numpy()
+        starts = mdates.date2num(df.baseline_start[has_baseline])
+        ends = mdates.date2num(df.baseline_end[has_baseline])
+        yvalues = df.yvalue[has_baseline].to_numpy(dtype=float) + baseline_offset
+        heights = np.asarray(df.get('bar_size', 0.9), dtype=float)
+        heights = np.broadcast_to(heights, (len(df),))[has_baseline]
+        bars = starts != ends
+
+        tops = yvalues[bars] - heights[bars]/2
+        bottoms = yvalues[bars] + heights[bars]/2
+        verts = np.stack([np.column_stack([starts[bars], tops]),
+                          np.column_stack([ends[bars], tops]),
+                          np.column_stack([ends[bars], bottoms]),
+                          np.column_stack([starts[bars], bottoms])], axis=1)
+        ghost_bars = PolyCollection(verts,
+                                    facecolors=baseline_colour,
+                                    edgecolors='none',
+                                    alpha=baseline_alpha,
+                                    zorder=5)
+        ax.add_collection(ghost_bars, autolim=False)
+
+        ghost_milestones = ax.scatter(starts[~bars], yvalues[~bars],
+                                      marker='D',
+                                      s=(style['font_size']*0.5)**2,
+                                      color=baseline_colour,
+                                      alpha=baseline_alpha,
+                                      zorder=5)
+        return [ghost_bars, ghost_milestones]
 
     def add_nowline(df,
                     ax,
                     **kwargs):
         nowline_colour = kwargs.get('nowline_colour', '#7a9aeb')
-        xs = [mdates.date2num(dt.now())]*2
-        ys = [max(df.yvalue)+1, min(df.yvalue)-1]
-        ax.plot(xs, ys, color=nowline_colour, linestyle='--')
+        ax.axvline(mdates.date2num(dt.now()), color=nowline_colour, linestyle='--')
 
     # MAIN FUNCTTION
 
     assertion_error = 'dataframe must have "activity_name", "start", and "end" columns as a minimum'
     assert all(x in df.columns for x in ['activity_name', 'start', 'end']), assertion_error
 
-    ax, fig = setup_figure(df, **kwargs)
-
-    # get the colours
-    df, cmaps = get_colours(df, **kwargs)
-
-    # reset the index
-    df = df.reset_index(drop=True)
-
-    # iterate through events
-    for row, event in df.iterrows():
-        # create and add the shape
-        plot_event(event, ax, **kwargs)
-
-    # add a "now" line
-    if nowline is True:
-        add_nowline(df, ax)
-
-    # add connection arrows
-    if connections is True:
-        plot_connections(df, ax, **kwargs)
-
-    # add a legend
-    if legend is True:
-        add_legend(ax, fig, df,
-                   cmaps,
-                   **kwargs)
-
-    # add extra labels from the milestone column
-    if bar_labels is True:
-        add_bar_labels(df, **kwargs)
-
+    # gantt_chart adds its layout and colour columns to the caller's dataframe,
+    # but not the axis coordinates, which are only used for drawing
+    data = df
+
+    with profiling(kwargs.get('profile', None)), stage('mpl_gantt', rows=len(df)):
+        # collapse the WBS to summary rows
+        if kwargs.get('collapse_depth', None) is not None:
+            with stage('collapse', rows=len(df)) as record:
+                df = collapse(df, kwargs['collapse_depth'])
+                record['rows_out'] = len(df)
+
+        # convert the dates to x axis coordinates once
+        axis_columns = [c for c in ['x_start', 'x_end'] if c not in df.columns]
+        with stage('add_axis_dates', rows=len(df)):
+            df = add_axis_dates(df, **kwargs)
+
+        if ax is None:
+            with stage('setup_figure', rows=len(df)) as record:
+                ax, fig = setup_figure(df, **kwargs)
+                record['figure_size'] = fig.get_size_inches().tolist()
+                record['dpi'] = fig.get_dpi()
+        else:
+            fig = ax.get_figure()
+        style = get_figure_style(fig)
+
+        # get the colours, unless they've already been set
+        cmaps = kwargs.pop('cmaps', None)
+        if cmaps is None:
+            with stage('get_colours', rows=len(df)):
+                df, cmaps = get_colours(df, **kwargs)
+
+        # reset the index
+        df = df.reset_index(drop=True)
+        artist_key = kwargs.get('artist_key', 'id')
+        keys = df[artist_key].tolist() if artist_key in df.columns else df.index.tolist()
+
+        # work out where the milestone labels go before drawing them,
+        # around every label on the chart, not just the rows being drawn
+        draw_df = df
+        if kwargs.get('label_placement', True) is True:
+            with stage('place_labels', rows=len(df)) as record:
+                draw_df, suppressed = place_milestone_labels(
+                    df.copy(), ax, style['font_size']*0.5, **kwargs)
+                record['suppressed'] = suppressed
+
+        # iterate through events
+        draw_rows = kwargs.get('draw_rows', None)
+        if draw_rows is not None:
+            draw_df = draw_df.loc[draw_rows]
+
+        with stage('plot_event', rows=len(draw_df)):
+            for row, event in draw_df.iterrows():
+                # create and add the shape
+                drawn = plot_event(event, ax, **kwargs)
+                if artists is not None:
+                    artists[keys[row]] = drawn
+
+        # add the baseline ghosts, for every row, replacing any from an earlier render
+        if kwargs.get('baseline', 'baseline_start' in df.columns) is True:
+            with stage('add_baseline', rows=len(df)):
+                if artists is not None:
+                    for artist in artists.pop(('baseline',), []):
+                        artist.remove()
+                ghosts = add_baseline(df, ax, **kwargs)
+                if artists is not None:
+                    artists[('baseline',)] = ghosts
+
+        # add a "now" line
+        if nowline is True and kwargs.get('numerical_dates', False) is False:
+            add_nowline(df, ax)
+
+        # add connection arrows
+        if connections is True:
+            with stage('plot_connections', rows=len(df)):
+                plot_connections(df, ax, **kwargs)
+
+        # add a loading strip under the chart, sharing the date axis
+        if kwargs.get('loading', False) is True:
+            with stage('loading_chart', rows=len(df)):
+                loading_ax = make_axes_locatable(ax).append_axes(
+                    'bottom', size=kwargs.get('loading_size', '15%'), pad=0.3, sharex=ax)
+                loading_chart(df, ax=loading_ax,
+                              freq=kwargs.get('loading_freq', 'W'),
+                              by=kwargs.get('fillcolumn', None),
+                              **{k: v for k, v in kwargs.items() if k not in ('freq', 'by')})
+
+        # add a legend
+        if legend is True:
+            with stage('add_legend', rows=len(df)):
+                add_legend(ax, fig, df,
+                           cmaps,
+                           **kwargs)
+
+        # add extra labels from the milestone column
+        if bar_labels is True:
+            with stage('add_bar_labels', rows=len(draw_df)):
+                add_bar_labels(draw_df, ax, keys=keys, **kwargs)
+
+    data.drop(columns=axis_columns, inplace=True, errors='ignore')
     return ax, fig
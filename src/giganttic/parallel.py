@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+process pool helpers for giganttic
+
+SharedFrame writes the columns of a prepared schedule once, as memory-mapped
+.npy files, and worker processes open them as zero-copy read-only views
+(FrameView), so handing a large dataframe to a pool no longer costs
+a pickle of every row for every worker.
+Text and categorical columns are stored as integer codes plus their unique values.
+
+    def draw_group(view, positions):
+        return gantt_chart(view.select(positions), ...)
+
+    results = map_shared(draw_group, df, [rows_a, rows_b, rows_c], processes=4)
+
+@author: dhancock
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+class SharedFrame():
+    """
+    a dataframe's columns written to memory-mapped files for worker processes.
+    Use as a context manager, or call close(), to delete the files.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+
+    directory : str, optional
+        where to write the files. The default is a new temporary directory.
+    """
+
+    def __init__(self, df, directory=None):
+        self.directory = tempfile.mkdtemp(prefix='giganttic_', dir=directory)
+        columns = []
+        for number, (name, values) in enumerate(df.items()):
+            path = os.path.join(self.directory, f'{number}')
+            dtype = values.dtype
+            if dtype.kind in 'biufcmM' and isinstance(dtype, np.dtype):
+                np.save(f'{path}.npy', values.to_numpy())
+                columns.append((name, 'array', None))
+            else:
+                if isinstance(dtype, pd.CategoricalDtype):
+                    # keeps the order and the unused categories
+                    codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+                else:
+                    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+                np.save(f'{path}.npy', codes.astype(np.int32))
+                # text is stored as fixed width unicode, which can be memory-mapped
+                if pd.api.types.infer_dtype(uniques, skipna=True) in ('string', 'empty'):
+                    kind, uniques = 'codes', np.asarray(uniques, dtype=str)
+                else:
+                    kind, uniques = 'objects', np.asarray(uniques, dtype=object)
+                np.save(f'{path}_uniques.npy', uniques)
+                columns.append((name, kind, dtype if isinstance(dtype, pd.CategoricalDtype)
+                                else str(dtype)))
+        self.spec = {'directory': self.directory, 'length': len(df), 'columns': columns}
+
+    def view(self):
+        """ a FrameView of this frame """
+        return FrameView(self.spec)
+
+    def close(self):
+        """ deletes the files """
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FrameView():
+    """
+    read-only views of the columns of a SharedFrame, in any process
+
+    Parameters
+    ----------
+    spec : dict
+        SharedFrame.spec
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.columns = [name for name, _, _ in spec['columns']]
+        self._arrays = {}
+        for number, (name, kind, _) in enumerate(spec['columns']):
+            path = os.path.join(spec['directory'], f'{number}')
+            arrays = [np.load(f'{path}.npy', mmap_mode='r')]
+            if kind == 'codes':
+                arrays.append(np.load(f'{path}_uniques.npy', mmap_mode='r'))
+            elif kind == 'objects':
+                arrays.append(np.load(f'{path}_uniques.npy', allow_pickle=True))
+            self._arrays[name] = arrays
+
+    def __len__(self):
+        return self.spec['length']
+
+    def column(self, name):
+        """ the values (or codes, for text columns) of a column, without copying """
+        return self._arrays[name][0]
+
+    def select(self, positions=None, columns=None):
+        """
+        the rows at positions as a dataframe.
+        Only the rows selected are copied out of the files.
+
+        Parameters
+        ----------
+        positions : array-like, optional
+            row numbers. The default is all rows.
+        columns : list, optional
+            The default is all columns.
+        """
+        if positions is None:
+            positions = slice(None)
+        data = {}
+        for name, kind, dtype in self.spec['columns']:
+            if columns is not None and name not in columns:
+                continue
+            values = self._arrays[name][0][positions]
+            if kind == 'array':
+                data[name] = np.array(values)
+                continue
+            uniques = self._arrays[name][1]
+            if isinstance(dtype, pd.CategoricalDtype):
+                data[name] = pd.Categorical.from_codes(values, dtype=dtype)
+                continue
+            decoded = np.full(len(values), None, dtype=object)
+            if len(uniques) > 0:
+                decoded[values >= 0] = uniques[values[values >= 0]]
+            data[name] = pd.Series(decoded).astype(dtype)
+        return pd.DataFrame(data)
+
+
+# the FrameView of each worker process, opened by _attach
+_worker_view = None
+
+
+def _attach(spec):
+    global _worker_view
+    _worker_view = FrameView(spec)
+
+
+def _call(function_and_task):
+    function, task = function_and_task
+    return function(_worker_view, task)
+
+
+def map_shared(function, df, tasks, processes=None):
+    """
+    runs function(view, task) for each task in a process pool, where view is
+    a FrameView of df opened once by each worker
+
+    Parameters
+    ----------
+    function : callable
+        a module level function, so that it can be sent to the workers
+    df : pandas.DataFrame | SharedFrame
+
+    tasks : list
+        small arguments, e.g. row numbers
+    processes : int, optional
+        The default is the number of processors.
+
+    Returns
+    -------
+    results : list
+        in the order of tasks
+    """
+    shared = df if isinstance(df, SharedFrame) else SharedFrame(df)
+    try:
+        with ProcessPoolExecutor(processes, initializer=_attach,
+                                 initargs=(shared.spec,)) as pool:
+            return list(pool.map(_call, [(function, task) for task in tasks]))
+    finally:
+        if shared is not df:
+            shared.close()
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+out of core processing for giganttic
+
+schedules bigger than memory are split into partitions (one per WBS branch by
+default) on disk as they are read, a chunk at a time. Each partition is then
+prepared and drawn on its own, with only the state which has to be the same
+for every partition kept in memory: the activity id of each WBS, the colour
+registry and the overall date range.
+
+    schedule = partition_csv('enterprise.csv', 'partitions', depth=2)
+    prepared = prepare_partitions(schedule, 'prepared', fillcolumn='WBS')
+    files = render_partitions(prepared, 'pages', maxlines=60)
+
+@author: dhancock
+"""
+
+import json
+import os
+import re
+import pandas as pd
+from matplotlib import pyplot as plt
+from .colours import ColourRegistry, get_colours
+from .data_import import parse_dates, normalise_columns
+from .data_modify import flatten_milestones
+from .mpl_gantt import gantt_chart
+
+MANIFEST = 'manifest.json'
+
+
+class PartitionedSchedule():
+    """
+    a schedule stored on disk as partitions, each made of one or more
+    pickled chunks, which are only read when that partition is used.
+
+    Parameters
+    ----------
+    directory : str
+        made if it doesn't exist. An existing manifest is loaded.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = {'partitions': {}, 'start': None, 'end': None}
+        if os.path.exists(os.path.join(directory, MANIFEST)):
+            with open(os.path.join(directory, MANIFEST), 'r', encoding='utf8') as file_object:
+                self.manifest = json.load(file_object)
+
+    def __len__(self):
+        return sum(p['rows'] for p in self.manifest['partitions'].values())
+
+    def __iter__(self):
+        """ (key, dataframe) for each partition, one at a time """
+        for key in self.keys:
+            yield key, self.read(key)
+
+    @property
+    def keys(self):
+        """ partition keys, in the order they were first written """
+        return list(self.manifest['partitions'])
+
+    @property
+    def date_range(self):
+        """ (earliest start, latest end) over every partition """
+        return (pd.Timestamp(self.manifest['start']) if self.manifest['start'] else None,
+                pd.Timestamp(self.manifest['end']) if self.manifest['end'] else None)
+
+    def write(self, key, df):
+        """ appends a chunk of rows to a partition """
+        key = str(key)
+        partition = self.manifest['partitions'].setdefault(
+            key, {'folder': f'{len(self.manifest["partitions"])}_'
+                            + re.sub(r'[^\w.-]', '_', key)[:50],
+                  'chunks': 0,
+                  'rows': 0})
+        folder = os.path.join(self.directory, partition['folder'])
+        os.makedirs(folder, exist_ok=True)
+        df.to_pickle(os.path.join(folder, f'{partition["chunks"]}.pkl'))
+        partition['chunks'] += 1
+        partition['rows'] += len(df)
+
+        for bound, column, function in [('start', 'start', min), ('end', 'end', max)]:
+            if column in df.columns and df[column].notna().any():
+                value = df[column].min() if function is min else df[column].max()
+                if self.manifest[bound] is not None:
+                    value = function(value, pd.Timestamp(self.manifest[bound]))
+                self.manifest[bound] = pd.Timestamp(value).isoformat()
+        self.save()
+
+    def read(self, key, columns=None):
+        """ all the rows of a partition """
+        partition = self.manifest['partitions'][str(key)]
+        folder = os.path.join(self.directory, partition['folder'])
+        chunks = [pd.read_pickle(os.path.join(folder, f'{n}.pkl'))
+                  for n in range(partition['chunks'])]
+        df = pd.concat(chunks, ignore_index=True)
+        return df if columns is None else df[columns]
+
+    def save(self):
+        """ writes the manifest """
+        with open(os.path.join(self.directory, MANIFEST), 'w', encoding='utf8') as file_object:
+            json.dump(self.manifest, file_object, indent=1)
+
+    def map(self, function, directory, **kwargs):
+        """
+        applies function(df, **kwargs) to each partition in turn
+
+        Returns
+        -------
+        schedule : PartitionedSchedule
+            of the results, in directory
+        """
+        output = PartitionedSchedule(directory)
+        for key, df in self:
+            output.write(key, function(df, **kwargs))
+        return output
+
+
+def partition_key(values, depth=1):
+    """ the first depth levels of dotted WBS codes, e.g. '1.2' from '1.2.3.4' with depth=2 """
+    return values.astype(str).str.split('.').str[:depth].str.join('.')
+
+
+def partition_frames(frames, directory, partition_column='WBS', depth=1):
+    """
+    splits chunks of a schedule into partitions on disk, so that only
+    one chunk is in memory at a time
+
+    Parameters
+    ----------
+    frames : iterable of pandas.DataFrame
+        e.g. pandas.read_csv(..., chunksize=n)
+    directory : str
+
+    partition_column : str, optional
+        The default is 'WBS'.
+    depth : int, optional
+        WBS levels in the partition key, or None to partition on the
+        whole value of partition_column. The default is 1.
+
+    Returns
+    -------
+    schedule : PartitionedSchedule
+    """
+    schedule = PartitionedSchedule(directory)
+    for frame in frames:
+        keys = frame[partition_column].astype(str) if depth is None \
+            else partition_key(frame[partition_column], depth)
+        for key, group in frame.groupby(keys.to_numpy(), sort=False):
+            schedule.write(key, group.reset_index(drop=True))
+    return schedule
+
+
+def partition_csv(file, directory, partition_column='WBS', depth=1, chunksize=100000,
+                  dayfirst=True):
+    """
+    reads a csv file a chunk at a time, as import_csv would, into partitions
+    (see partition_frames)
+
+    Returns
+    -------
+    schedule : PartitionedSchedule
+    """
+    def chunks():
+        for chunk in pd.read_csv(file, chunksize=chunksize, dtype=str,
+                                 keep_default_na=False, encoding='utf8'):
+            chunk = normalise_columns(chunk)
+            for column in ['start', 'end']:
+                if column in chunk.columns:
+                    chunk[column] = parse_dates(chunk[column], dayfirst=dayfirst)
+            yield chunk
+
+    return partition_frames(chunks(), directory, partition_column, depth)
+
+
+def prepare_partitions(schedule, directory, flatten=True, colour_registry=None, **kwargs):
+    """
+    runs flatten_milestones and get_colours on each partition, with the
+    activity ids and colours shared between partitions
+
+    Parameters
+    ----------
+    schedule : PartitionedSchedule
+
+    directory : str
+        where to write the prepared partitions
+    flatten : bool, optional
+        run flatten_milestones. The default is True.
+    colour_registry : ColourRegistry, optional
+        The default is a new one, which is used for every partition.
+    **kwargs :
+        passed to get_colours
+
+    Returns
+    -------
+    schedule : PartitionedSchedule
+    """
+    # the activity id of each WBS, in order, over every partition
+    activity_ids = {}
+    if flatten is True:
+        for key in schedule.keys:
+            for wbs in schedule.read(key, columns=['WBS']).WBS.unique():
+                activity_ids.setdefault(wbs, float(len(activity_ids)))
+
+    if colour_registry is None:
+        colour_registry = ColourRegistry()
+
+    def prepare(df):
+        if flatten is True:
+            if 'activity_id' not in df.columns:
+                df['activity_id'] = df.WBS.map(activity_ids)
+            df = flatten_milestones(df)
+        df, _ = get_colours(df, colour_registry=colour_registry, **kwargs)
+        return df
+
+    return schedule.map(prepare, directory)
+
+
+def render_partitions(schedule, outputdir, maxlines=60, title='Gantt Chart', dpi=150, **kwargs):
+    """
+    draws each partition in turn as pages of at most maxlines rows,
+    all with the same date axis, closing each figure once it's saved
+
+    Parameters
+    ----------
+    schedule : PartitionedSchedule
+
+    outputdir : str
+
+    maxlines : int, optional
+        The default is 60.
+    title : str, optional
+
+    dpi : int, optional
+        The default is 150.
+    **kwargs :
+        passed to gantt_chart
+
+    Returns
+    -------
+    files : list
+    """
+    os.makedirs(outputdir, exist_ok=True)
+    kwargs.setdefault('dates', list(schedule.date_range))
+    files = []
+    for number, (key, df) in enumerate(schedule):
+        if 'yvalue' not in df.columns:
+            df['yvalue'] = list(range(len(df)))
+        rows = sorted(df.yvalue.dropna().unique())
+        for start in range(0, len(rows), maxlines):
+            page_rows = rows[start:start + maxlines]
+            page = df[df.yvalue.between(page_rows[0], page_rows[-1])].reset_index(drop=True)
+            page_title = f'{title} - {key} ({start + 1}-{start + len(page_rows)} of {len(rows)})'
+            ax, fig = gantt_chart(page, page_title, **kwargs)
+            filename = os.path.join(
+                outputdir,
+                f'{number}_' + re.sub(r'[^\w.-]', '_', f'{key}_{start}') + '.png')
+            fig.savefig(filename, dpi=dpi)
+            plt.close(fig)
+            files.append(filename)
+    return files
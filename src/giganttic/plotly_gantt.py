@@ -6,24 +6,42 @@ Created on Tue Sep 19 13:51:40 2023
 @author: dhancock
 """
 
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
+from matplotlib import colors
+import matplotlib.dates as mdates
 from .colours import get_colours
+from .data_filter import FilterIndex
+from .hierarchy import collapse
 from .plotting_extras import get_fontsize
+from .profiling import profiling, stage
 # from datetime import timedelta
-# import pandas as pd
 
 
 def gantt_chart(df,
                 title='plotly giganttic',
                 **kwargs):
-    """ produces a gantt chart using plotly"""
+    """ produces a gantt chart using plotly
+
+    Set profile=True, 'log', a .jsonl file path or a callable to report
+    the time, rows and peak memory of each stage (see giganttic.profiling)
+
+    Set collapse_depth to only draw the WBS down to that depth, with summary
+    rows for everything below it (see giganttic.hierarchy.collapse)
+
+    With continuous_fill (see get_colours), a colour scale is shown for the fill.
+
+    Pass cmaps (from get_colours) if df already has its colour columns,
+    so that get_colours isn't run again
+    """
 
     def set_up_figure(df, **kwargs):
 
         # how many rows to show
         rows_to_show = kwargs.get('rows_to_show', 'all')
         if rows_to_show == 'all':
-            rows_to_show = df.get('yvalue', df.get('activity_name')).size
+            rows_to_show = df.yvalue.nunique() if 'yvalue' in df.columns else len(df)
 
         # Range Slider
         show_rangeslider = kwargs.get('show_rangeslider', False)
@@ -39,6 +57,11 @@ def gantt_chart(df,
         if 'ylabel' not in df.columns and kwargs.get('ylabels') is None:
             df['ylabel'] = df['activity_name'].copy()
 
+        # one tick per row, preferring a non-blank label where rows share a yvalue
+        ticks = df[['yvalue', 'ylabel']][df.yvalue.notna()]
+        ticks = ticks.iloc[np.argsort(ticks.ylabel.eq('').to_numpy(), kind='stable')]
+        ticks = ticks.drop_duplicates('yvalue')
+
         # initiate figure
         fig = go.Figure()
 
@@ -53,8 +76,8 @@ def gantt_chart(df,
             showlegend=kwargs.get('showlegend', False),
             plot_bgcolor='# ffffff',
             yaxis={"autorange": 'reversed',
-                   "ticktext": df.ylabel,
-                   "tickvals": df.yvalue,
+                   "ticktext": ticks.ylabel,
+                   "tickvals": ticks.yvalue,
                    "tickfont": dict(size=get_fontsize(rows_to_show)),
                    "gridcolor": None},
             xaxis={"type": axistype,
@@ -226,6 +249,44 @@ def gantt_chart(df,
                 )
                 """
 
+    def plot_baseline(df, fig, **kwargs):
+        """ adds ghosts of the baseline dates (from compare_schedules)
+        under each bar and milestone, as one trace for all the bars
+        and one trace for all the milestones """
+
+        baseline_colour = kwargs.get('baseline_colour', '#999999')
+        baseline_offset = kwargs.get('baseline_offset', 0.25)
+        bar_size = float(kwargs.get('bar_size', 20))
+
+        df = df.loc[df.baseline_start.notna() & df.baseline_end.notna()]
+        bars = (df.baseline_start != df.baseline_end).to_numpy()
+        yvalues = df.yvalue.to_numpy(dtype=float) + baseline_offset
+
+        # one line trace for all the bars, with gaps (None) between bars
+        n_bars = bars.sum()
+        xs = np.empty(n_bars*3, dtype=object)
+        xs[0::3] = df.baseline_start[bars].to_numpy()
+        xs[1::3] = df.baseline_end[bars].to_numpy()
+        xs[2::3] = None
+        ys = np.empty(n_bars*3, dtype=object)
+        ys[0::3] = yvalues[bars]
+        ys[1::3] = yvalues[bars]
+        ys[2::3] = None
+        fig.add_scatter(x=xs, y=ys,
+                        mode='lines',
+                        line=dict(color=baseline_colour, width=bar_size*0.5),
+                        opacity=0.5,
+                        hoverinfo='skip',
+                        name='baseline')
+
+        fig.add_scatter(x=df.baseline_start[~bars], y=yvalues[~bars],
+                        mode='markers',
+                        marker=dict(size=float(kwargs.get('ms_size', 8)),
+                                    symbol='diamond-open',
+                                    color=baseline_colour),
+                        hoverinfo='skip',
+                        name='baseline milestones')
+
     def make_yaxis_range_menu(df,
                               yaxis_ranges=[5, 10, 50, 100, 1000],
                               **kwargs):
@@ -263,19 +324,24 @@ def gantt_chart(df,
 
     def make_filter_menu(df, **kwargs):
 
-        milestone_filters = {'all': df.yvalue.notna(),
-                             'no milestones': df.start != df.end,
-                             'just milestones': df.start == df.end}
+        index = kwargs.get('filter_index', None)
+        if index is None:
+            index = FilterIndex(df)
+
+        def as_series(selection):
+            return pd.Series(selection.mask, index=df.index)
+
+        milestone_filters = {'all': as_series(index.notna('yvalue')),
+                             'no milestones': as_series(~index.milestones()),
+                             'just milestones': as_series(index.milestones())}
 
         manual_filters = kwargs.get('manual_filters', None)
 
         filter_column = kwargs.get('filter_column', None)
-        if filter_column is not None:
-            column_values = df[filter_column].unique().tolist()
-            column_filters = {'all': df[filter_column].notna()}
-            column_filters.update(dict(
-                zip([x for x in column_values],
-                    (df[filter_column] == x for x in column_values))))
+        if filter_column is not None and filter_column in df.columns:
+            column_filters = {'all': as_series(index.notna(filter_column))}
+            column_filters.update({value: as_series(selection)
+                                   for value, selection in index.groups(filter_column).items()})
 
         filters = {}
         if 'auto milestones' in filters:
@@ -319,19 +385,58 @@ def gantt_chart(df,
                            )
         return filter_menu
 
+    def add_colourbar(fig, cmaps, **kwargs):
+        """ adds a colour scale for continuous fill colours (see get_colours) """
+        norm, units = cmaps['fill_norm'], cmaps.get('fill_units', '')
+        colourscale = [[x, colors.to_hex(cmaps['fill'](x))] for x in np.linspace(0, 1, 11)]
+        colourbar = dict(title=dict(text=kwargs.get('fillcolumn', '')
+                                    + (f' ({units})' if units == 'days' else '')))
+        if units == 'date':
+            ticks = np.linspace(norm.vmin, norm.vmax, 5)
+            colourbar.update(tickvals=ticks.tolist(),
+                             ticktext=[d.strftime('%Y-%m-%d') for d in mdates.num2date(ticks)])
+        fig.add_trace(go.Scatter(x=[None], y=[None],
+                                 mode='markers',
+                                 hoverinfo='skip',
+                                 showlegend=False,
+                                 marker=dict(colorscale=colourscale,
+                                             cmin=norm.vmin,
+                                             cmax=norm.vmax,
+                                             color=[norm.vmin],
+                                             showscale=True,
+                                             colorbar=colourbar)))
+
     # main function
-    fig = set_up_figure(df, **kwargs)
-    df, cmaps = get_colours(df, **kwargs)
-    plot_shapes(df, fig, **kwargs)
-
-    # optional clever menus
-    menus = []
-    if kwargs.get('filters_menu', False) is True:
-        menus.append(make_filter_menu(df, **kwargs))
-    if kwargs.get('yaxis_range_menu', False) is True:
-        menus.append(make_yaxis_range_menu(df, **kwargs))
-    if len(menus) > 0:
-        fig.update_layout(updatemenus=menus)
+    with profiling(kwargs.get('profile', None)), stage('plotly_gantt', rows=len(df)):
+        # collapse the WBS to summary rows
+        if kwargs.get('collapse_depth', None) is not None:
+            with stage('collapse', rows=len(df)) as record:
+                df = collapse(df, kwargs['collapse_depth'])
+                record['rows_out'] = len(df)
+
+        with stage('set_up_figure', rows=len(df)):
+            fig = set_up_figure(df, **kwargs)
+        cmaps = kwargs.get('cmaps', None)
+        if cmaps is None:
+            with stage('get_colours', rows=len(df)):
+                df, cmaps = get_colours(df, **kwargs)
+        if kwargs.get('baseline', 'baseline_start' in df.columns) is True:
+            with stage('plot_baseline', rows=len(df)):
+                plot_baseline(df, fig, **kwargs)
+        with stage('plot_shapes', rows=len(df)):
+            plot_shapes(df, fig, **kwargs)
+        if isinstance(cmaps, dict) and 'fill_norm' in cmaps:
+            add_colourbar(fig, cmaps, **kwargs)
+
+        # optional clever menus
+        menus = []
+        with stage('menus', rows=len(df)):
+            if kwargs.get('filters_menu', False) is True:
+                menus.append(make_filter_menu(df, **kwargs))
+            if kwargs.get('yaxis_range_menu', False) is True:
+                menus.append(make_yaxis_range_menu(df, **kwargs))
+            if len(menus) > 0:
+                fig.update_layout(updatemenus=menus)
 
     ax = 'no axes generated, because plotly'
     return ax, fig
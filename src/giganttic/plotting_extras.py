@@ -5,27 +5,71 @@ Created on Mon Oct  2 13:47:35 2023
 @author: dhancock
 """
 
+import os
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 from .mpl_gantt import gantt_chart
-from .data_modify import filter_data
+from .colours import ColourRegistry, get_colours
+from .data_filter import FilterIndex
+from .data_sql import SQLSource
+from .parallel import map_shared
+
+
+def _plot_group(view, task):
+    """ plots and saves one group of plot_by_column in a worker process """
+    positions, graphtitle, plot_function, figure_filename, kwargs = task
+    ax, fig = plot_function(view.select(positions), graphtitle, **kwargs)
+    if figure_filename is None:
+        return ax, fig
+    if isinstance(fig, Figure):
+        fig.savefig(figure_filename)
+        plt.close(fig)
+    elif figure_filename.endswith('.html'):
+        fig.write_html(figure_filename)
+    else:
+        fig.write_image(figure_filename)
+    return None, figure_filename
 
 
 def plot_by_column(df, column, plot_function=gantt_chart, **kwargs):
-    """ plot a different figure for each value in a given column """
+    """ plot a different figure for each value in a given column.
+    Pass filter_index (a FilterIndex of df) to reuse its indexes across calls.
+    df can be a SQLSource, in which case each group is read from the database
+    with the column filter pushed down, reusing its pooled connections.
+    Pass processes to plot the groups in a pool of worker processes, which share
+    df through memory-mapped files (see giganttic.parallel). With outputdir,
+    the workers save the figures there (as file_type, default 'png') and
+    each group's "file" is returned instead of its figure
+    """
     # plot_function = kwargs.get('plot_function',gt.gantt_chart)
     if 'title' in kwargs:
         title = kwargs.pop('title')
     else:
         title = f'{column}'
+    if isinstance(df, SQLSource):
+        return _plot_source_by_column(df, column, plot_function, title, **kwargs)
     df_filtered = df.copy()
 
     # print(f"plotting separate {column}s\n".upper())
 
-    groups = df_filtered[column].unique().tolist()
+    # colour the whole schedule once, from a registry, so that each value
+    # has the same colour in every figure
+    if kwargs.get('colour_registry', None) is None:
+        kwargs['colour_registry'] = ColourRegistry()
+    df_filtered, kwargs['cmaps'] = get_colours(df_filtered, **kwargs)
+
+    index = kwargs.pop('filter_index', None)
+    if index is None:
+        index = FilterIndex(df_filtered)
+
+    processes = kwargs.pop('processes', None)
+    if processes is not None:
+        return _plot_groups_in_pool(df_filtered, index, column, plot_function, title,
+                                    processes, **kwargs)
     df_groups = {}
     figure_details = {}
-    for group in groups:
-        df_group = filter_data(df_filtered, column, group).copy()
+    for group, selection in index.groups(column).items():
+        df_group = df_filtered.iloc[selection.positions].reset_index(drop=True)
 
         if len(df_group) > 0:
             subtitle = group
@@ -39,8 +83,68 @@ def plot_by_column(df, column, plot_function=gantt_chart, **kwargs):
                                      "figure": fig,
                                      "title": graphtitle,
                                      "data": df_group}
-            plt.close()
+            if isinstance(fig, Figure):
+                plt.close(fig)
+
+    return figure_details
+
+
+def _plot_groups_in_pool(df, index, column, plot_function, title, processes,
+                         outputdir=None, file_type='png', **kwargs):
+    """ plot_by_column with a process pool """
+    if outputdir is not None:
+        os.makedirs(outputdir, exist_ok=True)
+    groups = {group: selection for group, selection in index.groups(column).items()
+              if len(selection) > 0}
+    tasks = []
+    for group in groups:
+        graphtitle = '{} - {}'.format(group, title)
+        figure_filename = None if outputdir is None else os.path.join(
+            outputdir, f'{graphtitle}.{file_type}'.replace('/', '_').replace('\n', ' '))
+        tasks.append((groups[group].positions, f'{group}\n{title}', plot_function,
+                      figure_filename, kwargs))
+
+    figure_details = {}
+    results = map_shared(_plot_group, df.reset_index(drop=True), tasks, processes)
+    for (group, selection), (ax, fig) in zip(groups.items(), results):
+        details = {"axis": ax,
+                   "figure": fig,
+                   "title": '{} - {}'.format(group, title),
+                   "data": df.iloc[selection.positions].reset_index(drop=True)}
+        if outputdir is not None:
+            details.update(figure=None, file=fig)
+        figure_details[group] = details
+    return figure_details
+
+
+def _plot_source_by_column(source, column, plot_function, title, **kwargs):
+    """ plot_by_column for a SQLSource """
+    kwargs.pop('filter_index', None)
+    if kwargs.get('colour_registry', None) is None:
+        kwargs['colour_registry'] = ColourRegistry()
+    # the registry is saved once, after every group has been coloured
+    save_colours = kwargs.pop('save_colours', True)
+    kwargs['save_colours'] = False
+    read_kwargs = {k: kwargs.pop(k) for k in ['filter_string', 'start', 'end'] if k in kwargs}
+    figure_details = {}
+    for group in source.distinct(column, **read_kwargs):
+        df_group = source.read(filters={column: group}, **read_kwargs)
+
+        if len(df_group) > 0:
+            graphtitle = '{} - {}'.format(group, title)
+            ax, fig = plot_function(df_group,
+                                    f'{group}\n{title}',
+                                    **kwargs
+                                    )
+            figure_details[group] = {"axis": ax,
+                                     "figure": fig,
+                                     "title": graphtitle,
+                                     "data": df_group}
+            if isinstance(fig, Figure):
+                plt.close(fig)
 
+    if save_colours is True:
+        kwargs['colour_registry'].save()
     return figure_details
 
 
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+stage timing instrumentation for giganttic
+
+each stage of the pipeline reports its wall time, row count and peak memory
+to a collector, which can be the logging module, a json lines file or any callable.
+
+Enable it with the profile keyword argument of giganttic(), mpl_gantt and
+plotly_gantt, with the profiling() context manager, or by setting the
+GIGANTTIC_PROFILE environment variable to 'log' or a .jsonl file path.
+
+@author: dhancock
+"""
+
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger('giganttic')
+
+_collector = ContextVar('giganttic_collector', default=None)
+_stages = ContextVar('giganttic_stages', default=())
+
+
+class LoggingCollector():
+    """ sends stage records to the 'giganttic' logger """
+
+    def __init__(self, level=logging.INFO):
+        self.level = level
+
+    def __call__(self, record):
+        logger.log(self.level, 'stage %(stage)s: %(wall_time).4f s, %(rows)s rows, '
+                   '%(peak_memory_mb)s MB peak', record)
+
+
+class JSONLinesCollector():
+    """ appends stage records to a json lines file """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __call__(self, record):
+        with open(self.filename, 'a', encoding='utf8') as file_object:
+            file_object.write(json.dumps(record, default=str) + '\n')
+
+
+class ListCollector(list):
+    """ keeps stage records in a list, e.g. for benchmarks and tests """
+
+    def __call__(self, record):
+        self.append(record)
+
+
+def get_collector(profile=None):
+    """
+    turns a profile option into a collector
+
+    Parameters
+    ----------
+    profile : bool | str | callable | None, optional
+        True or 'log': LoggingCollector
+        a file path: JSONLinesCollector
+        a callable: called with each stage record
+        False: profiling off
+        None: use the GIGANTTIC_PROFILE environment variable, if set
+
+    Returns
+    -------
+    collector : callable | None
+    """
+    if profile is None:
+        profile = os.environ.get('GIGANTTIC_PROFILE', None)
+        if profile in ('', '0', 'false', 'False'):
+            profile = None
+        elif profile in ('1', 'true', 'True'):
+            profile = True
+    if profile is None or profile is False:
+        return None
+    if profile is True or profile == 'log':
+        return LoggingCollector()
+    if isinstance(profile, str):
+        return JSONLinesCollector(profile)
+    assert callable(profile), 'profile must be True, "log", a file path or a callable'
+    return profile
+
+
+@contextmanager
+def profiling(profile=None, memory=True):
+    """
+    context manager which sends the stages run inside it to a collector.
+    If profiling is already active (e.g. giganttic() calling gantt_chart)
+    and profile is None, the existing collector is kept.
+
+    Parameters
+    ----------
+    profile : optional
+        see get_collector
+    memory : bool, optional
+        record peak memory with tracemalloc, which slows things down.
+        The default is True.
+    """
+    if profile is None and _collector.get() is not None:
+        yield _collector.get()[0]
+        return
+
+    collector = get_collector(profile)
+    token = _collector.set(None if collector is None else (collector, memory))
+    started_tracing = False
+    if collector is not None and memory is True and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name, rows=None, **details):
+    """
+    times a stage of the pipeline and reports it to the active collector.
+    Yields the record dictionary, so that details (e.g. rows out) can be added.
+
+    Parameters
+    ----------
+    name : str
+        stage name, usually the function being run
+    rows : int, optional
+        number of rows going into the stage
+    **details :
+        anything else to include in the record
+    """
+    record = {'stage': name, 'rows': rows, **details}
+    active = _collector.get()
+    if active is None:
+        yield record
+        return
+
+    collector, memory = active
+    parents = _stages.get()
+    memory = memory and tracemalloc.is_tracing()
+    if memory:
+        # keep the parent's peak before resetting it for this stage
+        if parents:
+            parents[-1]['_peak'] = max(parents[-1]['_peak'], tracemalloc.get_traced_memory()[1])
+        start_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    record['_peak'] = 0
+    token = _stages.set(parents + (record,))
+    start_time = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['wall_time'] = time.perf_counter() - start_time
+        _stages.reset(token)
+        peak = record.pop('_peak')
+        if memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            record['peak_memory_mb'] = round((peak - start_memory) / 1e6, 3)
+            if parents:
+                parents[-1]['_peak'] = max(parents[-1]['_peak'], peak)
+        else:
+            record['peak_memory_mb'] = None
+        record['parent'] = parents[-1]['stage'] if parents else None
+        collector(record)
@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+"""
+local render server for giganttic
+
+keeps a pool of warm worker processes, which have already imported
+pandas, matplotlib and plotly and drawn a chart, and renders gantt charts
+sent over HTTP (TCP or a unix socket) straight to PNG, SVG, PDF or HTML bytes.
+
+usage:
+    python -m giganttic.server --port 8765 --workers 4
+
+    POST /render with a json payload:
+        {"data": [["id", "activity_name", "start", "end"], [1, "task", "01/01/2024", "01/06/2024"]],
+         "format": "png",
+         "title": "My chart",
+         "options": {"fillcolumn": "id", "legend": true}}
+    or "file": a path relative to the server's --root directory instead of "data",
+    or POST a .csv, .xlsx or ms project .xml file as the body, with the
+    format, title and options as query parameters, e.g. /render?format=svg&legend=true
+
+    GET /health returns the server statistics
+
+Responses include X-Render-Time, X-Queue-Time and X-Stages (json) headers.
+
+@author: dhancock
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+from .data_import import import_list
+
+logger = logging.getLogger('giganttic')
+
+CONTENT_TYPES = {'png': 'image/png',
+                 'svg': 'image/svg+xml',
+                 'pdf': 'application/pdf',
+                 'html': 'text/html; charset=utf-8',
+                 'json': 'application/json'}
+
+UPLOAD_TYPES = {'text/csv': '.csv',
+                'application/xml': '.xml',
+                'text/xml': '.xml',
+                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx'}
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+               413: 'Payload Too Large', 500: 'Internal Server Error',
+               503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+# the giganttic() and gantt_chart options a client may set.
+# Options which read or write files on the server (profile, baseline_data,
+# incremental, outputdir...) or open windows (show_figure) are refused
+RENDER_OPTIONS = {'sheet', 'headers', 'columns', 'flatten_milestones', 'pack_rows',
+                  'legend', 'nowline', 'connections', 'bar_labels', 'legend_sections',
+                  'fillcolumn', 'bordercolumn', 'customcolour_column', 'cmap_fill', 'cmap_border',
+                  'customcolours', 'default_fill', 'default_border', 'recolour',
+                  'continuous_fill', 'fill_range',
+                  'dates', 'max_label_length', 'tight_layout', 'figsize', 'dpi', 'numerical_dates',
+                  'bar_size', 'ms_size', 'borderwidth', 'label_placement', 'label_colour',
+                  'labelcolour', 'background_colour', 'nowline_colour', 'line_colour_error',
+                  'arrow_size', 'arrow_style', 'line_radius', 'baseline', 'baseline_colour',
+                  'baseline_offset', 'loading', 'loading_freq', 'loading_label', 'loading_size',
+                  'show_rangeslider', 'rangeslider_thickness', 'yaxis_range_menu', 'yaxis_ranges',
+                  'rows_to_show', 'filters_menu', 'filter_column', 'showlegend',
+                  'plot_dependencies'}
+
+
+def _warm_worker():
+    """ worker initializer: imports everything and draws a small chart,
+    so that the first real request doesn't pay for it """
+    import matplotlib
+    matplotlib.use('Agg')
+    import giganttic as gt
+    warmup = [['id', 'activity_name', 'start', 'end'],
+              [1, 'warm up', '01/01/2024', '01/06/2024'],
+              [2, 'milestone', '01/03/2024', '01/03/2024']]
+    ax, fig = gt.mpl_gantt(gt.import_list(warmup), fillcolumn='id', legend=True)
+    fig.savefig(io.BytesIO(), format='png')
+    gt.plotly_gantt(gt.import_list(warmup))
+
+
+def _resolve_file(file, root):
+    """ the path of a file inside root, or a ValueError if it is outside it """
+    if root is None:
+        raise ValueError('"file" is not allowed unless the server has a root directory')
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, file))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise ValueError(f'no file {file} in the server root')
+    return path
+
+
+def _payload_dataframe(data):
+    """
+    the dataframe of the "data" of a payload, which must be rows with a header row
+    or records. Anything else, e.g. a path, glob or list of paths which giganttic()
+    would read from the server, raises a ValueError
+    """
+    if isinstance(data, list) and len(data) > 1 and all(isinstance(row, list) for row in data):
+        rows = data
+    elif isinstance(data, list) and len(data) > 0 and all(isinstance(row, dict) for row in data):
+        header = list(data[0].keys())
+        rows = [header] + [[row.get(k) for k in header] for row in data]
+    else:
+        raise ValueError('"data" must be a list of rows, with a header row, or of records')
+    try:
+        return import_list(rows)
+    except (AttributeError, ValueError, TypeError) as error:
+        raise ValueError(f'"data" could not be read: {error}') from error
+
+
+def render_payload(payload, upload=None, root=None):
+    """
+    renders a chart from a request payload. Runs in a worker process.
+
+    Parameters
+    ----------
+    payload : dict
+        data (list of rows with a header row, or list of records) or file (path
+        relative to root), format ('png', 'svg', 'pdf' or 'html'), plot_type, title,
+        filter_string and options (keyword arguments for giganttic(), from RENDER_OPTIONS)
+    upload : tuple, optional
+        (file extension, bytes) of an uploaded schedule file
+    root : str, optional
+        directory which "file" paths are read from. The default is None,
+        which refuses "file"
+
+    Returns
+    -------
+    body : bytes
+
+    content_type : str
+
+    timings : dict
+        render_time and the time of each stage
+    """
+    from .giganttic import giganttic
+    from .profiling import profiling, ListCollector
+
+    start_time = time.perf_counter()
+    output_format = payload.get('format', 'png')
+    assert output_format in CONTENT_TYPES, f'format must be one of {list(CONTENT_TYPES)}'
+    plot_type = payload.get('plot_type', 'plotly' if output_format == 'html' else 'matplotlib')
+    options = dict(payload.get('options', {}))
+    refused = sorted(set(options) - RENDER_OPTIONS)
+    if len(refused) > 0:
+        raise ValueError(f'options not allowed: {refused}')
+    collector = ListCollector()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        if upload is not None:
+            input_data = os.path.join(tempdir, f'upload{upload[0]}')
+            with open(input_data, 'wb') as file_object:
+                file_object.write(upload[1])
+        elif 'data' in payload:
+            input_data = _payload_dataframe(payload['data'])
+        elif 'file' in payload:
+            input_data = _resolve_file(payload['file'], root)
+        else:
+            raise ValueError('payload must have "data" or "file"')
+
+        with profiling(collector, memory=False):
+            output = giganttic(input_data,
+                               output_file=None,
+                               title=payload.get('title', 'Gantt Chart'),
+                               filter_string=payload.get('filter_string', None),
+                               plot_type=plot_type,
+                               **options)
+
+    fig = output['figure']
+    buffer = io.BytesIO()
+    if output_format == 'json':
+        buffer.write(output['data'].to_json(orient='records', date_format='iso').encode())
+    elif plot_type == 'plotly':
+        if output_format == 'html':
+            buffer.write(fig.to_html(
+                include_plotlyjs=payload.get('include_plotlyjs', 'cdn')).encode())
+        else:
+            buffer.write(fig.to_image(format=output_format))
+    else:
+        fig.savefig(buffer, format=output_format)
+
+    timings = {'render_time': time.perf_counter() - start_time,
+               'stages': {r['stage']: round(r['wall_time'], 4) for r in collector}}
+    return buffer.getvalue(), CONTENT_TYPES[output_format], timings
+
+
+class RenderServer():
+    """
+    asyncio HTTP server which renders charts in a pool of warm worker processes.
+
+    Parameters
+    ----------
+    host : str, optional
+        The default is '127.0.0.1'.
+    port : int, optional
+        The default is 8765.
+    path : str, optional
+        serve on this unix socket instead of host and port.
+    workers : int, optional
+        number of worker processes. The default is the number of cpus.
+    max_queue : int, optional
+        requests waiting for a worker beyond this are refused with 503.
+        The default is 100.
+    timeout : float, optional
+        seconds before a render is abandoned with 504. The default is 120.
+        The worker is still busy until the render finishes, so it keeps its
+        place in the pool until then.
+    max_body : int, optional
+        largest accepted request body in bytes. The default is 100 MB.
+    root : str, optional
+        directory which requests can read "file" paths from.
+        The default is None, which refuses "file".
+    """
+
+    def __init__(self,
+                 host='127.0.0.1',
+                 port=8765,
+                 path=None,
+                 workers=None,
+                 max_queue=100,
+                 timeout=120,
+                 max_body=100*1024**2,
+                 root=None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_body = max_body
+        self.root = root
+        self.executor = None
+        self.server = None
+        self.slots = None
+        self.stats = {'requests': 0, 'rendered': 0, 'errors': 0, 'refused': 0,
+                      'queued': 0, 'active': 0, 'render_time': 0.0}
+
+    def start_workers(self):
+        """ starts the worker processes and waits for them to warm up """
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_warm_worker)
+        # submitting one job per worker makes sure they have all started
+        for future in [self.executor.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+
+    async def render(self, payload, upload=None):
+        """ queues a render on the worker pool, returning (body, content_type, timings) """
+        if self.stats['queued'] >= self.max_queue:
+            self.stats['refused'] += 1
+            raise OverflowError('render queue is full')
+        queued_time = time.perf_counter()
+        self.stats['queued'] += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.stats['queued'] -= 1
+        queue_time = time.perf_counter() - queued_time
+
+        self.stats['active'] += 1
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor, render_payload, payload, upload, self.root)
+
+        def finished(future):
+            # the slot is only given back when the worker is free again,
+            # even if the request has already timed out
+            if not future.cancelled():
+                future.exception()
+            self.stats['active'] -= 1
+            self.slots.release()
+
+        future.add_done_callback(finished)
+        body, content_type, timings = await asyncio.wait_for(asyncio.shield(future),
+                                                             self.timeout)
+        timings['queue_time'] = queue_time
+        self.stats['rendered'] += 1
+        self.stats['render_time'] += timings['render_time']
+        return body, content_type, timings
+
+    async def handle_request(self, method, target, headers, body):
+        """ returns (status, headers, body) for a request """
+        url = urlsplit(target)
+        if method == 'GET' and url.path == '/health':
+            stats = dict(self.stats, workers=self.workers)
+            return 200, {'Content-Type': CONTENT_TYPES['json']}, json.dumps(stats).encode()
+        if url.path != '/render' or method != 'POST':
+            return 404, {}, b''
+
+        content_type = headers.get('content-type', 'application/json').split(';')[0].strip()
+        upload = None
+        if content_type in UPLOAD_TYPES:
+            payload = {'options': {}}
+            for key, value in parse_qsl(url.query):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+                if key in ('format', 'plot_type', 'title', 'filter_string'):
+                    payload[key] = value
+                else:
+                    payload['options'][key] = value
+            upload = (UPLOAD_TYPES[content_type], body)
+        else:
+            payload = json.loads(body or b'{}')
+            if not isinstance(payload, dict):
+                raise ValueError('the request body must be a json object')
+
+        body, content_type, timings = await self.render(payload, upload)
+        response_headers = {'Content-Type': content_type,
+                            'X-Render-Time': f"{timings['render_time']:.4f}",
+                            'X-Queue-Time': f"{timings['queue_time']:.4f}",
+                            'X-Stages': json.dumps(timings['stages'])}
+        logger.info('rendered %s in %.3f s (queued %.3f s)',
+                    content_type, timings['render_time'], timings['queue_time'])
+        return 200, response_headers, body
+
+    @staticmethod
+    async def read_head(reader, request_line):
+        """ the method, target, headers and content length of a request,
+        or a ValueError if they are malformed """
+        parts = request_line.decode('latin-1').rstrip('\r\n').split(' ')
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise ValueError(f'malformed request line {request_line[:100]!r}')
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, separator, value = line.decode('latin-1').partition(':')
+            if separator == '':
+                raise ValueError(f'malformed header {line[:100]!r}')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        if length < 0:
+            raise ValueError('negative content-length')
+        return parts[0], parts[1], headers, length
+
+    async def handle_connection(self, reader, writer):
+        """ reads HTTP/1.1 requests from a connection until it is closed """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                self.stats['requests'] += 1
+                try:
+                    method, target, headers, length = await self.read_head(reader, request_line)
+                except ValueError as error:
+                    # the rest of the request can't be found, so the connection is closed
+                    self.stats['errors'] += 1
+                    status, response_headers, body = 400, {}, f'bad request: {error}'.encode()
+                    headers = {'connection': 'close'}
+                else:
+                    if length > self.max_body:
+                        status, response_headers, body = 413, {}, b''
+                    else:
+                        body = await reader.readexactly(length) if length else b''
+                        try:
+                            status, response_headers, body = await self.handle_request(
+                                method, target, headers, body)
+                        except OverflowError as error:
+                            status, response_headers, body = 503, {}, str(error).encode()
+                        except asyncio.TimeoutError:
+                            self.stats['errors'] += 1
+                            status, response_headers, body = 504, {}, b'render timed out'
+                        except (ValueError, KeyError, AssertionError) as error:
+                            self.stats['errors'] += 1
+                            status, response_headers, body = 400, {}, str(error).encode()
+                        except Exception as error:  # report anything else to the client
+                            self.stats['errors'] += 1
+                            logger.exception('render failed')
+                            status, response_headers, body = 500, {}, repr(error).encode()
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                response_headers.setdefault('Content-Type', 'text/plain; charset=utf-8')
+                response_headers['Content-Length'] = str(len(body))
+                response_headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+                head = f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}\r\n' + ''.join(
+                    f'{k}: {v}\r\n' for k, v in response_headers.items()) + '\r\n'
+                writer.write(head.encode('latin-1'))
+                writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """ starts the workers and the server, without blocking """
+        if self.executor is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.start_workers)
+        self.slots = asyncio.Semaphore(self.workers)
+        if self.path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_connection, self.path)
+            logger.info('giganttic render server on %s', self.path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+            logger.info('giganttic render server on http://%s:%s', self.host, self.port)
+        return self.server
+
+    async def serve_forever(self):
+        """ starts the server and serves until cancelled """
+        await self.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        """ stops the server and the worker processes """
+        if self.server is not None:
+            self.server.close()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def run(self):
+        """ runs the server until interrupted """
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', default=None, help='unix socket path, instead of host/port')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-queue', type=int, default=100)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--root', default=None,
+                        help='directory which requests can read "file" paths from')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    RenderServer(args.host, args.port, args.socket, args.workers,
+                 args.max_queue, args.timeout, root=args.root).run()
+
+
+if __name__ == '__main__':
+    main()
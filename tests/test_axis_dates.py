@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for converting start and end to axis coordinates
+
+@author: dhancock
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from matplotlib import dates as mdates
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from giganttic.mpl_gantt import add_axis_dates
+from benchmarks.synthetic import generate_schedule
+
+INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input')
+
+
+#%% CASES
+def test_add_axis_dates():
+    """ x_start and x_end match converting each date on its own """
+    df = generate_schedule(200)
+    df.loc[3, 'end'] = pd.NaT
+    df = add_axis_dates(df)
+    expected = [mdates.date2num(date) if pd.notna(date) else np.nan for date in df.start]
+    assert np.allclose(df.x_start, expected, equal_nan=True)
+    assert np.isnan(df.x_end[3])
+    assert df.x_end[4] == mdates.date2num(df.end[4])
+
+
+def test_numerical_dates():
+    """ numbers are used as they are """
+    df = pd.DataFrame({'start': [0, 5, '12'], 'end': [4, 10, 12]})
+    df = add_axis_dates(df, numerical_dates=True)
+    assert df.x_start.tolist() == [0, 5, 12]
+    assert df.x_end.tolist() == [4, 10, 12]
+
+
+def test_bars_use_axis_dates():
+    """ bars are drawn at the converted coordinates """
+    df = generate_schedule(30)
+    ax, fig = gt.mpl_gantt(df, fillcolumn='WBS')
+    bars = df[df.start != df.end]
+    assert sorted(bar.get_x() for bar in ax.patches) == sorted(mdates.date2num(bars.start))
+    df = pd.DataFrame({'activity_name': ['a', 'b', 'm'], 'start': [0, 5, 12], 'end': [4, 10, 12]})
+    ax, fig = gt.mpl_gantt(df, numerical_dates=True)
+    assert [bar.get_x() for bar in ax.patches] == [0, 5]
+    assert [bar.get_width() for bar in ax.patches] == [4, 5]
+
+
+def test_axis_dates_stay_internal():
+    """ x_start and x_end aren't left in the caller's data or giganttic's output """
+    df = generate_schedule(30)
+    gt.mpl_gantt(df, fillcolumn='WBS')
+    assert 'x_start' not in df.columns and 'x_end' not in df.columns
+    assert 'yvalue' in df.columns
+    output = gt.giganttic(os.path.join(INPUT, 'exampledata1.csv'), output_file=None)
+    assert not any(column.startswith('x_') for column in output['data'].columns)
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_add_axis_dates()
+    test_numerical_dates()
+    test_bars_use_axis_dates()
+    test_axis_dates_stay_internal()
+    print('all axis date tests passed')
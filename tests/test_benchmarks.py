@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for the benchmark suite and synthetic schedule generator
+
+@author: dhancock
+"""
+
+import json
+import os
+import sys
+import tempfile
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+import giganttic as gt
+from benchmarks import run as benchmark_run
+from benchmarks.synthetic import generate_schedule, WRITERS, MILESTONE_COLUMNS
+
+
+#%% CASES
+def test_generate_schedule():
+    """ schedules are repeatable, and follow the options """
+    df = generate_schedule(500, wbs_depth=2, milestone_density=0.3, fan_in=1, seed=3)
+    pd.testing.assert_frame_equal(df, generate_schedule(500, wbs_depth=2, milestone_density=0.3,
+                                                        fan_in=1, seed=3))
+    assert len(df) == 500 and df.id.is_unique
+    assert (df.WBS.str.count(r'\.') == 1).all()
+    assert abs((df.start == df.end).mean() - 0.3) < 0.1
+    assert (df.predecessors.str.count(',') == 0).all()
+    assert set(MILESTONE_COLUMNS) <= set(df.columns)
+
+
+def test_writers_round_trip():
+    """ every synthetic file can be imported again """
+    df = generate_schedule(200)
+    with tempfile.TemporaryDirectory() as directory:
+        for extension, writer in WRITERS.items():
+            imported = gt.import_file(writer(df, os.path.join(directory, f'schedule.{extension}')))
+            assert len(imported) == len(df), extension
+            assert imported.start.dt.normalize().tolist() == df.start.tolist(), extension
+
+
+def test_run():
+    """ the runner appends one result per benchmark and size """
+    with tempfile.TemporaryDirectory() as directory:
+        results_file = os.path.join(directory, 'results.jsonl')
+        results = benchmark_run.run(sizes=[100, 200], results_file=results_file,
+                                    only=['import_csv', 'get_colours'])
+        with open(results_file, 'r', encoding='utf8') as file_object:
+            lines = [json.loads(line) for line in file_object]
+    assert len(results) == len(lines) == 4
+    assert {(line['benchmark'], line['rows']) for line in lines} == {
+        ('import_csv', 100), ('import_csv', 200), ('get_colours', 100), ('get_colours', 200)}
+    assert all(line['wall_time'] > 0 for line in lines)
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_generate_schedule()
+    test_writers_round_trip()
+    test_run()
+    print('all benchmark tests passed')
@@ -2,16 +2,99 @@
 """
 Created on Tue Sep 19 17:04:14 2023
 
+test cases for the Giganttic session class
+
 @author: dhancock
 """
 
 import os
 import sys
+from matplotlib import colormaps
 
-sys.path.insert(0,os.path.abspath('..'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 import giganttic as gt
 
-t = gt.Giganttic(data_source = '../test/exampledata1.csv')
+TESTFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input', 'exampledata1.csv')
+
+
+#%% CASES
+def test_render():
+    """ a session renders a chart and keeps the prepared data """
+    t = gt.Giganttic(data_source=TESTFILE, fillcolumn='id', legend=True)
+    ax, figure = t.render()
+    assert figure.axes[0] is ax
+    assert 'fillcolour' in t.data.columns
+    stats = t.cache_stats()
+    assert all(stats[name]['misses'] == 1 for name in gt.classes.STAGES)
+    assert all(stats[name]['cached'] for name in gt.classes.STAGES)
+    t.close()
+
+
+def test_set_options_reruns_later_stages():
+    """ changing a colour option only re-runs the colours and the render """
+    t = gt.Giganttic(data_source=TESTFILE, fillcolumn='id')
+    t.render()
+    t.render()
+    assert t.cache_stats()['render']['hits'] == 1
+
+    t.set_options(cmap_fill=['#002F56', '#D06F1A'])
+    t.render()
+    stats = t.cache_stats()
+    assert stats['import']['misses'] == 1
+    assert stats['layout']['misses'] == 1
+    assert stats['colours']['misses'] == 2
+    assert stats['render']['misses'] == 2
+    assert set(t.data.fillcolour) == {'#002f56', '#d06f1a'}
+    t.close()
+
+
+def test_continuous_fill_option():
+    """ switching to continuous colours re-runs the colours stage """
+    t = gt.Giganttic(data_source=TESTFILE, fillcolumn='id', legend=True)
+    _, figure = t.render()
+    assert len(figure.axes) == 1
+    t.set_options(continuous_fill=True, fill_range=(0, 100))
+    _, figure = t.render()
+    assert t.cache_stats()['colours']['misses'] == 2
+    assert len(figure.axes) == 2
+    t.close()
+
+
+def test_colour_registry_option():
+    """ adding a colour registry re-runs the colours stage with the registry's colours """
+    t = gt.Giganttic(data_source=TESTFILE, fillcolumn='id')
+    t.render()
+    positional = t.data.fillcolour.tolist()
+    registry = gt.ColourRegistry()
+    t.set_options(colour_registry=registry, save_colours=False)
+    t.render()
+    assert t.cache_stats()['colours']['misses'] == 2
+    expected = registry.lookup('id', t.data.id, colormaps['viridis']).tolist()
+    assert t.data.fillcolour.tolist() == expected != positional
+    t.set_options(save_colours=True)
+    t.render()
+    assert t.cache_stats()['colours']['misses'] == 3
+    t.close()
+
+
+def test_invalidate():
+    """ invalidating a stage drops it and every stage after it """
+    t = gt.Giganttic(data_source=TESTFILE)
+    t.render()
+    t.invalidate('layout')
+    stats = t.cache_stats()
+    assert stats['milestones']['cached']
+    assert not stats['layout']['cached'] and not stats['render']['cached']
+    t.render()
+    assert t.cache_stats()['milestones']['hits'] == 1
+    t.close()
+
 
-figure = t.figure
-colours = t.colours
\ No newline at end of file
+#%% MAIN
+if __name__ == '__main__':
+    test_render()
+    test_set_options_reruns_later_stages()
+    test_continuous_fill_option()
+    test_colour_registry_option()
+    test_invalidate()
+    print('all session tests passed')
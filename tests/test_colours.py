@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for colours and the colour registry
+
+@author: dhancock
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import pandas as pd
+from matplotlib import colormaps
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+
+
+class CountingRegistry(gt.ColourRegistry):
+    """ a ColourRegistry which counts how often it writes its file """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes = 0
+
+    def save(self):
+        if self.filename is not None and self.unsaved:
+            self.writes += 1
+        super().save()
+
+
+def schedule(n=40):
+    """ n activities over four WBS elements """
+    starts = pd.date_range('2024-01-01', periods=n, freq='W')
+    return pd.DataFrame({'id': range(n),
+                         'activity_name': [f'task {i}' for i in range(n)],
+                         'WBS': [f'1.{i % 4}' for i in range(n)],
+                         'start': starts,
+                         'end': starts + pd.Timedelta(days=20)})
+
+
+#%% CASES
+def test_registry_is_stable():
+    """ a value gets the same colour from any registry, and keeps it """
+    values = pd.Series(['alpha', 'beta', 'gamma'])
+    first = gt.ColourRegistry().lookup('WBS', values, colormaps['tab10'])
+    second = gt.ColourRegistry().lookup('WBS', values[::-1], colormaps['tab10'])
+    assert first.tolist() == second[::-1].tolist()
+
+    registry = gt.ColourRegistry()
+    before = registry.lookup('WBS', values, colormaps['tab10'])
+    after = registry.lookup('WBS', pd.Series(['delta', 'gamma', 'beta', 'alpha']),
+                            colormaps['tab10'])
+    assert after[1:].tolist() == before[::-1].tolist()
+
+
+def test_registry_file():
+    """ colours are saved once per get_colours call and loaded again """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'colours.json')
+        registry = CountingRegistry(filename)
+        df, _ = gt.get_colours(schedule(), fillcolumn='WBS', bordercolumn='id',
+                               colour_registry=registry)
+        assert registry.writes == 1
+        gt.get_colours(schedule(), fillcolumn='WBS', colour_registry=registry)
+        assert registry.writes == 1
+        loaded, _ = gt.get_colours(schedule(), fillcolumn='WBS',
+                                   colour_registry=gt.ColourRegistry(filename))
+        assert loaded.fillcolour.tolist() == df.fillcolour.tolist()
+
+
+def test_plot_by_column_colours_once():
+    """ plot_by_column colours the schedule once, with the same colours in every figure """
+    collector = gt.ListCollector()
+    with gt.profiling(collector, memory=False):
+        figures = gt.plot_by_column(schedule(), 'WBS', fillcolumn='id')
+    assert 'get_colours' not in [record['stage'] for record in collector]
+    colours = pd.concat([details['data'] for details in figures.values()])
+    assert colours.groupby('id').fillcolour.nunique().max() == 1
+
+
+def test_plot_by_column_sql_saves_once():
+    """ a SQLSource's groups are coloured one at a time, but saved once """
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'schedule.db')
+        with sqlite3.connect(database) as connection:
+            schedule().to_sql('tasks', connection, index=False)
+        source = gt.SQLSource(database, table='tasks')
+        registry = CountingRegistry(os.path.join(directory, 'colours.json'))
+        figures = gt.plot_by_column(source, 'WBS', fillcolumn='id', colour_registry=registry)
+        source.close()
+    assert len(figures) == 4
+    assert registry.writes == 1
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_registry_is_stable()
+    test_registry_file()
+    test_plot_by_column_colours_once()
+    test_plot_by_column_sql_saves_once()
+    print('all colour tests passed')
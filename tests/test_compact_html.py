@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for the compact plotly html writer
+
+@author: dhancock
+"""
+
+import base64
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from benchmarks.synthetic import generate_schedule
+
+
+def figure():
+    """ a plotly gantt chart of a synthetic schedule """
+    _, fig = gt.plotly_gantt(generate_schedule(40), fillcolumn='WBS')
+    return fig
+
+
+def decode(value):
+    """ a typed array as a list of floats, anything else as it is """
+    if isinstance(value, dict) and 'bdata' in value:
+        return np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype']).tolist()
+    return value
+
+
+def as_numbers(values):
+    """ numbers, or dates as epoch milliseconds, as plotly would read them """
+    values = values if isinstance(values, list) else [values]
+    if isinstance(values[0], str):
+        return np.array([v.replace(' ', 'T') for v in values], dtype='datetime64[ms]') \
+            .astype('int64').astype(float).tolist()
+    return [float(v) for v in values]
+
+
+def expand(table):
+    """ does what the page's expand() does, and decodes the typed arrays """
+    return [dict(table['styles'][style], **{k: decode(v) for k, v in values.items()})
+            for style, values in table['items']]
+
+
+def page_spec(html):
+    """ the spec written into a page """
+    return json.loads(re.search(r'const spec = (.*);\n', html).group(1).replace('<\\/', '</'))
+
+
+#%% CASES
+def test_compact_figure_json():
+    """ expanding the compact spec gives back the figure """
+    fig = figure()
+    original = json.loads(fig.to_json())
+    spec = gt.compact_figure_json(fig, min_length=1)
+    assert len(spec['layout']['shapes']['styles']) < len(spec['layout']['shapes']['items'])
+    for key, table, expected in [('data', spec['data'], original['data']),
+                                 ('shapes', spec['layout']['shapes'],
+                                  original['layout']['shapes'])]:
+        items = expand(table)
+        assert len(items) == len(expected), key
+        for item, original_item in zip(items, expected):
+            assert set(item) == set(original_item), key
+            for name, value in original_item.items():
+                if isinstance(item[name], list) and isinstance(item[name][0], float):
+                    assert item[name] == as_numbers(value), name
+                else:
+                    assert item[name] == value, name
+    assert 'template' not in spec['layout']
+
+
+def test_typed_dates():
+    """ iso dates are stored as epoch milliseconds """
+    from giganttic.data_export import _typed_array
+    dates = ['2024-01-01', '2024-01-02 12:00:00', None] + ['2024-01-03'] * 5
+    values = decode(_typed_array(dates))
+    assert values[0] == np.datetime64('2024-01-01', 'ms').astype('int64')
+    assert values[1] - values[0] == 36 * 3600 * 1000
+    assert np.isnan(values[2])
+    assert _typed_array(['a'] * 10) is None
+    assert _typed_array([1, 2, 3]) is None
+
+
+def test_write_compact_html():
+    """ pages share one plotly.js, and compressed pages hold the same page """
+    fig = figure()
+    with tempfile.TemporaryDirectory() as outputdir:
+        first = gt.write_compact_html(fig, os.path.join(outputdir, 'first.html'))
+        plotlyjs = os.path.join(outputdir, 'plotly.min.js')
+        modified = os.path.getmtime(plotlyjs)
+        second = gt.write_compact_html(fig, os.path.join(outputdir, 'second.html'),
+                                       compress=True)
+        assert second.endswith('.html.gz')
+        assert os.path.getmtime(plotlyjs) == modified
+        assert sorted(os.listdir(outputdir)) == ['first.html', 'plotly.min.js',
+                                                 'second.html.gz']
+        with open(first, encoding='utf8') as file_object:
+            html = file_object.read()
+        with gzip.open(second, 'rt', encoding='utf8') as file_object:
+            assert file_object.read() == html
+        assert '<script src="plotly.min.js">' in html
+        assert page_spec(html) == json.loads(json.dumps(gt.compact_figure_json(fig)))
+        assert os.path.getsize(first) < len(fig.to_html()) / 5
+        cdn = gt.write_compact_html(fig, os.path.join(outputdir, 'cdn.html'), plotlyjs='cdn')
+        with open(cdn, encoding='utf8') as file_object:
+            assert 'https://cdn.plot.ly/plotly-' in file_object.read()
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_compact_figure_json()
+    test_typed_dates()
+    test_write_compact_html()
+    print('all compact html tests passed')
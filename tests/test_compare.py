@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for baseline comparison
+
+@author: dhancock
+"""
+
+import os
+import sys
+import pandas as pd
+from matplotlib.collections import PolyCollection
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+
+
+def schedules():
+    """ a baseline and a current schedule, with a slip, a pull-in and a new task """
+    baseline = pd.DataFrame({'id': [1, 2, 3],
+                             'activity_name': ['design', 'build', 'handover'],
+                             'start': pd.to_datetime(['2024-01-01', '2024-02-01', '2024-04-01']),
+                             'end': pd.to_datetime(['2024-01-31', '2024-03-31', '2024-04-01'])})
+    current = pd.DataFrame({'id': [1, 2, 3, 4],
+                            'activity_name': ['design', 'build', 'handover', 'snagging'],
+                            'start': pd.to_datetime(['2024-01-01', '2024-02-15', '2024-03-25',
+                                                     '2024-04-01']),
+                            'end': pd.to_datetime(['2024-02-02', '2024-03-20', '2024-03-25',
+                                                   '2024-04-30'])})
+    return baseline, current
+
+
+#%% CASES
+def test_compare_schedules():
+    """ slips are current minus baseline, and classified """
+    baseline, current = schedules()
+    df = gt.compare_schedules(baseline, current)
+    assert df.end_slip.tolist()[:3] == [pd.Timedelta(days=2), pd.Timedelta(days=-11),
+                                        pd.Timedelta(days=-7)]
+    assert df.comparison.tolist() == ['late', 'early', 'early', 'new']
+    df = gt.compare_schedules(baseline, current, tolerance=pd.Timedelta(days=3))
+    assert df.comparison.tolist() == ['on time', 'early', 'early', 'new']
+
+
+def test_compare_on_names():
+    """ schedules without unique ids are joined on WBS and name """
+    baseline, current = schedules()
+    baseline['WBS'], current['WBS'] = '1', '1'
+    baseline['id'], current['id'] = 0, 0
+    df = gt.compare_schedules(baseline, current)
+    assert df.baseline_end.notna().tolist() == [True, True, True, False]
+
+
+def test_baseline_ghosts():
+    """ the baseline is drawn as one collection of bars under the chart """
+    baseline, current = schedules()
+    df = gt.compare_schedules(baseline, current)
+    ax, fig = gt.mpl_gantt(df.copy(), fillcolumn='comparison')
+    ghosts = [c for c in ax.collections if isinstance(c, PolyCollection)]
+    assert len(ghosts) == 1 and len(ghosts[0].get_paths()) == 2
+
+    _, plotly_fig = gt.plotly_gantt(df.copy(), fillcolumn='comparison')
+    assert 'baseline' in [trace.name for trace in plotly_fig.data]
+
+
+def test_incremental_baseline_ghosts():
+    """ re-renders replace the ghosts, so removed rows leave none and none are doubled """
+    baseline, current = schedules()
+    df = gt.compare_schedules(baseline, current)
+    chart = gt.IncrementalGantt(fillcolumn='comparison')
+    ax, _ = chart.render(df)
+    df = df[df.id != 1].reset_index(drop=True)
+    df.loc[0, 'end'] = df.loc[0, 'end'] + pd.Timedelta(days=5)
+    chart.render(df)
+    ghosts = [c for c in ax.collections if isinstance(c, PolyCollection)]
+    assert len(ghosts) == 1 and len(ghosts[0].get_paths()) == 1
+    # build has moved up to the first row
+    tops = ghosts[0].get_paths()[0].vertices[:, 1]
+    assert min(tops) == chart.data.yvalue[0] + 0.25 - 0.45
+    assert chart.artists[('baseline',)][0] is ghosts[0]
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_compare_schedules()
+    test_compare_on_names()
+    test_baseline_ghosts()
+    test_incremental_baseline_ghosts()
+    print('all comparison tests passed')
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for continuous fill colours
+
+@author: dhancock
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps, colors
+from matplotlib import dates as mdates
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from giganttic.colours import continuous_colours
+from benchmarks.synthetic import generate_schedule
+
+
+def schedule(rows=60):
+    """ a synthetic schedule with a numeric and a duration column """
+    df = generate_schedule(rows)
+    df['float'] = np.linspace(0, 30, rows)
+    df['duration'] = df.end - df.start
+    return df
+
+
+#%% CASES
+def test_continuous_colours():
+    """ the same colours as mapping each value through the colourmap """
+    viridis = colormaps['viridis']
+    values = pd.Series([0, 2.5, None, 10, 5])
+    fills, norm, units = continuous_colours(values, viridis)
+    assert (norm.vmin, norm.vmax, units) == (0, 10, '')
+    assert fills.tolist() == [colors.to_hex(viridis(v / 10)) if v == v else None
+                              for v in values]
+    fills, norm, units = continuous_colours(values, viridis, vmin=0, vmax=20)
+    assert fills[3] == colors.to_hex(viridis(0.5))
+    durations = pd.Series(pd.to_timedelta([1, 3], unit='D'))
+    fills, norm, units = continuous_colours(durations, viridis)
+    assert (norm.vmin, norm.vmax, units) == (1, 3, 'days')
+    dates = pd.Series(pd.to_datetime(['2024-01-01', '2024-12-31']))
+    fills, norm, units = continuous_colours(dates, viridis)
+    assert units == 'date' and norm.vmin == mdates.date2num(dates[0])
+    assert continuous_colours(pd.Series([None, None]), viridis)[0].tolist() == [None, None]
+
+
+def test_get_colours_auto():
+    """ 'auto' only colours continuously when there are more values than colours """
+    df = schedule()
+    _, cmaps = gt.get_colours(df.copy(), fillcolumn='float', cmap_fill=colormaps['tab10'],
+                              continuous_fill='auto')
+    assert cmaps['fill_norm'].vmax == 30
+    _, cmaps = gt.get_colours(df.copy(), fillcolumn='WBS', cmap_fill=colormaps['tab10'],
+                              continuous_fill='auto')
+    assert 'fill_norm' not in cmaps
+    coloured, cmaps = gt.get_colours(df.copy(), fillcolumn='duration', continuous_fill=True,
+                                     fill_range=(0, 100))
+    assert cmaps['fill_units'] == 'days'
+    assert (cmaps['fill_norm'].vmin, cmaps['fill_norm'].vmax) == (0, 100)
+    assert coloured.fillcolour.str.match('^#[0-9a-f]{6}$').all()
+
+
+def test_colourbar():
+    """ continuous fills get a colour bar instead of a legend """
+    df = schedule()
+    ax, fig = gt.mpl_gantt(df.copy(), fillcolumn='float', continuous_fill=True, legend=True)
+    assert len(fig.axes) == 2
+    assert ax.get_legend() is None
+    ax, fig = gt.mpl_gantt(df.copy(), fillcolumn='start', continuous_fill=True, legend=True)
+    assert isinstance(fig.axes[1].yaxis.get_major_formatter(), mdates.ConciseDateFormatter)
+    _, fig = gt.plotly_gantt(df.copy(), fillcolumn='float', continuous_fill=True)
+    scales = [trace for trace in fig.data if trace.marker.showscale]
+    assert len(scales) == 1
+    assert (scales[0].marker.cmin, scales[0].marker.cmax) == (0, 30)
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_continuous_colours()
+    test_get_colours_auto()
+    test_colourbar()
+    print('all continuous colour tests passed')
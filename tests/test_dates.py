@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for date parsing
+
+@author: dhancock
+"""
+
+import datetime
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+
+INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input')
+
+
+#%% CASES
+def test_mixed_formats():
+    """ strings in several formats, datetimes and excel serials all parse """
+    values = ['31/01/2024', '31-Jan-2024', '2024-01-31', '2024-01-31T08:00:00',
+              datetime.datetime(2024, 1, 31), 45322, '45322', None, '', 'not a date']
+    dates = gt.parse_dates(values)
+    assert dates[:3].tolist() == [pd.Timestamp('2024-01-31')] * 3
+    assert dates[3] == pd.Timestamp('2024-01-31 08:00')
+    assert dates[4:7].tolist() == [pd.Timestamp('2024-01-31')] * 3
+    assert dates[7:].isna().all()
+
+
+def test_dayfirst():
+    """ ambiguous columns follow dayfirst, but the sniffed format wins if it's clear """
+    assert gt.parse_dates(['01/02/2024', '03/04/2024']).tolist() == [
+        pd.Timestamp('2024-02-01'), pd.Timestamp('2024-04-03')]
+    assert gt.parse_dates(['01/02/2024', '03/04/2024'], dayfirst=False).tolist() == [
+        pd.Timestamp('2024-01-02'), pd.Timestamp('2024-03-04')]
+    # 13 can only be a day, so the whole column is day first
+    assert gt.parse_dates(['01/02/2024', '13/02/2024'], dayfirst=False).tolist() == [
+        pd.Timestamp('2024-02-01'), pd.Timestamp('2024-02-13')]
+
+
+def test_distinct_values():
+    """ repeated dates keep their positions """
+    values = pd.Series(['05/03/2024', '06/03/2024'] * 5000)
+    dates = gt.parse_dates(values)
+    assert len(dates) == 10000
+    assert dates.value_counts().tolist() == [5000, 5000]
+    assert (dates[::2] == pd.Timestamp('2024-03-05')).all()
+
+
+def test_importers_agree():
+    """ the csv and excel importers give the same dates """
+    csv = gt.import_csv(os.path.join(INPUT, 'exampledata1.csv'))
+    assert pd.api.types.is_datetime64_any_dtype(csv.start)
+    assert csv.start.notna().all() and csv.end.notna().all()
+    excel = gt.import_excel(os.path.join(INPUT, 'exampledata2.xlsx'))
+    assert pd.api.types.is_datetime64_any_dtype(excel.start)
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_mixed_formats()
+    test_dayfirst()
+    test_distinct_values()
+    test_importers_agree()
+    print('all date tests passed')
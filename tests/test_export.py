@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for the ms project xml exporter
+
+@author: dhancock
+"""
+
+import os
+import sys
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+COLUMNS = ['id', 'WBS', 'activity_name', 'start', 'end']
+
+
+def round_trip(df):
+    """ exports df and imports it again """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = gt.export_mpp_xml(df, os.path.join(directory, 'plan.xml'), title='test')
+        return gt.import_mpp_xml(filename)
+
+
+def schedule(predecessors=False):
+    """ a small schedule, as import_mpp_xml returns it """
+    df = pd.DataFrame({'id': ['1', '2', '3'],
+                       'WBS': ['1', '1.1', '1.2'],
+                       'OutlineLevel': [1, 2, 2],
+                       'activity_name': ['1 summary', '1.1 design', '1.2 build'],
+                       'start': pd.to_datetime(['2024-01-01 08:00', '2024-01-01 08:00',
+                                                '2024-02-01 08:00']),
+                       'end': pd.to_datetime(['2024-03-01 17:00', '2024-01-31 17:00',
+                                              '2024-03-01 17:00'])})
+    if predecessors:
+        df['predecessors'] = ['', '', '2']
+    return df
+
+
+#%% CASES
+def test_round_trip_without_links():
+    """ a schedule with no predecessors can be read back """
+    df = schedule()
+    result = round_trip(df)
+    pd.testing.assert_frame_equal(result[COLUMNS], df[COLUMNS], check_dtype=False)
+    assert result.predecessors.isna().all()
+
+
+def test_round_trip_with_links():
+    """ predecessors are written as PredecessorLink and read back """
+    result = round_trip(schedule(predecessors=True))
+    assert result.predecessors.tolist()[2] == '2'
+    assert result.predecessors.iloc[:2].isna().all()
+
+
+def test_round_trip_msp_file():
+    """ an ms project file survives export and import unchanged """
+    original = gt.import_mpp_xml(os.path.join(TESTS, 'msp_test.xml'))
+    result = round_trip(original)
+    pd.testing.assert_frame_equal(result[COLUMNS + ['predecessors']],
+                                  original[COLUMNS + ['predecessors']], check_dtype=False)
+
+
+def test_round_trip_float_ids():
+    """ ids and predecessors from a numeric column are written without .0 """
+    df = schedule()
+    df['id'] = [1.0, 2.0, 3.0]
+    df['predecessors'] = [None, 1.0, '1.0, 2.0']
+    result = round_trip(df)
+    assert result.id.tolist() == ['1', '2', '3']
+    assert result.predecessors.tolist()[1:] == ['1', '1,2']
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_round_trip_without_links()
+    test_round_trip_with_links()
+    test_round_trip_msp_file()
+    test_round_trip_float_ids()
+    print('all export tests passed')
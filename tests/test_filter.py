@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for FilterIndex
+
+@author: dhancock
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from benchmarks.synthetic import generate_schedule
+
+
+def schedule():
+    """ a synthetic schedule with some missing values """
+    df = generate_schedule(1000)
+    df.loc[::17, 'WBS'] = None
+    return df
+
+
+#%% CASES
+def test_filters_match_pandas():
+    """ every filter selects the same rows as the equivalent pandas mask """
+    df = schedule()
+    index = gt.FilterIndex(df)
+    checks = [(index.eq('WBS', '1.2.3'), df.WBS == '1.2.3'),
+              (index.isin('WBS', ['1.1.1', '2.1.1', 'x']), df.WBS.isin(['1.1.1', '2.1.1'])),
+              (index.notna('WBS'), df.WBS.notna()),
+              (index.contains('activity_name', r'\(T[12]\)'),
+               df.activity_name.str.contains(r'\(T[12]\)')),
+              (index.contains('activity_name', 'ACTIVITY 1', case=False),
+               df.activity_name.str.contains('activity 1')),
+              (index.window('2025-01-01', '2025-03-31'),
+               (df.start <= '2025-03-31') & (df.end >= '2025-01-01')),
+              (index.milestones(), df.start == df.end),
+              (index.words('activity_name', 'T1'), df.activity_name.str.contains(r'\bT1\b'))]
+    for number, (selection, mask) in enumerate(checks):
+        assert np.array_equal(selection.mask, mask.fillna(False).to_numpy()), number
+
+
+def test_combined_selection():
+    """ selections combine like boolean masks """
+    df = schedule()
+    index = gt.FilterIndex(df)
+    selection = (index.eq('WBS', '1.1.1') | index.milestones()) & ~index.window(end='2026-01-01')
+    mask = ((df.WBS == '1.1.1') | (df.start == df.end)) & ~(df.start <= '2026-01-01')
+    pd.testing.assert_frame_equal(index.select(selection), df[mask].reset_index(drop=True))
+    assert len(selection) == mask.sum()
+
+
+def test_groups_and_filter_data():
+    """ groups cover every row with a value, and filter_data uses the index """
+    df = schedule()
+    groups = gt.FilterIndex(df).groups('WBS')
+    assert list(groups) == df.WBS.dropna().unique().tolist()
+    assert sum(len(selection) for selection in groups.values()) == df.WBS.notna().sum()
+    filtered = gt.filter_data(df, 'WBS', r'^1\.2')
+    assert filtered.WBS.str.startswith('1.2').all()
+    assert len(filtered) == df.WBS.str.startswith('1.2').sum()
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_filters_match_pandas()
+    test_combined_selection()
+    test_groups_and_filter_data()
+    print('all filter tests passed')
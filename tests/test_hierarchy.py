@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for the WBS hierarchy functions
+
+@author: dhancock
+"""
+
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+
+
+def schedule(wbs):
+    """ a schedule with one row per WBS code, a month apart """
+    starts = pd.date_range('2024-01-01', periods=len(wbs), freq='MS')
+    return pd.DataFrame({'id': range(len(wbs)),
+                         'WBS': wbs,
+                         'activity_name': [f'task {w}' for w in wbs],
+                         'start': starts,
+                         'end': starts + pd.Timedelta(days=20)})
+
+
+#%% CASES
+def test_rollup():
+    """ every WBS element spans the rows below it """
+    summary = gt.rollup(schedule(['1', '1.1', '1.1.1', '1.1.2', '1.2', '2']))
+    assert summary.loc['1', 'count'] == 5
+    assert summary.loc['1.1', 'count'] == 3
+    assert summary.loc['1.1', 'parent'] == '1'
+    assert summary.loc['1', 'end'] == pd.Timestamp('2024-05-21')
+
+
+def test_collapse_existing_summary():
+    """ an existing row for the WBS element becomes its summary row """
+    collapsed = gt.collapse(schedule(['1.1', '1.1.1', '1.1.2', '1.2']), 2)
+    assert collapsed.WBS.tolist() == ['1.1', '1.2']
+    assert collapsed.summary.tolist() == [True, False]
+    assert collapsed.rollup_count.tolist() == [3, 1]
+    assert collapsed.end[0] == pd.Timestamp('2024-03-21')
+
+
+def test_collapse_child_before_summary():
+    """ the summary row is still used when a child comes before it """
+    collapsed = gt.collapse(schedule(['1.1.1', '1.1', '1.1.2']), 2)
+    assert collapsed.WBS.tolist() == ['1.1']
+    assert collapsed.activity_name.tolist() == ['task 1.1']
+    assert collapsed.summary.tolist() == [True]
+    assert collapsed.rollup_count.tolist() == [3]
+    assert collapsed.start[0] == pd.Timestamp('2024-01-01')
+
+
+def test_collapse_new_summary():
+    """ a new summary row is made where there isn't one """
+    collapsed = gt.collapse(schedule(['1.1.1', '1.1.2', '1.2']), 2)
+    assert collapsed.WBS.tolist() == ['1.1', '1.2']
+    assert collapsed.activity_name[0] == '1.1 (2)'
+    assert collapsed.id[0] == 'WBS 1.1'
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_rollup()
+    test_collapse_existing_summary()
+    test_collapse_child_before_summary()
+    test_collapse_new_summary()
+    print('all hierarchy tests passed')
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for importing many files and sheets at once
+
+@author: dhancock
+"""
+
+import os
+import sys
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from benchmarks.synthetic import generate_schedule, WRITERS
+
+
+def write_projects(outputdir):
+    """ writes a small schedule in each format, and a file that can't be imported """
+    files = {}
+    for number, (extension, writer) in enumerate(WRITERS.items()):
+        df = generate_schedule(20, seed=number)
+        files[extension] = writer(df, os.path.join(outputdir, f'project_{extension}.{extension}'))
+    with open(os.path.join(outputdir, 'project_bad.csv'), 'w', encoding='utf8') as file_object:
+        file_object.write('"unterminated\n')
+    return files
+
+
+#%% CASES
+def test_import_files():
+    """ globbed files are imported, namespaced and reported, and bad files don't stop it """
+    with tempfile.TemporaryDirectory() as outputdir:
+        write_projects(outputdir)
+        df, report = gt.import_files(os.path.join(outputdir, 'project_*'), processes=2)
+    assert report.file.map(os.path.basename).tolist() == [
+        'project_bad.csv', 'project_csv.csv', 'project_xlsx.xlsx', 'project_xml.xml']
+    assert report.error.notna().tolist() == [True, False, False, False]
+    assert report.rows[1:].sum() == len(df)
+    assert set(df.source) == {'project_csv', 'project_xlsx', 'project_xml'}
+    assert df.id.is_unique
+    assert pd.api.types.is_datetime64_any_dtype(df.start)
+    # predecessors point at activities in the same file
+    predecessors = df.predecessors.str.split(',').explode().dropna()
+    predecessors = predecessors[predecessors != '']
+    assert len(predecessors) > 0
+    assert predecessors.isin(df.id).all()
+    assert (predecessors.str.split(':').str[0] == df.source[predecessors.index]).all()
+
+
+def test_import_files_list():
+    """ a list of files in one process gives the same schedule as a pool """
+    with tempfile.TemporaryDirectory() as outputdir:
+        files = write_projects(outputdir)
+        serial, _ = gt.import_files([files['csv'], files['xlsx']], processes=1)
+        parallel, _ = gt.import_files([files['csv'], files['xlsx']], processes=2)
+        plain, _ = gt.import_files(files['csv'], namespace=False)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert plain.id.tolist() == generate_schedule(20, seed=0).id.tolist()
+
+
+def test_import_sheets():
+    """ every sheet of a workbook is imported, with normalised column names """
+    first = generate_schedule(10, seed=1)
+    second = generate_schedule(5, seed=2).rename(columns={'activity_name': 'Activity Name',
+                                                          'start': 'START'})
+    with tempfile.TemporaryDirectory() as outputdir:
+        filename = os.path.join(outputdir, 'workbook.xlsx')
+        with pd.ExcelWriter(filename) as writer:
+            first.to_excel(writer, sheet_name='one', index=False)
+            second.to_excel(writer, sheet_name='two', index=False)
+        df, report = gt.import_files(filename, sheet=None)
+        only_two = gt.import_excel(filename, sheet=['two'])
+    assert report.rows.tolist() == [15]
+    assert df.source.value_counts().to_dict() == {'workbook[one]': 10, 'workbook[two]': 5}
+    assert df.activity_name.notna().all() and df.start.notna().all()
+    assert df.id.is_unique
+    assert only_two.sheet.unique().tolist() == ['two']
+    assert 'start' in only_two.columns
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_import_files()
+    test_import_files_list()
+    test_import_sheets()
+    print('all import files tests passed')
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for incremental re-rendering
+
+@author: dhancock
+"""
+
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+
+
+def schedule(n=20):
+    """ n activities with a milestone at the end of each """
+    starts = pd.date_range('2024-01-01', periods=n, freq='W')
+    return pd.DataFrame({'id': [f'A{i}' for i in range(n)],
+                         'activity_name': [f'task {i}' for i in range(n)],
+                         'start': starts,
+                         'end': starts + pd.Timedelta(days=30),
+                         'WBS': [f'1.{i % 4}' for i in range(n)]})
+
+
+#%% CASES
+def test_diff_schedules():
+    """ rows are matched by id and classified """
+    old = schedule()
+    new = old.drop(index=3).copy()
+    new.loc[5, 'end'] = new.loc[5, 'end'] + pd.Timedelta(days=7)
+    new = pd.concat([new, schedule(21).tail(1)], ignore_index=True)
+    diff = gt.diff_schedules(old, new)
+    status = dict(zip(diff.id, diff.status))
+    assert status['A3'] == 'removed'
+    assert status['A5'] == 'changed'
+    assert status['A20'] == 'added'
+    assert status['A0'] == 'unchanged'
+
+
+def test_update_reuses_colours():
+    """ updates draw only the changed rows, with the colours from prepare """
+    chart = gt.IncrementalGantt(fillcolumn='WBS')
+    df = schedule()
+    chart.render(df)
+    first_colour = chart.data.fillcolour[0]
+
+    df.loc[2, 'end'] = df.loc[2, 'end'] + pd.Timedelta(days=10)
+    collector = gt.ListCollector()
+    with gt.profiling(collector, memory=False):
+        chart.render(df)
+    stages = [record['stage'] for record in collector]
+    assert 'get_colours' not in stages
+    assert chart.last_diff.status.value_counts()['changed'] == 1
+    assert chart.data.fillcolour[0] == first_colour
+    assert set(chart.artists).issuperset(df.id)
+
+
+def test_new_value_keeps_colours():
+    """ a new fill value only adds a row, instead of shifting every colour """
+    chart = gt.IncrementalGantt(fillcolumn='WBS')
+    df = schedule()
+    chart.render(df)
+    colours = chart.data.fillcolour.tolist()
+    new_row = schedule(21).tail(1).assign(WBS='0.9')
+    chart.render(pd.concat([new_row, df], ignore_index=True))
+    assert chart.last_diff.status.value_counts().to_dict() == {'moved': 20, 'added': 1}
+    assert chart.data.fillcolour.tolist()[1:] == colours
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_diff_schedules()
+    test_update_reuses_colours()
+    test_new_value_keeps_colours()
+    print('all incremental tests passed')
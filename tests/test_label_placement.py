@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for milestone label placement
+
+@author: dhancock
+"""
+
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+from giganttic.label_placement import place_labels
+
+
+def dense_milestones(n=200):
+    """ n milestones with long names, all on one row in the same week """
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(n) % 7, unit='D')
+    return pd.DataFrame({'id': range(n),
+                         'activity_name': [f'a long milestone name {i}' for i in range(n)],
+                         'start': dates,
+                         'end': dates,
+                         'yvalue': 0})
+
+
+#%% CASES
+def test_place_labels():
+    """ overlapping boxes fall back to the next candidate, or are dropped """
+    boxes = np.array([[[0, 0, 10, 10], [5, 0, 15, 10], [6, 0, 16, 10]],
+                      [[0, 20, 10, 30], [5, 20, 15, 30], [6, 20, 16, 30]]], dtype=float)
+    assert place_labels(boxes).tolist() == [0, 1, -1]
+
+
+def test_suppressed_labels_recorded():
+    """ dropped labels are reported on the place_labels stage, not printed """
+    collector = gt.ListCollector()
+    output = io.StringIO()
+    with redirect_stdout(output), gt.profiling(collector, memory=False):
+        gt.mpl_gantt(dense_milestones())
+    records = [record for record in collector if record['stage'] == 'place_labels']
+    assert len(records) == 1
+    assert records[0]['suppressed'] > 0
+    assert 'milestone labels not shown' not in output.getvalue()
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_place_labels()
+    test_suppressed_labels_recorded()
+    print('all label placement tests passed')
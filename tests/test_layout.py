@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for laying out figures from text metrics
+
+@author: dhancock
+"""
+
+import os
+import sys
+from matplotlib.figure import Figure
+from matplotlib.ticker import FixedLocator
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from giganttic.mpl_gantt import text_extent, fit_layout
+from benchmarks.synthetic import generate_schedule
+
+
+def margins(fig):
+    """ the left, right, bottom and top of a figure's subplots """
+    params = fig.subplotpars
+    return params.left, params.right, params.bottom, params.top
+
+
+def count_tight_layouts(rows):
+    """ the number of times a chart of rows rows calls tight_layout """
+    calls = []
+    tight_layout = Figure.tight_layout
+    Figure.tight_layout = lambda fig, *args, **kwargs: calls.append(fig)
+    try:
+        gt.mpl_gantt(generate_schedule(rows), fillcolumn='WBS')
+    finally:
+        Figure.tight_layout = tight_layout
+    return len(calls)
+
+
+#%% CASES
+def test_text_extent():
+    """ text is measured in points, once for each text and size """
+    text_extent.cache_clear()
+    width, height = text_extent('activity 1', 10)
+    assert text_extent('activity 1', 10) == (width, height)
+    assert text_extent.cache_info().hits == 1
+    assert text_extent('activity 1 (T1)', 10)[0] > width
+    assert text_extent('activity 1', 20)[0] > 1.9 * width
+    fig = gt.new_figure(dpi=72)
+    text = fig.text(0, 0, 'activity 1', fontsize=10)
+    extent = text.get_window_extent(fig.canvas.get_renderer())
+    assert abs(extent.width - width) < 0.5
+
+
+def test_fit_layout():
+    """ the margins are close to tight_layout's, without clipping """
+    df = generate_schedule(150)
+    _, fig = gt.mpl_gantt(df.copy(), fillcolumn='WBS', title='a long\ntwo line title',
+                          tight_layout=True)
+    tight = margins(fig)
+    ax, fig = gt.mpl_gantt(df.copy(), fillcolumn='WBS', title='a long\ntwo line title',
+                           tight_layout=False)
+    fit_layout(fig, ax, ax.yaxis.get_major_formatter().seq,
+               gt.get_figure_style(fig)['font_size'])
+    left, right, bottom, top = margins(fig)
+    assert abs(left - tight[0]) < 0.01 and abs(bottom - tight[2]) < 0.01
+    assert abs(top - tight[3]) < 0.01
+    # room is left for half a date label at the right, which tight_layout may not need
+    assert tight[1] - 0.05 < right <= tight[1]
+
+
+def test_auto_layout():
+    """ tight_layout is only used for small charts, and y ticks are fixed """
+    assert count_tight_layouts(50) == 1
+    assert count_tight_layouts(150) == 0
+    ax, _ = gt.mpl_gantt(generate_schedule(150), fillcolumn='WBS')
+    assert isinstance(ax.yaxis.get_major_locator(), FixedLocator)
+    assert len(ax.get_yticks()) == 150
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_text_extent()
+    test_fit_layout()
+    test_auto_layout()
+    print('all layout tests passed')
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for the loading histogram
+
+@author: dhancock
+"""
+
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from benchmarks.synthetic import generate_schedule
+
+
+def brute_force_loading(df, freq):
+    """ counts the rows in progress in each period, one period at a time """
+    starts = df.start.dt.to_period(freq)
+    ends = df.end.dt.to_period(freq)
+    periods = pd.period_range(starts.min(), ends.max(), freq=freq)
+    return [int(((starts <= period) & (ends >= period)).sum()) for period in periods]
+
+
+#%% CASES
+def test_get_loading():
+    """ the event sweep gives the same counts as checking every period """
+    df = generate_schedule(500)
+    loading = gt.get_loading(df, freq='M')
+    assert loading.active.tolist() == brute_force_loading(df, 'M')
+
+
+def test_get_loading_by_column():
+    """ counts by a column add up to the total """
+    df = generate_schedule(500)
+    total = gt.get_loading(df, freq='Q')
+    by_wbs = gt.get_loading(df, freq='Q', by='WBS')
+    assert by_wbs.sum(axis=1).tolist() == total.active.tolist()
+    assert set(by_wbs.columns) == set(df.WBS)
+
+
+def test_get_loading_window():
+    """ a window only counts the periods inside it """
+    df = generate_schedule(500)
+    whole = gt.get_loading(df, freq='M')
+    window = gt.get_loading(df, freq='M', start='2025-01-01', end='2025-12-31')
+    assert len(window) == 12
+    assert window.active.tolist() == whole.loc[window.index, 'active'].tolist()
+
+
+def test_loading_strip():
+    """ a loading strip is added under the gantt chart """
+    df = generate_schedule(100)
+    ax, fig = gt.loading_chart(df, by='WBS')
+    assert len(ax.collections) > 0
+    ax, fig = gt.mpl_gantt(df, fillcolumn='WBS', loading=True)
+    assert len(fig.axes) == 2
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_get_loading()
+    test_get_loading_by_column()
+    test_get_loading_window()
+    test_loading_strip()
+    print('all loading tests passed')
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for row packing
+
+@author: dhancock
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from benchmarks.synthetic import generate_schedule
+
+
+def overlaps(df):
+    """ True if any two rows on the same lane overlap """
+    for _, lane in df.dropna(subset=['start', 'end']).groupby('yvalue'):
+        lane = lane.sort_values('start')
+        if (lane.start.to_numpy()[1:] <= lane.end.to_numpy()[:-1]).any():
+            return True
+    return False
+
+
+#%% CASES
+def test_pack_rows_lanes():
+    """ rows share a lane only when they don't overlap """
+    df = pd.DataFrame({'WBS': ['1', '1', '1', '2', '2'],
+                       'start': pd.to_datetime(['2024-01-01', '2024-01-15', '2024-02-01',
+                                                '2024-01-01', '2024-03-01']),
+                       'end': pd.to_datetime(['2024-01-31', '2024-02-15', '2024-02-28',
+                                              '2024-01-31', '2024-03-31'])})
+    packed = gt.pack_rows(df)
+    assert packed.lane.tolist() == [0, 1, 0, 0, 0]
+    # group 2 starts after group 1's two lanes and a blank one
+    assert packed.yvalue.tolist() == [0, 1, 0, 3, 3]
+    assert packed.ylabel.tolist() == ['1', '', '1', '2', '2']
+
+
+def test_pack_rows_milestone_gap():
+    """ a milestone on the end date of a bar goes on another lane """
+    df = pd.DataFrame({'start': pd.to_datetime(['2024-01-01', '2024-01-31']),
+                       'end': pd.to_datetime(['2024-01-31', '2024-01-31'])})
+    assert gt.pack_rows(df, group_column=None).lane.tolist() == [0, 1]
+
+
+def test_pack_rows_synthetic():
+    """ a big schedule needs far fewer lanes, none of which overlap """
+    df = generate_schedule(2000)
+    packed = gt.pack_rows(df)
+    assert not overlaps(packed)
+    assert packed.yvalue.nunique() < len(df) / 3
+    assert np.array_equal(packed.id, df.id)
+    ax, fig = gt.mpl_gantt(packed, fillcolumn='WBS')
+    assert len(ax.get_yticks()) == packed.yvalue.nunique()
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_pack_rows_lanes()
+    test_pack_rows_milestone_gap()
+    test_pack_rows_synthetic()
+    print('all row packing tests passed')
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for sharing schedules with worker processes
+
+@author: dhancock
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from benchmarks.synthetic import generate_schedule
+
+
+def schedule():
+    """ a schedule with every kind of column SharedFrame stores """
+    df = generate_schedule(50)
+    df.loc[::7, 'WBS'] = None
+    df['task_type'] = pd.Categorical(np.where(df.start == df.end, 'milestone', 'task'),
+                                     categories=['task', 'milestone', 'summary'], ordered=True)
+    df.loc[3, 'task_type'] = np.nan
+    df['critical'] = df.index % 3 == 0
+    df['duration'] = (df.end - df.start).dt.days.astype(float)
+    df['mixed'] = pd.Series([1, 'a', None, 2.5, 'b'] * 10, dtype=object)
+    return df
+
+
+def count_rows(view, positions):
+    """ a worker task: the number of rows and the names at positions """
+    selected = view.select(positions, columns=['activity_name'])
+    return len(selected), selected.activity_name.tolist()
+
+
+#%% CASES
+def test_shared_frame():
+    """ a view gives back the rows of the frame, without copying columns """
+    df = schedule()
+    with gt.SharedFrame(df) as shared:
+        view = shared.view()
+        assert len(view) == len(df)
+        assert view.columns == df.columns.tolist()
+        assert isinstance(view.column('start'), np.memmap)
+        pd.testing.assert_frame_equal(view.select(), df)
+        positions = [10, 3, 0, 49]
+        pd.testing.assert_frame_equal(view.select(positions),
+                                      df.iloc[positions].reset_index(drop=True))
+        assert view.select(positions, columns=['id', 'WBS']).columns.tolist() == ['id', 'WBS']
+        directory = shared.directory
+        assert os.path.isdir(directory)
+    assert not os.path.exists(directory)
+
+
+def test_map_shared():
+    """ each task runs in a worker against the shared frame """
+    df = schedule()
+    tasks = [[0, 1], [5], list(range(20, 30))]
+    results = gt.map_shared(count_rows, df, tasks, processes=2)
+    assert results == [(len(task), df.activity_name[task].tolist()) for task in tasks]
+
+
+def test_plot_by_column_processes():
+    """ plotting groups in a pool gives the same groups as plotting them in turn """
+    df = generate_schedule(60)
+    serial = gt.plot_by_column(df, 'WBS', fillcolumn='WBS')
+    pooled = gt.plot_by_column(df, 'WBS', fillcolumn='WBS', processes=2)
+    assert list(pooled) == list(serial)
+    for group in serial:
+        # the serial gantt_chart adds its plot columns to the data it's given
+        data = pooled[group]['data']
+        pd.testing.assert_frame_equal(data, serial[group]['data'][data.columns])
+        assert pooled[group]['title'] == serial[group]['title']
+        assert len(pooled[group]['axis'].patches) == len(serial[group]['axis'].patches)
+    with tempfile.TemporaryDirectory() as outputdir:
+        saved = gt.plot_by_column(df, 'WBS', fillcolumn='WBS', processes=2,
+                                  outputdir=outputdir)
+        files = [details['file'] for details in saved.values()]
+        assert all(os.path.getsize(file) > 0 for file in files)
+        assert sorted(os.listdir(outputdir)) == sorted(os.path.basename(f) for f in files)
+    assert all(details['figure'] is None for details in saved.values())
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_shared_frame()
+    test_map_shared()
+    test_plot_by_column_processes()
+    print('all parallel tests passed')
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for partitioned schedules
+
+@author: dhancock
+"""
+
+import math
+import os
+import sys
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from benchmarks.synthetic import generate_schedule, WRITERS
+
+
+def partitioned(outputdir, rows=300):
+    """ a synthetic schedule, and the same schedule written to csv and partitioned """
+    df = generate_schedule(rows)
+    filename = WRITERS['csv'](df, os.path.join(outputdir, 'schedule.csv'))
+    return df, gt.partition_csv(filename, os.path.join(outputdir, 'partitions'), chunksize=50)
+
+
+#%% CASES
+def test_partition_csv():
+    """ every row goes to the partition of its WBS branch, a chunk at a time """
+    with tempfile.TemporaryDirectory() as outputdir:
+        df, schedule = partitioned(outputdir)
+        assert schedule.keys == df.WBS.str.split('.').str[0].unique().tolist()
+        assert len(schedule) == len(df)
+        assert schedule.date_range == (df.start.min(), df.end.max())
+        assert all(p['chunks'] > 1 for p in schedule.manifest['partitions'].values())
+        for key, partition in schedule:
+            assert partition.WBS.str.startswith(f'{key}.').all()
+            assert pd.api.types.is_datetime64_any_dtype(partition.start)
+        # the manifest is loaded again from the directory
+        reopened = gt.PartitionedSchedule(schedule.directory)
+        assert reopened.keys == schedule.keys and len(reopened) == len(df)
+        ids = pd.concat([part for _, part in reopened]).id
+        assert sorted(ids, key=int) == df.id.tolist()
+
+
+def test_prepare_partitions():
+    """ activity ids and colours are the same as for the whole schedule """
+    with tempfile.TemporaryDirectory() as outputdir:
+        df, schedule = partitioned(outputdir)
+        prepared = gt.prepare_partitions(schedule, os.path.join(outputdir, 'prepared'),
+                                         fillcolumn='milestone')
+        parts = pd.concat([part for _, part in prepared], ignore_index=True)
+        order = pd.concat([part.WBS for _, part in schedule]).unique()
+    wbs_ids = parts.groupby('WBS').activity_id.unique()
+    assert wbs_ids.map(len).eq(1).all()
+    assert wbs_ids.str[0][order].tolist() == list(range(len(order)))
+    assert parts.groupby('milestone').fillcolour.nunique().eq(1).all()
+    assert parts.yvalue.notna().all()
+
+
+def test_render_partitions():
+    """ each partition is drawn as pages of at most maxlines rows """
+    with tempfile.TemporaryDirectory() as outputdir:
+        df, schedule = partitioned(outputdir)
+        prepared = gt.prepare_partitions(schedule, os.path.join(outputdir, 'prepared'),
+                                         fillcolumn='WBS')
+        files = gt.render_partitions(prepared, os.path.join(outputdir, 'pages'), maxlines=10,
+                                     dpi=50)
+        pages = sum(math.ceil(part.yvalue.nunique() / 10) for _, part in prepared)
+        assert len(files) == pages
+        assert all(os.path.getsize(file) > 0 for file in files)
+        assert files[0].endswith('0_1_0.png')
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_partition_csv()
+    test_prepare_partitions()
+    test_render_partitions()
+    print('all partitioned tests passed')
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for stage timing instrumentation
+
+@author: dhancock
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+from contextlib import redirect_stdout
+import pandas as pd
+from matplotlib import colormaps
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+
+TESTFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input', 'exampledata1.csv')
+
+
+#%% CASES
+def test_stages_are_nested():
+    """ stages report their time, rows, memory and parent """
+    collector = gt.ListCollector()
+    with gt.profiling(collector):
+        with gt.stage('outer', rows=10) as record:
+            with gt.stage('inner', rows=5):
+                data = list(range(100000))
+            record['rows_out'] = len(data)
+    inner, outer = collector
+    assert inner['stage'] == 'inner' and inner['parent'] == 'outer'
+    assert outer['parent'] is None and outer['rows_out'] == 100000
+    assert outer['wall_time'] >= inner['wall_time'] > 0
+    assert outer['peak_memory_mb'] >= inner['peak_memory_mb'] > 0
+
+
+def test_no_collector():
+    """ stages cost nothing and report nothing when profiling is off """
+    with gt.stage('unprofiled') as record:
+        pass
+    assert 'wall_time' not in record
+
+
+def test_giganttic_profile_file():
+    """ giganttic() writes every stage to a json lines file """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'profile.jsonl')
+        gt.giganttic(TESTFILE, output_file=None, profile=filename)
+        with open(filename, 'r', encoding='utf8') as file_object:
+            records = [json.loads(line) for line in file_object]
+    stages = [record['stage'] for record in records]
+    assert stages[-1] == 'giganttic'
+    assert {'import_csv', 'setup_figure', 'plot_event'} <= set(stages)
+    assert all(record['wall_time'] >= 0 for record in records)
+
+
+def test_warnings_are_logged():
+    """ warnings go to the giganttic logger instead of stdout """
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    logger = logging.getLogger('giganttic')
+    logger.addHandler(handler)
+    output = io.StringIO()
+    df = pd.DataFrame({'id': range(12), 'activity_name': [f'task {i}' for i in range(12)]})
+    try:
+        with tempfile.TemporaryDirectory() as directory, redirect_stdout(output):
+            gt.get_colours(df, fillcolumn='activity_name', cmap_fill=colormaps['tab10'])
+            filename = os.path.join(directory, 'undated.csv')
+            df.to_csv(filename, index=False)
+            gt.import_csv(filename)
+    finally:
+        logger.removeHandler(handler)
+    assert output.getvalue() == ''
+    assert 'more values in activity_name than colours in tab10' in stream.getvalue()
+    assert 'no start and end values defined' in stream.getvalue()
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_stages_are_nested()
+    test_no_collector()
+    test_giganttic_profile_file()
+    test_warnings_are_logged()
+    print('all profiling tests passed')
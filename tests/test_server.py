@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for the giganttic render server
+
+@author: dhancock
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+from giganttic import server
+
+INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input')
+
+DATA = [['id', 'activity_name', 'start', 'end'],
+        [1, 'task', '01/01/2024', '01/06/2024'],
+        [2, 'milestone', '01/03/2024', '01/03/2024']]
+
+
+def refused(payload, root=None):
+    """ True if render_payload refuses the payload """
+    try:
+        server.render_payload(payload, root=root)
+    except ValueError:
+        return True
+    return False
+
+
+#%% CASES
+def test_render_payload():
+    """ renders data sent in the request """
+    body, content_type, timings = gt.render_payload({'data': DATA, 'format': 'svg',
+                                                     'options': {'fillcolumn': 'id'}})
+    assert content_type == 'image/svg+xml'
+    assert body.startswith(b'<?xml')
+    assert 'render_time' in timings
+
+
+def test_refused_options():
+    """ options which touch files on the server are refused """
+    profile = os.path.join(tempfile.gettempdir(), 'giganttic_server_profile.jsonl')
+    for option, value in [('profile', profile),
+                          ('baseline_data', os.path.join(INPUT, 'exampledata1.csv')),
+                          ('incremental', True),
+                          ('outputdir', tempfile.gettempdir()),
+                          ('show_figure', True)]:
+        assert refused({'data': DATA, 'options': {option: value}}), option
+    assert not os.path.exists(profile)
+
+
+def test_data_is_not_a_path():
+    """ data must be rows or records, never paths or globs to read on the server """
+    csv = os.path.join(INPUT, 'exampledata1.csv')
+    for data in [csv, os.path.join(INPUT, '*.csv'), [csv], [csv, csv], [], [['id']], 42]:
+        assert refused({'data': data, 'format': 'json'}), data
+    records = [dict(zip(DATA[0], row)) for row in DATA[1:]]
+    body, content_type, _ = server.render_payload({'data': records, 'format': 'json'})
+    assert content_type == 'application/json'
+    assert b'"activity_name":"milestone"' in body
+
+
+def test_malformed_request():
+    """ malformed requests get a 400 instead of dropping the connection """
+    async def send(request):
+        render_server = gt.RenderServer(workers=1)
+        render_server.executor = ThreadPoolExecutor(1)
+        await render_server.start()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', render_server.port)
+            writer.write(request)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.readline(), 10)
+            writer.close()
+        finally:
+            render_server.close()
+        return response, render_server.stats
+
+    for request in [b'garbage\r\n\r\n',
+                    b'GET /health HTTP/1.1\r\nno colon\r\n\r\n',
+                    b'POST /render HTTP/1.1\r\nContent-Length: x\r\n\r\n',
+                    b'POST /render HTTP/1.1\r\nContent-Length: 2\r\n\r\n[]']:
+        response, stats = asyncio.run(send(request))
+        assert response.startswith(b'HTTP/1.1 400 '), (request, response)
+        assert stats['errors'] == 1
+
+
+def test_file_root():
+    """ files are only read from inside the server root """
+    assert refused({'file': os.path.join(INPUT, 'exampledata1.csv')})
+    assert refused({'file': '../test.py'}, root=INPUT)
+    assert refused({'file': 'Auto'}, root=INPUT)
+    body, _, _ = server.render_payload({'file': 'exampledata1.csv'}, root=INPUT)
+    assert body.startswith(b'\x89PNG')
+
+
+def test_timeout_keeps_slot():
+    """ a timed out render keeps its worker's slot until it really finishes """
+    def slow_render(payload, upload=None, root=None):
+        time.sleep(payload['sleep'])
+        return b'', 'image/png', {'render_time': payload['sleep'], 'stages': {}}
+
+    async def run():
+        render_server = gt.RenderServer(workers=1, timeout=0.1)
+        render_server.executor = ThreadPoolExecutor(1)
+        render_server.slots = asyncio.Semaphore(1)
+        try:
+            await render_server.render({'sleep': 0.5})
+        except asyncio.TimeoutError:
+            pass
+        else:
+            raise AssertionError('render should have timed out')
+        assert render_server.slots.locked()
+        assert render_server.stats['active'] == 1
+        await asyncio.sleep(0.6)
+        assert not render_server.slots.locked()
+        assert render_server.stats['active'] == 0
+        render_server.executor.shutdown()
+
+    original = server.render_payload
+    server.render_payload = slow_render
+    try:
+        asyncio.run(run())
+    finally:
+        server.render_payload = original
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_render_payload()
+    test_refused_options()
+    test_data_is_not_a_path()
+    test_malformed_request()
+    test_file_root()
+    test_timeout_keeps_slot()
+    print('all server tests passed')
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for the sql source
+
+@author: dhancock
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+from giganttic.data_sql import regex_to_pattern
+
+
+def schedule(n=300):
+    """ n activities across a few WBS branches """
+    starts = pd.date_range('2024-01-01', periods=n, freq='D')
+    return pd.DataFrame({'id': range(n),
+                         'WBS': [f'{i % 3 + 1}.{i % 5 + 1}' for i in range(n)],
+                         'activity_name': [f'task_{i} 100%' if i % 7 else f'Design {i}'
+                                           for i in range(n)],
+                         'start': starts,
+                         'end': starts + pd.Timedelta(days=10)})
+
+
+def database(df, directory):
+    """ an sqlite database with df as the tasks table """
+    filename = os.path.join(directory, 'schedule.db')
+    with sqlite3.connect(filename) as connection:
+        df.to_sql('tasks', connection, index=False)
+    return filename
+
+
+#%% CASES
+def test_regex_to_pattern():
+    """ plain text regexes become LIKE or GLOB patterns, escaped with ! """
+    assert regex_to_pattern('^1\\.2') == '1.2%'
+    assert regex_to_pattern('100%$') == '%100!%'
+    assert regex_to_pattern('task_1') == '%task!_1%'
+    assert regex_to_pattern('^a*', glob=True) is None
+    assert regex_to_pattern('^1\\.2', glob=True) == '1.2*'
+    assert regex_to_pattern('des(ign)?') is None
+
+
+def test_like_escape_is_valid_sql():
+    """ the ! escaped LIKE patterns match literally """
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE t (name TEXT)')
+    connection.executemany('INSERT INTO t VALUES (?)', [('task_1',), ('taskX1',), ('100%',)])
+    matches = connection.execute("SELECT name FROM t WHERE name LIKE ? ESCAPE '!'",
+                                 [regex_to_pattern('task_1')]).fetchall()
+    assert matches == [('task_1',)]
+    connection.close()
+
+
+def test_pushdown_matches_filter_index():
+    """ filters run by the database give the same rows as FilterIndex """
+    df = schedule()
+    with tempfile.TemporaryDirectory() as directory:
+        source = gt.SQLSource(database(df, directory), table='tasks')
+        index = gt.FilterIndex(df)
+        for column, regex in [('WBS', '^2\\.'), ('activity_name', 'Design'),
+                              ('activity_name', 'design'), ('activity_name', 'task_[0-9]+ 1'),
+                              ('activity_name', '100%$')]:
+            expected = index.select(index.contains(column, regex)).id.tolist()
+            assert source.read(filter_string=[column, regex]).id.tolist() == expected, regex
+        window = index.select(index.window('2024-03-01', '2024-03-31')).id.tolist()
+        assert source.read(start='2024-03-01', end='2024-03-31').id.tolist() == window
+        assert source.count(filters={'WBS': ['1.1', '2.2']}) == int(
+            df.WBS.isin(['1.1', '2.2']).sum())
+        source.close()
+
+
+def test_giganttic_does_not_filter_twice():
+    """ giganttic() leaves the filtering of a SQLSource to the database """
+    df = schedule()
+    collector = gt.ListCollector()
+    with tempfile.TemporaryDirectory() as directory:
+        source = gt.SQLSource(database(df, directory), table='tasks')
+        output = gt.giganttic(source, output_file=None, filter_string=['WBS', '^3\\.'],
+                              profile=collector)
+        source.close()
+    stages = [record['stage'] for record in collector]
+    assert 'import_sql' in stages
+    assert 'filter_data' not in stages
+    assert output['data'].WBS.str.startswith('3.').all()
+    assert len(output['data']) == int(df.WBS.str.startswith('3.').sum())
+
+
+def test_source_column_names():
+    """ filters and windows use the database's own column names """
+    df = schedule().rename(columns={'WBS': 'Wbs', 'start': 'Start_', 'end': 'End_',
+                                    'activity_name': 'Activity Name', 'id': 'uid'})
+    with tempfile.TemporaryDirectory() as directory:
+        source = gt.SQLSource(database(df, directory), table='tasks', columns={'uid': 'id'})
+        result = source.read(filter_string=['activity_name', '^Design'],
+                             filters={'WBS': '1.1'}, start='2024-03-01', end='2024-06-30',
+                             columns=['id', 'activity_name', 'start', 'end'])
+        source.close()
+    expected = df[df['Activity Name'].str.startswith('Design') & (df.Wbs == '1.1')
+                  & (df.Start_ <= '2024-06-30') & (df.End_ >= '2024-03-01')]
+    assert result.id.tolist() == expected.uid.tolist()
+    assert len(result) > 0
+
+
+def test_window_on_dates_which_are_not_iso_text():
+    """ dates stored as dd/mm/yyyy text or excel serials are windowed correctly """
+    df = schedule()
+    expected = df[(df.start <= '2024-03-31') & (df.end >= '2024-03-01')].id.tolist()
+    df['end'] = df.end.dt.strftime('%d/%m/%Y')
+    df['start'] = (df.start - pd.Timestamp('1899-12-30')).dt.days
+    with tempfile.TemporaryDirectory() as directory:
+        source = gt.SQLSource(database(df, directory), table='tasks')
+        assert source.read(start='2024-03-01', end='2024-03-31').id.tolist() == expected
+        assert source.count(start='2024-03-01', end='2024-03-31') == len(expected)
+        source.close()
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_regex_to_pattern()
+    test_like_escape_is_valid_sql()
+    test_pushdown_matches_filter_index()
+    test_giganttic_does_not_filter_twice()
+    test_source_column_names()
+    test_window_on_dates_which_are_not_iso_text()
+    print('all sql tests passed')
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for rendering without pyplot, and from several threads at once
+
+@author: dhancock
+"""
+
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import matplotlib
+from matplotlib import pyplot as plt
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import giganttic as gt
+from benchmarks.synthetic import generate_schedule
+
+
+def render(rows):
+    """ png bytes of a chart of a schedule with rows rows """
+    ax, fig = gt.mpl_gantt(generate_schedule(rows, seed=rows), fillcolumn='WBS', legend=True)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+#%% CASES
+def test_no_pyplot_state():
+    """ charts aren't registered with pyplot and don't change rcParams """
+    figures = plt.get_fignums()
+    rcparams = dict(matplotlib.rcParams)
+    _, small = gt.mpl_gantt(generate_schedule(5), fillcolumn='WBS', legend=True)
+    _, large = gt.mpl_gantt(generate_schedule(600), fillcolumn='WBS', legend=True)
+    assert plt.get_fignums() == figures
+    assert dict(matplotlib.rcParams) == rcparams
+    # each figure keeps its own style instead
+    assert gt.get_figure_style(small)['font_size'] != gt.get_figure_style(large)['font_size']
+
+
+def test_threads_match_serial():
+    """ charts drawn at the same time come out the same as one at a time """
+    sizes = [5, 40, 120, 5, 40, 120]
+    serial = [render(rows) for rows in sizes]
+    with ThreadPoolExecutor(3) as pool:
+        threaded = list(pool.map(render, sizes))
+    assert threaded == serial
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_no_pyplot_state()
+    test_threads_match_serial()
+    print('all thread tests passed')
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for dependency validation
+
+@author: dhancock
+"""
+
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+
+
+def schedule():
+    """
+    1 -> 2 -> 3 is fine, 4 starts before 3 ends,
+    5 -> 6 -> 7 -> 5 is a cycle and 8 follows a missing task 99
+    """
+    return pd.DataFrame({'id': [1, 2, 3, 4, 5, 6, 7, 8],
+                         'activity_name': [f'task {i}' for i in range(1, 9)],
+                         'start': pd.to_datetime(['2024-01-01', '2024-02-01', '2024-03-01',
+                                                  '2024-03-15', '2024-05-01', '2024-06-01',
+                                                  '2024-07-01', '2024-08-01']),
+                         'end': pd.to_datetime(['2024-01-31', '2024-02-28', '2024-03-31',
+                                                '2024-04-30', '2024-05-31', '2024-06-30',
+                                                '2024-07-31', '2024-08-31']),
+                         'predecessors': [None, '1', 2.0, '3', '7', '5', ' 6', '99']})
+
+
+#%% CASES
+def test_get_connections():
+    """ predecessors are split, matched whatever their type, and given lags """
+    links = gt.get_connections(schedule())
+    assert len(links) == 7
+    link = links[links.id == '2'].iloc[0]
+    assert link.predecessor == '1' and link.predecessor_row == 0
+    assert link.lag == pd.Timedelta(days=1)
+    assert links[links.id == '8'].predecessor_row.tolist() == [-1]
+
+
+def test_float_predecessor_lists():
+    """ every id in a list like '1.0, 2.0' matches, not just the last """
+    df = schedule()
+    df['predecessors'] = [None, '1.0', '1.0, 2.0', [3.0], None, None, None, None]
+    links = gt.get_connections(df)
+    assert links.predecessor.tolist() == ['1', '1', '2', '3']
+    assert (links.predecessor_row >= 0).all()
+
+
+def test_check_connections():
+    """ cycles, missing predecessors and negative lags are found """
+    violations = gt.check_connections(schedule())
+    found = dict(zip(violations.id, violations.violation))
+    assert found == {'4': 'negative lag',
+                     '5': 'cycle', '6': 'cycle', '7': 'cycle',
+                     '8': 'missing predecessor'}
+
+
+def test_flag_violations():
+    """ each row is labelled with its worst violation """
+    df = gt.flag_violations(schedule())
+    assert df.date_logic.tolist() == ['OK', 'OK', 'OK', 'negative lag',
+                                      'cycle', 'cycle', 'cycle', 'missing predecessor']
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_get_connections()
+    test_float_predecessor_lists()
+    test_check_connections()
+    test_flag_violations()
+    print('all validation tests passed')
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+test cases for the primavera xer importer
+
+@author: dhancock
+"""
+
+import os
+import sys
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import giganttic as gt
+
+XER = [['ERMHDR', '19.12', '2024-01-01', 'Project', 'admin'],
+       ['%T', 'PROJECT'],
+       ['%F', 'proj_id', 'proj_short_name'],
+       ['%R', '1', 'DEMO'],
+       ['%T', 'PROJWBS'],
+       ['%F', 'wbs_id', 'proj_id', 'parent_wbs_id', 'wbs_short_name', 'wbs_name'],
+       ['%R', '10', '1', '', 'DEMO', 'Demo project'],
+       ['%R', '12', '1', '11', 'DES', 'Design'],
+       ['%R', '11', '1', '10', 'ENG', 'Engineering'],
+       ['%T', 'TASK'],
+       ['%F', 'task_id', 'proj_id', 'wbs_id', 'task_code', 'task_name', 'task_type',
+        'status_code', 'act_start_date', 'act_end_date', 'early_start_date',
+        'early_end_date', 'target_start_date', 'target_end_date'],
+       ['%R', '100', '1', '12', 'A100', 'Concept design', 'TT_Task', 'TK_Complete',
+        '2024-01-08 08:00', '2024-02-02 17:00', '', '', '2024-01-01 08:00', '2024-01-26 17:00'],
+       ['%R', '101', '1', '12', 'A110', 'Detailed design', 'TT_Task', 'TK_NotStart',
+        '', '', '2024-02-05 08:00', '2024-04-26 17:00', '2024-01-29 08:00', '2024-04-19 17:00'],
+       ['%R', '102', '1', '11', 'M100', 'Design complete', 'TT_FinMile', 'TK_NotStart',
+        '', '', '', '2024-04-26 17:00', '', '2024-04-19 17:00'],
+       ['%R', '103', '1', '10', 'M000', 'Start', 'TT_Mile', 'TK_Complete',
+        '2024-01-08 08:00'],
+       ['%T', 'TASKPRED'],
+       ['%F', 'task_pred_id', 'task_id', 'pred_task_id', 'proj_id', 'pred_type'],
+       ['%R', '1', '100', '103', '1', 'PR_FS'],
+       ['%R', '2', '101', '100', '1', 'PR_FS'],
+       ['%R', '3', '102', '101', '1', 'PR_FS'],
+       ['%R', '4', '102', '100', '1', 'PR_SS'],
+       ['%E']]
+
+
+def write_xer(outputdir):
+    """ writes a small xer file, the way p6 does """
+    filename = os.path.join(outputdir, 'demo.xer')
+    with open(filename, 'w', encoding='cp1252', newline='') as file_object:
+        file_object.write(''.join('\t'.join(line) + '\r\n' for line in XER))
+    return filename
+
+
+#%% CASES
+def test_read_xer_tables():
+    """ only the wanted tables and columns are read, in chunks """
+    with tempfile.TemporaryDirectory() as outputdir:
+        filename = write_xer(outputdir)
+        chunks = list(gt.read_xer_tables(filename, chunksize=2))
+        tables = list(gt.read_xer_tables(filename, {'TASK': ['task_code', 'act_end_date'],
+                                                    'PROJECT': ['missing']}))
+    assert [(table, len(chunk)) for table, chunk in chunks] == [
+        ('PROJWBS', 2), ('PROJWBS', 1), ('TASK', 2), ('TASK', 2), ('TASKPRED', 2), ('TASKPRED', 2)]
+    task = pd.concat([chunk for table, chunk in chunks if table == 'TASK'], ignore_index=True)
+    assert task.task_id.tolist() == ['100', '101', '102', '103']
+    assert 'status_code' not in task.columns
+    assert len(tables) == 1 and tables[0][0] == 'TASK'
+    # columns keep the order of the file, and short rows are padded
+    assert tables[0][1].columns.tolist() == ['task_code', 'act_end_date']
+    assert tables[0][1].act_end_date.tolist() == ['2024-02-02 17:00', '', '', '']
+
+
+def test_import_xer():
+    """ tasks get typed dates, predecessors and wbs codes """
+    with tempfile.TemporaryDirectory() as outputdir:
+        filename = write_xer(outputdir)
+        df = gt.import_xer(filename)
+        chunked = gt.import_xer(filename, chunksize=1)
+        imported = gt.import_file(filename)
+    pd.testing.assert_frame_equal(df, chunked)
+    pd.testing.assert_frame_equal(df, imported)
+    df = df.set_index('task_code')
+    # actual, then early, then target dates
+    assert df.start['A100'] == pd.Timestamp('2024-01-08 08:00')
+    assert df.end['A100'] == pd.Timestamp('2024-02-02 17:00')
+    assert df.start['A110'] == pd.Timestamp('2024-02-05 08:00')
+    # milestones have one date
+    assert df.start['M100'] == df.end['M100'] == pd.Timestamp('2024-04-26 17:00')
+    assert df.start['M000'] == df.end['M000'] == pd.Timestamp('2024-01-08 08:00')
+    assert df.predecessors.to_dict() == {'A100': '103', 'A110': '100', 'M100': '101,100',
+                                         'M000': ''}
+    assert df.WBS.to_dict() == {'A100': 'DEMO.ENG.DES', 'A110': 'DEMO.ENG.DES',
+                                'M100': 'DEMO.ENG', 'M000': 'DEMO'}
+
+
+#%% MAIN
+if __name__ == '__main__':
+    test_read_xer_tables()
+    test_import_xer()
+    print('all xer tests passed')